@@ -0,0 +1,126 @@
+"""
+Throughput versus latency of micro-batched inference calls.
+
+Runs a stub model server that, like a GPU, handles one call at a time and costs a fixed
+overhead per call plus a small cost per input, then drives it with concurrent clients,
+either one call per request or through the MicroBatcher with several max_wait settings.
+
+Usage:
+    python -m benchmarks.bench_batching [--clients 1,4,32] [--requests 20] [--overhead-ms 20] [--item-ms 1]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.inference.backends import InferenceBackend
+
+
+class StubModelServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, overhead, item_cost):
+        super().__init__(('127.0.0.1', 0), StubModelHandler)
+        self.overhead = overhead
+        self.item_cost = item_cost
+        # The model runs one call at a time, batched or not
+        self.device = threading.Lock()
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per call
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        inputs = payload['inputs'] if self.path == '/batch' else [payload]
+        with self.server.device:
+            time.sleep(self.server.overhead + self.server.item_cost * len(inputs))
+        outputs = [{'output': item['input']} for item in inputs]
+        body = json.dumps({'outputs': outputs} if self.path == '/batch' else outputs[0]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(call, clients, requests):
+    """
+    :return: Tuple (requests per second, sorted latencies in ms).
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        for i in range(requests):
+            started = time.perf_counter()
+            call({'input': f"{index}-{i}"})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - started), sorted(latencies)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1,4,32', help='Comma-separated numbers of concurrent clients')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per client')
+    parser.add_argument('--overhead-ms', type=float, default=20, help='Model cost per call')
+    parser.add_argument('--item-ms', type=float, default=1, help='Model cost per input')
+    parser.add_argument('--max-batch', type=int, default=32, help='Maximum batch size')
+    args = parser.parse_args()
+
+    server = StubModelServer(args.overhead_ms / 1000, args.item_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{args.requests} requests per client, model cost {args.overhead_ms:g} ms/call "
+          f"+ {args.item_ms:g} ms/input, max batch {args.max_batch}")
+    print(f"{'clients':>7}  {'mode':<24}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}")
+
+    def report(clients, mode, throughput, latencies, average_batch):
+        print(f"{clients:>7}  {mode:<24}{throughput:>10,.0f}{statistics.median(latencies):>10.1f}"
+              f"{percentile(latencies, 0.99):>10.1f}{average_batch:>11.1f}")
+
+    for clients in [int(value) for value in args.clients.split(',')]:
+        backend = InferenceBackend('bench', url, max_connections=clients, queue_timeout=60)
+        throughput, latencies = run(
+            lambda payload: backend.pool.request('POST', '/infer', body=json.dumps(payload).encode('utf-8'),
+                                                 headers={'Content-Type': 'application/json'}),
+            clients, args.requests
+        )
+        report(clients, 'one call per request', throughput, latencies, 1)
+        backend.close()
+
+        for max_wait_ms in (1, 5, 20):
+            backend = InferenceBackend('bench', url, batch_path='/batch', max_batch=args.max_batch,
+                                       max_wait_ms=max_wait_ms, max_connections=4, queue_timeout=60)
+            throughput, latencies = run(backend.batcher.submit, clients, args.requests)
+            report(clients, f"batched, wait {max_wait_ms} ms", throughput, latencies,
+                   backend.batcher.stats()['average_batch'])
+            backend.close()
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
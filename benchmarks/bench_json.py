@@ -0,0 +1,118 @@
+"""
+Micro-benchmark of JSON response encoding on typical list payloads.
+
+Compares the previous path (to_dict() calling isoformat() on every date, then Flask's
+default provider) with the orjson provider encoding native datetimes.
+
+Usage:
+    python -m benchmarks.bench_json [--repeat 200]
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.utils.json_provider import FastJSONProvider, orjson
+
+
+def make_users(count):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': i,
+            'firstname': f'First{i}',
+            'lastname': f'Last{i}',
+            'email': f'user{i}@example.com',
+            'role': 'admin' if i % 50 == 0 else 'user',
+            'is_active': i % 3 != 0,
+            'created_at': now - timedelta(days=i),
+            'updated_at': now - timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_keys(count):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': i,
+            'prefix': str(uuid.uuid4())[:8],
+            'created_at': now - timedelta(days=i),
+            'expires_at': now + timedelta(days=365 - i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_logs(count):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': 1_000_000 - i,
+            'user_id': i % 97,
+            'action': 'User logged in' if i % 2 else 'User logged out',
+            'timestamp': now - timedelta(seconds=i * 7),
+            'details': None,
+            'ip_address': f'10.0.{i % 256}.{i % 200}',
+        }
+        for i in range(count)
+    ]
+
+
+def with_isoformat(rows):
+    """
+    What to_dict() used to do: one isoformat() call per date field.
+    """
+    return [{key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+            for row in rows]
+
+
+PAYLOADS = {
+    'users (200)': lambda: {'status': 'success', 'users': make_users(200), 'next_cursor': 'abc'},
+    'api keys (50)': lambda: {'status': 'success', 'api_keys': make_keys(50)},
+    'log page (100)': lambda: {'status': 'success', 'logs': make_logs(100), 'next_cursor': 'abc'},
+}
+
+
+def bench(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=max(3, repeat // 50), number=number)) / number
+    return 1 / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='Timing repetitions (higher is steadier)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    print(f"orjson: {orjson.__version__ if orjson else 'not installed'}")
+    print(f"{'payload':<16}{'default + isoformat':>22}{'fast provider':>16}{'speedup':>10}")
+
+    for name, build in PAYLOADS.items():
+        payload = build()
+        rows_key = next(key for key, value in payload.items() if isinstance(value, list))
+
+        def previous():
+            # to_dict() + isoformat, then the default provider building the response body
+            body = dict(payload, **{rows_key: with_isoformat(payload[rows_key])})
+            return default.dumps(body).encode('utf-8')
+
+        def current():
+            return fast.dumpb(payload)
+
+        assert default.loads(previous()) == fast.loads(current()), f"Outputs differ for {name}"
+        before = bench(previous, args.repeat)
+        after = bench(current, args.repeat)
+        print(f"{name:<16}{before:>18,.0f}/s{after:>12,.0f}/s{after / before:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
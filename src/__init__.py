@@ -5,13 +5,19 @@ from flask_restx import Api
 
 from src.config.config import get_config
 from src.extensions import db, migrate, bcrypt, jwt
-from src.error_handler import register_error_handlers
+from src.error_handler import register_error_handlers, register_api_error_handlers
+from src.users.hashing import calibrate_bcrypt_rounds, BCRYPT_TARGET_MS
+from src.utils.json_provider import init_json
+from src.utils.scheduler import schedule_task
 from src.views.redoc import redoc_bp
 from flask_cors import CORS
 
 # Load environment variables
 load_dotenv()
 
+# Seconds between two purges of expired revoked tokens (0 disables the purge)
+REVOKED_TOKEN_PURGE_INTERVAL = int(os.getenv('REVOKED_TOKEN_PURGE_INTERVAL', 3600))
+
 
 # Declare the app
 def create_app():
@@ -28,6 +34,9 @@ def create_app():
               doc='/swagger'  # Swagger UI available at /swagger
               )
 
+    # Encode JSON responses (blueprints and RESTX resources) with orjson
+    init_json(app, api)
+
     # Load the appropriate configuration based on the environment
     app.config.from_object(get_config())
 
@@ -35,26 +44,38 @@ def create_app():
     app.secret_key = app.config.get('SECRET_KEY')
     app.config['JWT_SECRET_KEY'] = app.config.get('JWT_SECRET_KEY')
 
+    # Pick the bcrypt cost for this hardware unless it is set explicitly
+    if 'BCRYPT_LOG_ROUNDS' not in app.config and BCRYPT_TARGET_MS > 0:
+        app.config['BCRYPT_LOG_ROUNDS'] = calibrate_bcrypt_rounds()
+
     # Initialize extensions
     bcrypt.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
 
+    # Sign tokens with the asymmetric keys of JWT_KEYS_DIR, if configured
+    from src.tokens.keys import init_key_ring, reload_key_ring, JWT_KEYS_RELOAD_INTERVAL
+    if init_key_ring(app, jwt):
+        schedule_task(app, 'reload-jwt-keys', JWT_KEYS_RELOAD_INTERVAL, reload_key_ring)
+
     # Register error handlers
     register_error_handlers(app)
+    register_api_error_handlers(api)
 
     # Import and register namespaces from src
     from src.users.namespaces import users_ns
     from src.admin.namespaces import admin_ns
     from src.api_keys.namespaces import api_keys_ns
     from src.tokens.namespaces import token_ns
+    from src.inference.namespaces import inference_ns
 
     # Register namespaces with paths
     api.add_namespace(users_ns, path='/api/users')
     api.add_namespace(admin_ns, path='/api/admin')
     api.add_namespace(api_keys_ns, path='/api/keys')
     api.add_namespace(token_ns, path='/api/tokens')
+    api.add_namespace(inference_ns, path='/api/inference')
 
     # Register Redoc blueprint
     app.register_blueprint(redoc_bp)
@@ -64,6 +85,43 @@ def create_app():
     from src.routes import register_blueprints
     register_blueprints(app)
 
+    # One-off migration of API keys stored in clear: flask hash-api-keys
+    from src.api_keys.migration import hash_api_keys_command
+    app.cli.add_command(hash_api_keys_command)
+
+    # Limit request rates per API key, user or IP (client IPs read through the trusted proxies)
+    from src.middlewares.rate_limit import init_proxy_fix, init_rate_limiting
+    init_proxy_fix(app)
+    init_rate_limiting(app)
+
+    # Connection pools to the AI model backends
+    from src.inference.backends import init_inference_backends
+    init_inference_backends(app)
+
+    # Cache read responses, invalidated when the tables they are built from change
+    from src.utils.response_cache import init_response_cache
+    init_response_cache(app)
+
+    # Meter API key usage in memory, written behind to the database
+    from src.api_keys.usage import init_usage_metering, usage_meter, API_KEY_USAGE_FLUSH_INTERVAL
+    init_usage_metering(app)
+
+    # Write activity logs in the background, in batches
+    from src.logs.writer import init_log_writer
+    init_log_writer(app)
+
+    # Start background maintenance tasks
+    from src.tokens.cache import purge_revoked_tokens
+    schedule_task(app, 'purge-revoked-tokens', REVOKED_TOKEN_PURGE_INTERVAL, purge_revoked_tokens)
+    from src.logs.retention import purge_expired_logs, LOG_RETENTION_DAYS, LOG_RETENTION_INTERVAL
+    schedule_task(app, 'purge-expired-logs', LOG_RETENTION_INTERVAL if LOG_RETENTION_DAYS > 0 else 0,
+                  purge_expired_logs)
+    from src.logs.rollups import refresh_rollups, LOG_ROLLUP_INTERVAL
+    schedule_task(app, 'update-log-rollups', LOG_ROLLUP_INTERVAL, refresh_rollups)
+    from src.inference.cache import inference_cache, INFERENCE_CACHE_PURGE_INTERVAL
+    schedule_task(app, 'purge-inference-cache', INFERENCE_CACHE_PURGE_INTERVAL, inference_cache.purge_expired)
+    schedule_task(app, 'flush-api-key-usage', API_KEY_USAGE_FLUSH_INTERVAL, usage_meter.flush, run_at_exit=True)
+
     return app
 
 
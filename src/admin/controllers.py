@@ -1,7 +1,7 @@
-from flask import jsonify
+from flask import jsonify, request
 from flask_jwt_extended import jwt_required
 from src.admin.services import *
-from src.middlewares.decorators import role_required, handle_exceptions
+from src.middlewares.decorators import role_required, handle_exceptions, conditional_get, cached_response
 
 # Logger configuration
 logger = logging.getLogger(__name__)
@@ -11,14 +11,26 @@ logger = logging.getLogger(__name__)
 @handle_exceptions
 def admin_dashboard():
     logger.info('Admin dashboard accessed')
-    return jsonify({'status': 'success', 'message': 'Welcome to the admin dashboard'}), 200
+    stats = get_dashboard_stats_service()
+    return jsonify({'status': 'success', 'message': 'Welcome to the admin dashboard', 'stats': stats}), 200
 
 @jwt_required()
 @role_required('admin')
 @handle_exceptions
+@conditional_get('user')
+@cached_response('user')
 def list_users():
-    users = list_all_users_service()
-    return jsonify({'status': 'success', 'users': users}), 200
+    result = list_all_users_service(
+        limit=request.args.get('limit', type=int),
+        cursor=request.args.get('cursor'),
+        role=request.args.get('role'),
+        is_active={'true': True, 'false': False}.get(request.args.get('is_active', '').lower()),
+        created_since=request.args.get('created_since'),
+        created_until=request.args.get('created_until'),
+        sort=request.args.get('sort', '-created_at'),
+        fields=request.args.get('fields')
+    )
+    return jsonify({'status': 'success', **result}), 200
 
 @jwt_required()
 @role_required('admin')
@@ -37,6 +49,87 @@ def activate_user(user_id):
 @jwt_required()
 @role_required('admin')
 @handle_exceptions
+def revoke_user_tokens(user_id):
+    response = revoke_user_tokens_service(user_id)
+    return jsonify(response), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+@conditional_get('log')
+@cached_response('log')
 def view_user_logs():
-    logs = view_user_logs_service()
-    return jsonify({'status': 'success', 'logs': logs}), 200
+    result = view_user_logs_service(
+        limit=request.args.get('limit', request.args.get('per_page', type=int), type=int),
+        cursor=request.args.get('cursor'),
+        user_id=request.args.get('user_id', type=int),
+        action=request.args.get('action'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        include_total=request.args.get('include_total', 'false').lower() == 'true',
+        page=request.args.get('page', type=int)
+    )
+    return jsonify({'status': 'success', **result}), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def export_user_logs():
+    return export_logs_service(
+        fmt=request.args.get('format', 'ndjson'),
+        compress=request.args.get('gzip', 'false').lower() == 'true',
+        user_id=request.args.get('user_id', type=int),
+        action=request.args.get('action'),
+        since=request.args.get('since'),
+        until=request.args.get('until')
+    )
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def action_stats():
+    stats = get_action_stats_service(
+        granularity=request.args.get('granularity', 'day'),
+        action=request.args.get('action'),
+        since=request.args.get('since'),
+        until=request.args.get('until')
+    )
+    return jsonify({'status': 'success', 'stats': stats}), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def user_activity_stats():
+    stats = get_user_activity_stats_service(
+        action=request.args.get('action'),
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        limit=request.args.get('limit', 20, type=int)
+    )
+    return jsonify({'status': 'success', 'stats': stats}), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def log_retention():
+    retention = get_log_retention_service()
+    return jsonify({'status': 'success', 'retention': retention}), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def hashing_metrics():
+    metrics = get_hashing_metrics_service()
+    return jsonify({'status': 'success', 'metrics': metrics}), 200
+
+@jwt_required()
+@role_required('admin')
+@handle_exceptions
+def api_key_usage():
+    usage = get_api_key_usage_service(
+        api_key_id=request.args.get('api_key_id', type=int),
+        user_id=request.args.get('user_id', type=int),
+        since=request.args.get('since'),
+        until=request.args.get('until')
+    )
+    return jsonify({'status': 'success', 'usage': usage}), 200
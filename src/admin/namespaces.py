@@ -2,6 +2,7 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 from src.admin.services import *
+from src.middlewares.decorators import role_required, conditional_get, cached_response
 import logging
 
 # Logger configuration
@@ -18,12 +19,35 @@ user_action_response_model = admin_ns.model('UserActionResponse', {
 
 user_list_model = admin_ns.model('UserList', {
     'status': fields.String(description='Status of the response'),
-    'users': fields.List(fields.Raw, description='List of users')
+    'users': fields.List(fields.Raw, description='List of users'),
+    'next_cursor': fields.String(description='Cursor of the next page, null on the last page')
 })
 
 log_list_model = admin_ns.model('LogList', {
     'status': fields.String(description='Status of the response'),
-    'logs': fields.List(fields.Raw, description='List of user activity logs')
+    'logs': fields.List(fields.Raw, description='List of user activity logs'),
+    'next_cursor': fields.String(description='Cursor of the next page, null on the last page'),
+    'total': fields.Integer(description='Number of matching logs, if include_total is set')
+})
+
+usage_list_model = admin_ns.model('UsageList', {
+    'status': fields.String(description='Status of the response'),
+    'usage': fields.List(fields.Raw, description='Usage totals per API key and endpoint')
+})
+
+stats_model = admin_ns.model('Stats', {
+    'status': fields.String(description='Status of the response'),
+    'stats': fields.List(fields.Raw, description='Aggregated counts')
+})
+
+retention_model = admin_ns.model('Retention', {
+    'status': fields.String(description='Status of the response'),
+    'retention': fields.Raw(description='Retention settings, checkpoint and recent runs')
+})
+
+metrics_model = admin_ns.model('Metrics', {
+    'status': fields.String(description='Status of the response'),
+    'metrics': fields.Raw(description='Counters and timings')
 })
 
 
@@ -31,33 +55,59 @@ log_list_model = admin_ns.model('LogList', {
 @admin_ns.route('/dashboard')
 class AdminDashboard(Resource):
     @jwt_required()
+    @role_required('admin')
     @admin_ns.response(200, 'Welcome to the admin dashboard')
     def get(self):
         """
         Access the admin dashboard
         """
         logger.info('Admin dashboard accessed')
-        return {'status': 'success', 'message': 'Welcome to the admin dashboard'}, 200
+        stats = get_dashboard_stats_service()
+        return {'status': 'success', 'message': 'Welcome to the admin dashboard', 'stats': stats}, 200
 
 
 # List Users Resource
 @admin_ns.route('/users')
 class ListUsers(Resource):
     @jwt_required()
+    @role_required('admin')
+    @conditional_get('user')
+    @cached_response('user')
+    @admin_ns.doc(params={
+        'limit': 'Number of users per page',
+        'cursor': 'next_cursor of the previous page (same sort)',
+        'role': 'Only users with this role',
+        'is_active': 'Only active (true) or inactive (false) users',
+        'created_since': 'Created at or after (ISO 8601)',
+        'created_until': 'Created before (ISO 8601)',
+        'sort': 'id, created_at or email, prefixed with - for descending (default -created_at)',
+        'fields': 'Comma-separated fields to return (default all)'
+    })
     @admin_ns.response(200, 'Successfully retrieved user list', user_list_model)
-    @admin_ns.response(500, 'Failed to retrieve user list')
+    @admin_ns.response(304, 'Not modified since the ETag in If-None-Match')
+    @admin_ns.response(400, 'Invalid filter, sort, fields or cursor')
     def get(self):
         """
-        List all users in the system
+        List users with cursor pagination, filters and sparse fieldsets
         """
-        users = list_all_users_service()
-        return {'status': 'success', 'users': users}, 200
+        result = list_all_users_service(
+            limit=request.args.get('limit', type=int),
+            cursor=request.args.get('cursor'),
+            role=request.args.get('role'),
+            is_active={'true': True, 'false': False}.get(request.args.get('is_active', '').lower()),
+            created_since=request.args.get('created_since'),
+            created_until=request.args.get('created_until'),
+            sort=request.args.get('sort', '-created_at'),
+            fields=request.args.get('fields')
+        )
+        return {'status': 'success', **result}, 200
 
 
 # Deactivate User Resource
 @admin_ns.route('/users/<int:user_id>/deactivate')
 class DeactivateUser(Resource):
     @jwt_required()
+    @role_required('admin')
     @admin_ns.response(200, 'User successfully deactivated', user_action_response_model)
     @admin_ns.response(404, 'User not found')
     def put(self, user_id):
@@ -72,6 +122,7 @@ class DeactivateUser(Resource):
 @admin_ns.route('/users/<int:user_id>/activate')
 class ActivateUser(Resource):
     @jwt_required()
+    @role_required('admin')
     @admin_ns.response(200, 'User successfully activated', user_action_response_model)
     @admin_ns.response(404, 'User not found')
     def put(self, user_id):
@@ -82,17 +133,188 @@ class ActivateUser(Resource):
         return response, 200
 
 
+# Revoke User Tokens Resource
+@admin_ns.route('/users/<int:user_id>/revoke-tokens')
+class RevokeUserTokens(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.response(200, 'All tokens of the user revoked', user_action_response_model)
+    @admin_ns.response(404, 'User not found')
+    def post(self, user_id):
+        """
+        Revoke every token of a user (log out everywhere)
+        """
+        response = revoke_user_tokens_service(user_id)
+        return response, 200
+
+
 # View User Logs Resource
 @admin_ns.route('/logs')
 class ViewUserLogs(Resource):
     @jwt_required()
+    @role_required('admin')
+    @conditional_get('log')
+    @cached_response('log')
+    @admin_ns.doc(params={
+        'limit': 'Number of logs per page (per_page is accepted too)',
+        'cursor': 'next_cursor of the previous page',
+        'user_id': 'Only logs of this user',
+        'action': 'Only logs with this action',
+        'since': 'Start of the range (ISO 8601, inclusive)',
+        'until': 'End of the range (ISO 8601, exclusive)',
+        'include_total': 'Also return the number of matching logs (slower)',
+        'page': 'Legacy page number (deprecated, use cursor)'
+    })
     @admin_ns.response(200, 'Successfully retrieved user logs', log_list_model)
-    @admin_ns.response(500, 'Failed to retrieve logs')
+    @admin_ns.response(304, 'Not modified since the ETag in If-None-Match')
+    @admin_ns.response(400, 'Invalid cursor or date range')
+    def get(self):
+        """
+        View logs of user activities, newest first, with cursor pagination.
+        """
+        result = view_user_logs_service(
+            limit=request.args.get('limit', request.args.get('per_page', type=int), type=int),
+            cursor=request.args.get('cursor'),
+            user_id=request.args.get('user_id', type=int),
+            action=request.args.get('action'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            include_total=request.args.get('include_total', 'false').lower() == 'true',
+            page=request.args.get('page', type=int)
+        )
+        return {'status': 'success', **result}, 200
+
+
+# Export User Logs Resource
+@admin_ns.route('/logs/export')
+class ExportUserLogs(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.doc(params={
+        'format': 'ndjson (default) or csv',
+        'gzip': 'Send the export as a gzip file',
+        'user_id': 'Only logs of this user',
+        'action': 'Only logs with this action',
+        'since': 'Start of the range (ISO 8601, inclusive)',
+        'until': 'End of the range (ISO 8601, exclusive)'
+    })
+    @admin_ns.response(200, 'Streamed export of the matching logs')
+    @admin_ns.response(400, 'Invalid format or date range')
+    def get(self):
+        """
+        Export every matching log as a stream (NDJSON or CSV, optionally gzipped).
+        """
+        return export_logs_service(
+            fmt=request.args.get('format', 'ndjson'),
+            compress=request.args.get('gzip', 'false').lower() == 'true',
+            user_id=request.args.get('user_id', type=int),
+            action=request.args.get('action'),
+            since=request.args.get('since'),
+            until=request.args.get('until')
+        )
+
+
+# Action Statistics Resource
+@admin_ns.route('/stats/actions')
+class ActionStats(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.doc(params={
+        'granularity': 'day (default) or hour',
+        'action': 'Only this action',
+        'since': 'Start of the range (ISO 8601, inclusive)',
+        'until': 'End of the range (ISO 8601, exclusive)'
+    })
+    @admin_ns.response(200, 'Successfully retrieved action statistics', stats_model)
+    @admin_ns.response(400, 'Invalid granularity or date range')
+    def get(self):
+        """
+        Count log entries per action and day or hour (from the rollup tables).
+        """
+        stats = get_action_stats_service(
+            granularity=request.args.get('granularity', 'day'),
+            action=request.args.get('action'),
+            since=request.args.get('since'),
+            until=request.args.get('until')
+        )
+        return {'status': 'success', 'stats': stats}, 200
+
+
+# User Activity Statistics Resource
+@admin_ns.route('/stats/users')
+class UserActivityStats(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.doc(params={
+        'action': 'Only count this action',
+        'since': 'Start of the range (ISO 8601, inclusive)',
+        'until': 'End of the range (ISO 8601, exclusive)',
+        'limit': 'Number of users returned (max 100)'
+    })
+    @admin_ns.response(200, 'Successfully retrieved user activity statistics', stats_model)
+    @admin_ns.response(400, 'Invalid date range')
+    def get(self):
+        """
+        Rank users by number of log entries (from the rollup tables).
+        """
+        stats = get_user_activity_stats_service(
+            action=request.args.get('action'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            limit=request.args.get('limit', 20, type=int)
+        )
+        return {'status': 'success', 'stats': stats}, 200
+
+
+# Log Retention Resource
+@admin_ns.route('/logs/retention')
+class LogRetentionStats(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.response(200, 'Successfully retrieved log retention statistics', retention_model)
+    def get(self):
+        """
+        View the progress and recent runs (rows deleted, duration) of the log retention job.
+        """
+        retention = get_log_retention_service()
+        return {'status': 'success', 'retention': retention}, 200
+
+
+# Password Hashing Metrics Resource
+@admin_ns.route('/metrics/hashing')
+class HashingMetrics(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.response(200, 'Successfully retrieved hashing metrics', metrics_model)
+    def get(self):
+        """
+        View queue wait and hash time metrics of the password hashing pool.
+        """
+        metrics = get_hashing_metrics_service()
+        return {'status': 'success', 'metrics': metrics}, 200
+
+
+# API Key Usage Resource
+@admin_ns.route('/usage')
+class ApiKeyUsageReport(Resource):
+    @jwt_required()
+    @role_required('admin')
+    @admin_ns.doc(params={
+        'api_key_id': 'Only report this API key',
+        'user_id': 'Only report the keys of this user',
+        'since': 'Start of the range (ISO 8601, inclusive)',
+        'until': 'End of the range (ISO 8601, exclusive)'
+    })
+    @admin_ns.response(200, 'Successfully retrieved API key usage', usage_list_model)
+    @admin_ns.response(400, 'Invalid date range')
     def get(self):
         """
-        View logs of user activities with pagination.
+        View API key usage (requests, bytes, latency) per key and endpoint.
         """
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        logs = view_user_logs_service(page=page, per_page=per_page)
-        return {'status': 'success', 'logs': logs}, 200
+        usage = get_api_key_usage_service(
+            api_key_id=request.args.get('api_key_id', type=int),
+            user_id=request.args.get('user_id', type=int),
+            since=request.args.get('since'),
+            until=request.args.get('until')
+        )
+        return {'status': 'success', 'usage': usage}, 200
@@ -1,24 +1,104 @@
 import logging
+import os
+from datetime import datetime, timedelta, timezone
 
 from src import db
+from src.api_keys.models import ApiKeyUsage
 from src.exceptions import NotFoundError, ValidationError
-from src.logs.models import Log
+from flask import Response, stream_with_context
+
+from src.logs.export import export_logs, EXPORT_FORMATS
+from src.logs.models import Log, LogHourlyRollup, LogDailyRollup
+from src.logs.retention import retention_stats
+from src.tokens.services import revoke_all_tokens_for_user
+from src.users.cache import user_state_cache
+from src.users.hashing import password_hash_pool
 from src.users.models import User
+from src.utils.pagination import keyset_paginate
 
 # Logger configuration
 logger = logging.getLogger(__name__)
 
+# Default and maximum number of users per page
+USER_PAGE_SIZE = int(os.getenv('USER_PAGE_SIZE', 50))
+USER_PAGE_MAX_SIZE = int(os.getenv('USER_PAGE_MAX_SIZE', 200))
+# Fields of the admin user listing (never the password hash)
+USER_FIELDS = ('id', 'firstname', 'lastname', 'email', 'role', 'is_active', 'created_at', 'updated_at')
+# Sort keys of the admin user listing, each backed by an index and ending with the unique id
+USER_SORT_KEYS = {
+    'id': (User.id,),
+    'created_at': (User.created_at, User.id),
+    'email': (User.email, User.id),
+}
+
+# Default and maximum number of logs per page
+LOG_PAGE_SIZE = int(os.getenv('LOG_PAGE_SIZE', 20))
+LOG_PAGE_MAX_SIZE = int(os.getenv('LOG_PAGE_MAX_SIZE', 100))
+
+
+def _parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        raise ValidationError(f"Invalid {name} date, expected ISO 8601 format.")
+
+
+def _parse_fields(fields):
+    if not fields:
+        return list(USER_FIELDS)
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in USER_FIELDS]
+    if unknown:
+        raise ValidationError(f"Unknown user fields: {', '.join(unknown)}. Allowed: {', '.join(USER_FIELDS)}.")
+    return requested
+
 
-def list_all_users_service():
+def list_all_users_service(limit=USER_PAGE_SIZE, cursor=None, role=None, is_active=None, created_since=None,
+                           created_until=None, sort='-created_at', fields=None):
     """
-    Retrieve all users in the system.
+    Retrieve users with cursor pagination, selecting only the requested columns.
 
-    :return: List of users with their details.
+    :param limit: Number of users per page (capped at USER_PAGE_MAX_SIZE).
+    :param cursor: Cursor returned with the previous page (optional, only valid for the same sort).
+    :param role: Only users with this role (optional).
+    :param is_active: Only active (True) or inactive (False) users (optional).
+    :param created_since: ISO 8601 start of the creation range, inclusive (optional).
+    :param created_until: ISO 8601 end of the creation range, exclusive (optional).
+    :param sort: Sort key among USER_SORT_KEYS, prefixed with "-" for descending order.
+    :param fields: Comma-separated fields to return (defaults to every public field).
+    :return: Dictionary with the users and the next cursor.
     """
+    descending = sort.startswith('-')
+    sort_columns = USER_SORT_KEYS.get(sort.lstrip('-'))
+    if sort_columns is None:
+        raise ValidationError(f"Invalid sort key, expected one of: {', '.join(USER_SORT_KEYS)}.")
+    fields = _parse_fields(fields)
+    limit = max(1, min(limit or USER_PAGE_SIZE, USER_PAGE_MAX_SIZE))
+    created_since = _parse_datetime(created_since, 'created_since')
+    created_until = _parse_datetime(created_until, 'created_until')
+
     try:
-        users = User.query.all()
-        user_list = [user.to_dict() for user in users]
-        return user_list
+        # The sort columns are selected too, to build the cursor
+        selected = list(dict.fromkeys(fields + [column.key for column in sort_columns]))
+        query = User.query.with_entities(*[getattr(User, field) for field in selected])
+        if role:
+            query = query.filter(User.role == role)
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        if created_since is not None:
+            query = query.filter(User.created_at >= created_since)
+        if created_until is not None:
+            query = query.filter(User.created_at < created_until)
+
+        rows, next_cursor = keyset_paginate(query, sort_columns, limit, cursor=cursor, descending=descending)
+        users = [
+            {field: value for field, value in zip(selected, row) if field in fields}
+            for row in rows
+        ]
+        logger.info(f"Listed {len(users)} users")
+        return {'users': users, 'next_cursor': next_cursor}
+    except ValidationError:
+        raise
     except Exception as e:
         logger.error(f"Error listing all users: {str(e)}")
         raise ValidationError("Failed to retrieve user list.")
@@ -32,26 +112,26 @@ def deactivate_user_service(user_id):
     :return: Status message indicating the deactivation.
     """
 
-    def deactivate_user_service(user_id):
-        try:
-            user = User.query.get(user_id)
-            if not user:
-                raise NotFoundError("User not found")
+    try:
+        user = User.query.get(user_id)
+        if not user:
+            raise NotFoundError("User not found")
 
-            if not user.is_active:
-                raise ValidationError(f"User {user_id} is already deactivated.")
+        if not user.is_active:
+            raise ValidationError(f"User {user_id} is already deactivated.")
 
-            user.is_active = False
-            db.session.commit()
-            logger.info(f"User {user_id} deactivated")
-            return {'status': 'success', 'message': f"User {user_id} deactivated successfully"}
-        except NotFoundError as e:
-            logger.warning(f"Deactivation failed: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Error deactivating user {user_id}: {str(e)}")
-            db.session.rollback()
-            raise ValidationError("Failed to deactivate user.")
+        user.is_active = False
+        db.session.commit()
+        user_state_cache.invalidate(user_id)
+        logger.info(f"User {user_id} deactivated")
+        return {'status': 'success', 'message': f"User {user_id} deactivated successfully"}
+    except NotFoundError as e:
+        logger.warning(f"Deactivation failed: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error deactivating user {user_id}: {str(e)}")
+        db.session.rollback()
+        raise ValidationError("Failed to deactivate user.")
 
 
 def activate_user_service(user_id):
@@ -68,6 +148,7 @@ def activate_user_service(user_id):
 
         user.is_active = True
         db.session.commit()
+        user_state_cache.invalidate(user_id)
         logger.info(f"User {user_id} activated")
         return {'status': 'success', 'message': f"User {user_id} activated successfully"}
     except NotFoundError as e:
@@ -79,26 +160,234 @@ def activate_user_service(user_id):
         raise ValidationError("Failed to activate user.")
 
 
-def view_user_logs_service(page=1, per_page=20):
+def revoke_user_tokens_service(user_id):
+    """
+    Log a user out everywhere by revoking all of their tokens.
+
+    :param user_id: ID of the user whose tokens are revoked.
+    :return: Status message indicating the revocation.
+    """
+    if not revoke_all_tokens_for_user(user_id):
+        raise NotFoundError("User not found")
+    return {'status': 'success', 'message': f"All tokens of user {user_id} revoked successfully"}
+
+
+def view_user_logs_service(limit=LOG_PAGE_SIZE, cursor=None, user_id=None, action=None, since=None, until=None,
+                           include_total=False, page=None):
     """
-    Retrieve user activity logs with pagination.
+    Retrieve user activity logs, newest first, with keyset pagination over (timestamp, id).
+    Pass the returned next_cursor to get the following page; the latency does not depend on the page depth.
 
-    :param page: The page number.
-    :param per_page: Number of logs per page.
-    :return: List of user activity logs.
+    :param limit: Number of logs per page (capped at LOG_PAGE_MAX_SIZE).
+    :param cursor: Cursor returned with the previous page (optional).
+    :param user_id: Only logs of this user (optional).
+    :param action: Only logs with this action (optional).
+    :param since: ISO 8601 start of the range, inclusive (optional).
+    :param until: ISO 8601 end of the range, exclusive (optional).
+    :param include_total: Also count the matching logs (costs a COUNT over the whole range).
+    :param page: Legacy page number, served with OFFSET pagination (deprecated, slow on deep pages).
+    :return: Dictionary with the logs, the next cursor and, if requested, the total.
     """
+    limit = max(1, min(limit or LOG_PAGE_SIZE, LOG_PAGE_MAX_SIZE))
+    query = Log.filtered(user_id=user_id, action=action, since=_parse_datetime(since, 'since'),
+                         until=_parse_datetime(until, 'until'))
     try:
-        logs = Log.query.paginate(page=page, per_page=per_page, error_out=False)
-        log_list = [
+        if page is not None and not cursor:
+            pagination = query.order_by(Log.timestamp.desc(), Log.id.desc()) \
+                .paginate(page=page, per_page=limit, error_out=False, count=False)
+            logs, next_cursor = pagination.items, None
+        else:
+            logs, next_cursor = keyset_paginate(query, (Log.timestamp, Log.id), limit, cursor=cursor)
+        result = {'logs': [log.to_dict() for log in logs], 'next_cursor': next_cursor}
+        if include_total:
+            result['total'] = query.order_by(None).count()
+        logger.info(f"Retrieved {len(logs)} logs")
+        return result
+    except ValidationError:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving logs: {str(e)}")
+        raise ValidationError("Failed to retrieve logs.")
+
+
+def export_logs_service(fmt='ndjson', compress=False, user_id=None, action=None, since=None, until=None):
+    """
+    Stream every log matching the filters as NDJSON or CSV, in id order.
+    Rows are read through a server-side cursor and written as they come, so memory stays flat.
+
+    :param fmt: "ndjson" or "csv".
+    :param compress: Send the export as a gzip file (application/gzip).
+    :param user_id: Only logs of this user (optional).
+    :param action: Only logs with this action (optional).
+    :param since: ISO 8601 start of the range, inclusive (optional).
+    :param until: ISO 8601 end of the range, exclusive (optional).
+    :return: A streamed Flask response.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError(f"Invalid export format, expected one of: {', '.join(EXPORT_FORMATS)}.")
+    query = Log.filtered(user_id=user_id, action=action, since=_parse_datetime(since, 'since'),
+                         until=_parse_datetime(until, 'until'))
+
+    # Sent as a .gz file rather than with Content-Encoding, which clients would decode on the fly
+    filename = f"logs-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}{'.gz' if compress else ''}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    logger.info(f"Exporting logs as {fmt}{' (gzip)' if compress else ''}")
+    return Response(stream_with_context(export_logs(query, fmt=fmt, compress=compress)),
+                    mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt], headers=headers)
+
+
+def get_action_stats_service(granularity='day', action=None, since=None, until=None):
+    """
+    Count log entries per action and day (or hour), read from the rollup tables.
+
+    :param granularity: "day" or "hour".
+    :param action: Only this action (optional).
+    :param since: ISO 8601 start of the range, inclusive (optional).
+    :param until: ISO 8601 end of the range, exclusive (optional).
+    :return: List of counts per action and period.
+    """
+    if granularity not in ('day', 'hour'):
+        raise ValidationError("Invalid granularity, expected day or hour.")
+    since = _parse_datetime(since, 'since')
+    until = _parse_datetime(until, 'until')
+    try:
+        if granularity == 'day':
+            period = LogDailyRollup.day
+            query = db.session.query(LogDailyRollup.action, period, LogDailyRollup.count.label('count'))
+            model = LogDailyRollup
+            since, until = since.date() if since else None, until.date() if until else None
+        else:
+            period = LogHourlyRollup.hour
+            query = db.session.query(LogHourlyRollup.action, period, db.func.sum(LogHourlyRollup.count).label('count')) \
+                .group_by(LogHourlyRollup.action, period)
+            model = LogHourlyRollup
+        if action:
+            query = query.filter(model.action == action)
+        if since is not None:
+            query = query.filter(period >= since)
+        if until is not None:
+            query = query.filter(period < until)
+        rows = query.order_by(period, model.action).all()
+        return [{'action': row[0], granularity: row[1], 'count': int(row[2])} for row in rows]
+    except Exception as e:
+        logger.error(f"Error retrieving action statistics: {str(e)}")
+        raise ValidationError("Failed to retrieve action statistics.")
+
+
+def get_user_activity_stats_service(action=None, since=None, until=None, limit=20):
+    """
+    Rank users by number of log entries, read from the hourly rollup table.
+
+    :param action: Only count this action (optional).
+    :param since: ISO 8601 start of the range, inclusive (optional).
+    :param until: ISO 8601 end of the range, exclusive (optional).
+    :param limit: Number of users returned (capped at 100).
+    :return: List of users with their number of log entries, most active first.
+    """
+    since = _parse_datetime(since, 'since')
+    until = _parse_datetime(until, 'until')
+    try:
+        total = db.func.sum(LogHourlyRollup.count).label('count')
+        query = db.session.query(LogHourlyRollup.user_id, total)
+        if action:
+            query = query.filter(LogHourlyRollup.action == action)
+        if since is not None:
+            query = query.filter(LogHourlyRollup.hour >= since)
+        if until is not None:
+            query = query.filter(LogHourlyRollup.hour < until)
+        rows = query.group_by(LogHourlyRollup.user_id).order_by(total.desc()) \
+            .limit(max(1, min(limit or 20, 100))).all()
+        return [{'user_id': row.user_id, 'count': int(row.count)} for row in rows]
+    except Exception as e:
+        logger.error(f"Error retrieving user activity statistics: {str(e)}")
+        raise ValidationError("Failed to retrieve user activity statistics.")
+
+
+def get_dashboard_stats_service():
+    """
+    Summarize the activity of the last 24 hours from the hourly rollup table.
+
+    :return: Dictionary of counts per action.
+    """
+    try:
+        since = (datetime.now(timezone.utc) - timedelta(hours=24)).replace(tzinfo=None)
+        rows = db.session.query(LogHourlyRollup.action, db.func.sum(LogHourlyRollup.count)) \
+            .filter(LogHourlyRollup.hour >= since).group_by(LogHourlyRollup.action).all()
+        return {'last_24_hours': {action: int(count) for action, count in rows}}
+    except Exception as e:
+        logger.error(f"Error retrieving dashboard statistics: {str(e)}")
+        return {}
+
+
+def get_log_retention_service():
+    """
+    Retrieve the settings, progress and recent run statistics of the log retention job.
+
+    :return: Dictionary of retention statistics.
+    """
+    try:
+        return retention_stats()
+    except Exception as e:
+        logger.error(f"Error retrieving log retention statistics: {str(e)}")
+        raise ValidationError("Failed to retrieve log retention statistics.")
+
+
+def get_hashing_metrics_service():
+    """
+    Retrieve the load and timing metrics of the password hashing pool.
+
+    :return: Dictionary of pool metrics.
+    """
+    return password_hash_pool.stats()
+
+
+def get_api_key_usage_service(api_key_id=None, user_id=None, since=None, until=None):
+    """
+    Retrieve API key usage aggregated per key and endpoint over a time range.
+    Counters still pending in the usage meter are not included.
+
+    :param api_key_id: Only report this API key (optional).
+    :param user_id: Only report the keys of this user (optional).
+    :param since: ISO 8601 start of the range, inclusive (optional).
+    :param until: ISO 8601 end of the range, exclusive (optional).
+    :return: List of usage totals.
+    """
+    since = _parse_datetime(since, 'since')
+    until = _parse_datetime(until, 'until')
+    try:
+        query = db.session.query(
+            ApiKeyUsage.api_key_id,
+            ApiKeyUsage.user_id,
+            ApiKeyUsage.endpoint,
+            db.func.sum(ApiKeyUsage.request_count).label('request_count'),
+            db.func.sum(ApiKeyUsage.bytes_in).label('bytes_in'),
+            db.func.sum(ApiKeyUsage.bytes_out).label('bytes_out'),
+            db.func.sum(ApiKeyUsage.latency_ms_sum).label('latency_ms_sum')
+        )
+        if api_key_id is not None:
+            query = query.filter(ApiKeyUsage.api_key_id == api_key_id)
+        if user_id is not None:
+            query = query.filter(ApiKeyUsage.user_id == user_id)
+        if since is not None:
+            query = query.filter(ApiKeyUsage.hour >= since)
+        if until is not None:
+            query = query.filter(ApiKeyUsage.hour < until)
+        rows = query.group_by(ApiKeyUsage.api_key_id, ApiKeyUsage.user_id, ApiKeyUsage.endpoint) \
+            .order_by(ApiKeyUsage.api_key_id, ApiKeyUsage.endpoint).all()
+        usage = [
             {
-                'user_id': log.user_id,
-                'action': log.action,
-                'timestamp': log.timestamp.isoformat()
+                'api_key_id': row.api_key_id,
+                'user_id': row.user_id,
+                'endpoint': row.endpoint,
+                'request_count': int(row.request_count),
+                'bytes_in': int(row.bytes_in),
+                'bytes_out': int(row.bytes_out),
+                'avg_latency_ms': round(row.latency_ms_sum / row.request_count, 2) if row.request_count else 0
             }
-            for log in logs.items
+            for row in rows
         ]
-        logger.info(f"Retrieved {len(log_list)} logs")
-        return log_list
+        logger.info(f"Retrieved {len(usage)} API key usage rows")
+        return usage
     except Exception as e:
-        logger.error(f"Error retrieving logs: {str(e)}")
-        raise ValidationError("Failed to retrieve logs.")
+        logger.error(f"Error retrieving API key usage: {str(e)}")
+        raise ValidationError("Failed to retrieve API key usage.")
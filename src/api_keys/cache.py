@@ -0,0 +1,68 @@
+import logging
+import os
+import time
+
+from src.utils.cache import TTLCache
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Seconds a valid API key is trusted without going back to the database
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', 60))
+# Seconds an unknown API key is remembered as unknown
+API_KEY_NEGATIVE_CACHE_TTL = int(os.getenv('API_KEY_NEGATIVE_CACHE_TTL', 10))
+API_KEY_CACHE_SIZE = int(os.getenv('API_KEY_CACHE_SIZE', 50000))
+
+# Cached marker for keys that do not exist or have expired
+_UNKNOWN_KEY = {}
+
+
+class ApiKeyCache:
+    """
+    TTL cache of API key lookups, keyed by key digest, including negative entries
+    for unknown keys, so that machine clients do not cost one SELECT per call.
+
+    Deleting a key invalidates it in the current worker immediately; other workers
+    stop accepting it once their entry expires (API_KEY_CACHE_TTL).
+    """
+
+    def __init__(self, maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL, negative_ttl=API_KEY_NEGATIVE_CACHE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(maxsize=maxsize)
+
+    def get(self, key):
+        """
+        :param key: The API key digest.
+        :return: The cached key details, _UNKNOWN_KEY for a known miss, or None if not cached.
+        """
+        return self._cache.get(key)
+
+    def set_found(self, key, details, expires_at):
+        """
+        Cache a valid key until its TTL, or its own expiry if sooner.
+
+        :param key: The API key digest.
+        :param details: Dictionary describing the key (id, user_id...).
+        :param expires_at: Expiry of the key in epoch seconds.
+        """
+        self._cache.set(key, details, expires_at=min(time.time() + self.ttl, expires_at))
+
+    def set_missing(self, key):
+        """
+        Remember that a key does not exist or has expired.
+        """
+        self._cache.set(key, _UNKNOWN_KEY, ttl=self.negative_ttl)
+
+    def invalidate(self, key):
+        self._cache.pop(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def is_unknown(entry):
+    return entry is _UNKNOWN_KEY
+
+
+api_key_cache = ApiKeyCache()
@@ -1,7 +1,7 @@
 from flask import jsonify
 from flask_jwt_extended import jwt_required
 from src.api_keys.services import *
-from src.middlewares.decorators import handle_exceptions
+from src.middlewares.decorators import handle_exceptions, conditional_get, cached_response
 
 # Logger configuration
 logger = logging.getLogger(__name__)
@@ -20,6 +20,8 @@ def generate_api_key():
 
 @jwt_required()
 @handle_exceptions
+@conditional_get('api_key_model', per_user=True)
+@cached_response('api_key_model', per_user=True)
 def get_user_api_keys():
     """
     Get all API keys associated with the current user.
@@ -31,13 +33,13 @@ def get_user_api_keys():
 
 @jwt_required()
 @handle_exceptions
-def delete_api_key(api_key):
+def delete_api_key(key_id):
     """
     Delete an API key for the current user.
-    :param api_key: The API key to delete.
+    :param key_id: The ID of the API key to delete.
     :return: JSON response indicating success or failure.
     """
-    response = delete_api_key_service(api_key)
+    response = delete_api_key_service(key_id)
     return jsonify(response), 200
 
 
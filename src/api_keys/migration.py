@@ -0,0 +1,83 @@
+import logging
+import os
+
+import click
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from src import db
+from src.api_keys.models import ApiKeyModel, hash_api_key, API_KEY_PREFIX_LENGTH
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Rows converted per transaction by the plaintext key migration
+API_KEY_MIGRATION_BATCH_SIZE = int(os.getenv('API_KEY_MIGRATION_BATCH_SIZE', 1000))
+
+
+def hash_plaintext_api_keys(batch_size=API_KEY_MIGRATION_BATCH_SIZE):
+    """
+    Migrate an api_key_model table still holding keys in clear (the former `key` column)
+    to the prefix + SHA-256 digest layout, without invalidating any key.
+
+    The new columns are added as nullable, filled in batches from the plaintext keys, then
+    made NOT NULL and indexed before the plaintext column is dropped. Alembic batch operations
+    keep the schema changes portable (SQLite rebuilds the table, MySQL alters it in place).
+    Running it again on a migrated table does nothing.
+
+    :param batch_size: Rows converted per transaction.
+    :return: Number of keys converted.
+    """
+    table = ApiKeyModel.__tablename__
+    columns = {column['name'] for column in db.inspect(db.engine).get_columns(table)}
+    if 'key' not in columns:
+        logger.info(f"{table} holds no plaintext keys, nothing to migrate")
+        return 0
+
+    with db.engine.begin() as connection:
+        with Operations(MigrationContext.configure(connection)).batch_alter_table(table) as batch:
+            if 'prefix' not in columns:
+                batch.add_column(db.Column('prefix', db.CHAR(API_KEY_PREFIX_LENGTH), nullable=True))
+            if 'key_hash' not in columns:
+                batch.add_column(db.Column('key_hash', db.CHAR(64), nullable=True))
+
+    legacy = db.Table(table, db.MetaData(), autoload_with=db.engine)
+    converted = 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(
+                db.select(legacy.c.id, legacy.c.key).where(legacy.c.key_hash.is_(None)).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            connection.execute(
+                db.update(legacy).where(legacy.c.id == db.bindparam('row_id')),
+                [{'row_id': row_id, 'prefix': key[:API_KEY_PREFIX_LENGTH], 'key_hash': hash_api_key(key)}
+                 for row_id, key in rows]
+            )
+        converted += len(rows)
+        logger.info(f"{converted} API keys hashed")
+
+    indexes = {index['name'] for index in db.inspect(db.engine).get_indexes(table)}
+    with db.engine.begin() as connection:
+        with Operations(MigrationContext.configure(connection)).batch_alter_table(table) as batch:
+            batch.alter_column('prefix', existing_type=db.CHAR(API_KEY_PREFIX_LENGTH), nullable=False)
+            batch.alter_column('key_hash', existing_type=db.CHAR(64), nullable=False)
+            if 'ix_api_key_model_key' in indexes:
+                batch.drop_index('ix_api_key_model_key')
+            batch.drop_column('key')
+            batch.create_index('ix_api_key_model_prefix_key_hash', ['prefix', 'key_hash'], unique=True)
+
+    logger.info(f"Plaintext API key column dropped, {converted} keys migrated")
+    return converted
+
+
+@click.command('hash-api-keys')
+@click.option('--batch-size', default=API_KEY_MIGRATION_BATCH_SIZE, show_default=True,
+              help='Rows converted per transaction.')
+def hash_api_keys_command(batch_size):
+    """
+    Replace the plaintext API keys by their prefix and SHA-256 digest.
+    """
+    converted = hash_plaintext_api_keys(batch_size)
+    click.echo(f"{converted} API keys migrated.")
@@ -1,24 +1,54 @@
+import hashlib
+import hmac
 import uuid
 from src import db
 import logging
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.exc import SQLAlchemyError
+from src.api_keys.cache import api_key_cache
 from src.exceptions import ValidationError
 
 # Logger configuration
 logger = logging.getLogger(__name__)
 
 
+# Number of leading characters of a key stored in clear and shown in listings
+API_KEY_PREFIX_LENGTH = 8
+
+
+def mask_api_key(key):
+    """
+    Shorten an API key for logging, so that log lines never contain a usable key.
+    """
+    return f"{key[:API_KEY_PREFIX_LENGTH]}..." if key else key
+
+
+def hash_api_key(key):
+    """
+    Digest under which an API key is stored and looked up.
+    :param key: The full API key.
+    :return: Hex-encoded SHA-256 digest (64 characters).
+    """
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
 class ApiKeyModel(db.Model):
     """
     Model for storing API keys associated with users.
+    Only a short public prefix and the SHA-256 digest of each key are stored;
+    the full key is known only when it is generated.
     """
     id = db.Column(db.Integer, primary_key=True)
-    key = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    prefix = db.Column(db.CHAR(API_KEY_PREFIX_LENGTH), nullable=False)  # Public part of the key, shown in listings
+    key_hash = db.Column(db.CHAR(64), nullable=False)  # SHA-256 digest of the full key
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     expires_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc) + timedelta(days=365))
 
+    __table_args__ = (
+        db.Index('ix_api_key_model_prefix_key_hash', 'prefix', 'key_hash', unique=True),
+    )
+
     def __init__(self, user_id, valid_for_days=365):
         """
         Initialize the API key with a unique value, associate it with a user, and set the expiration date.
@@ -26,7 +56,9 @@ class ApiKeyModel(db.Model):
         :param user_id: ID of the user who owns the API key.
         :param valid_for_days: Number of days for which the API key will be valid (default: 30 days).
         """
-        self.key = str(uuid.uuid4())  # Generate a unique API key
+        self.key = str(uuid.uuid4())  # Generate a unique API key, only kept on this instance
+        self.prefix = self.key[:API_KEY_PREFIX_LENGTH]
+        self.key_hash = hash_api_key(self.key)
         self.user_id = user_id
         self.created_at = datetime.now(timezone.utc)
         self.expires_at = self.created_at + timedelta(days=valid_for_days)
@@ -38,7 +70,7 @@ class ApiKeyModel(db.Model):
         try:
             db.session.add(self)
             db.session.commit()
-            logger.info(f"API key {self.key} created for user {self.user_id}, expires at {self.expires_at}")
+            logger.info(f"API key {self.prefix}... created for user {self.user_id}, expires at {self.expires_at}")
         except SQLAlchemyError as e:
             logger.error(f"Error saving API key: {str(e)}")
             db.session.rollback()
@@ -51,7 +83,8 @@ class ApiKeyModel(db.Model):
         try:
             db.session.delete(self)
             db.session.commit()
-            logger.info(f"API key {self.key} deleted for user {self.user_id}")
+            api_key_cache.invalidate(self.key_hash)
+            logger.info(f"API key {self.prefix}... deleted for user {self.user_id}")
         except SQLAlchemyError as e:
             logger.error(f"Error deleting API key: {str(e)}")
             db.session.rollback()
@@ -62,24 +95,44 @@ class ApiKeyModel(db.Model):
         Check if the API key is expired.
         :return: True if the API key is expired, False otherwise.
         """
-        return datetime.now(timezone.utc) > self.expires_at
+        expires_at = self.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)  # Stored as naive UTC
+        return datetime.now(timezone.utc) > expires_at
+
+    @classmethod
+    def lookup(cls, key, **filters):
+        """
+        Find the row of an API key by its public prefix, then compare digests in constant time,
+        so that response times do not reveal how much of a guessed digest matched.
+        :param key: The full API key.
+        :param filters: Extra column filters (e.g. user_id).
+        :return: The ApiKeyModel instance if found, None otherwise.
+        """
+        key_hash = hash_api_key(key)
+        for candidate in cls.query.filter_by(prefix=key[:API_KEY_PREFIX_LENGTH], **filters):
+            if hmac.compare_digest(candidate.key_hash, key_hash):
+                return candidate
+        return None
 
     @classmethod
     def find_by_key(cls, key):
         """
-        Find an API key by its value.
+        Find an API key by its value, through the prefix index and a constant-time digest compare.
         :param key: The API key to find.
         :return: The ApiKeyModel instance if found, None otherwise.
+        :raises SQLAlchemyError: If the lookup fails, so that the failure is not mistaken for an unknown key.
         """
         try:
-            api_key = cls.query.filter_by(key=key).first()
-            if api_key and not api_key.is_expired():
-                return api_key
-            logger.warning(f"API key {key} is expired or does not exist.")
-            return None
+            api_key = cls.lookup(key)
         except SQLAlchemyError as e:
             logger.error(f"Error finding API key: {str(e)}")
-            return None
+            db.session.rollback()
+            raise
+        if api_key and not api_key.is_expired():
+            return api_key
+        logger.warning(f"API key {mask_api_key(key)} is expired or does not exist.")
+        return None
 
     @classmethod
     def find_by_user_id(cls, user_id):
@@ -95,4 +148,39 @@ class ApiKeyModel(db.Model):
             return []
 
     def __repr__(self):
-        return f"ApiKeyModel(key='{self.key}', user_id={self.user_id}, expires_at={self.expires_at})"
+        return f"ApiKeyModel(prefix='{self.prefix}', user_id={self.user_id}, expires_at={self.expires_at})"
+
+
+class ApiKeyUsage(db.Model):
+    """
+    Aggregated usage of an API key, one row per key, endpoint and hour.
+    Rows are written in batches by the usage meter, never on the request path.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    api_key_id = db.Column(db.Integer, nullable=False)  # Kept without a foreign key so usage outlives deleted keys
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    endpoint = db.Column(db.String(255), nullable=False)  # HTTP method and URL rule, e.g. "GET /api/keys/all"
+    hour = db.Column(db.DateTime, nullable=False, index=True)  # Start of the hour (UTC)
+    request_count = db.Column(db.BigInteger, nullable=False, default=0)
+    bytes_in = db.Column(db.BigInteger, nullable=False, default=0)
+    bytes_out = db.Column(db.BigInteger, nullable=False, default=0)
+    latency_ms_sum = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('api_key_id', 'endpoint', 'hour', name='uq_api_key_usage_key_endpoint_hour'),
+    )
+
+    def to_dict(self):
+        return {
+            'api_key_id': self.api_key_id,
+            'user_id': self.user_id,
+            'endpoint': self.endpoint,
+            'hour': self.hour,
+            'request_count': self.request_count,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'latency_ms_sum': self.latency_ms_sum
+        }
+
+    def __repr__(self):
+        return f"ApiKeyUsage(api_key_id={self.api_key_id}, endpoint='{self.endpoint}', hour={self.hour}, request_count={self.request_count})"
@@ -1,6 +1,7 @@
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.api_keys.services import *
+from src.middlewares.decorators import conditional_get, cached_response
 import logging
 
 # Logger configuration
@@ -21,7 +22,7 @@ response_model = api_keys_ns.model('Response', {
 
 api_key_list_model = api_keys_ns.model('APIKeyList', {
     'status': fields.String(description='Status of the response'),
-    'api_keys': fields.List(fields.String, description='List of API keys')
+    'api_keys': fields.List(fields.Raw, description='List of API keys (id, prefix, created_at, expires_at)')
 })
 
 
@@ -33,7 +34,7 @@ class GenerateApiKey(Resource):
     @api_keys_ns.response(500, 'Failed to generate API key')
     def post(self):
         """
-        Generate a new API key for the current user
+        Generate a new API key for the current user (the full key is only shown once)
         """
         current_user = get_jwt_identity()
         response = generate_api_key_service()
@@ -44,7 +45,10 @@ class GenerateApiKey(Resource):
 @api_keys_ns.route('/all')
 class GetUserApiKeys(Resource):
     @jwt_required()
+    @conditional_get('api_key_model', per_user=True)
+    @cached_response('api_key_model', per_user=True)
     @api_keys_ns.response(200, 'Successfully retrieved API keys', api_key_list_model)
+    @api_keys_ns.response(304, 'Not modified since the ETag in If-None-Match')
     @api_keys_ns.response(500, 'Failed to retrieve API keys')
     def get(self):
         """
@@ -56,16 +60,15 @@ class GetUserApiKeys(Resource):
 
 
 # Delete API Key Resource
-@api_keys_ns.route('/<string:api_key>')
+@api_keys_ns.route('/<int:key_id>')
 class DeleteApiKey(Resource):
     @jwt_required()
     @api_keys_ns.response(200, 'API key successfully deleted', response_model)
     @api_keys_ns.response(404, 'API key not found')
     @api_keys_ns.response(500, 'Failed to delete API key')
-    def delete(self, api_key):
+    def delete(self, key_id):
         """
-        Delete an API key by its value
+        Delete an API key by its ID, as returned by the listing
         """
         current_user = get_jwt_identity()
-        delete_api_key_service(api_key, current_user.get('user_id'))
-        return {'status': 'success', 'message': 'API key successfully deleted'}, 200
+        return delete_api_key_service(key_id, current_user.get('user_id')), 200
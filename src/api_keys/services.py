@@ -1,9 +1,12 @@
 from flask_jwt_extended import get_jwt_identity
 
-from src.api_keys.models import ApiKeyModel
+from src.api_keys.cache import api_key_cache, is_unknown
+from src.api_keys.models import ApiKeyModel, mask_api_key, hash_api_key
 from src.exceptions import NotFoundError, ValidationError
 import logging
-from datetime import datetime, timezone
+import time
+import uuid
+from datetime import timezone
 
 # Logger configuration
 logger = logging.getLogger(__name__)
@@ -11,6 +14,7 @@ logger = logging.getLogger(__name__)
 def generate_api_key_service():
     """
     Generate a new API key for the current user.
+    This is the only time the full key is returned, since only its digest is stored.
 
     :return: Dictionary containing the new API key.
     """
@@ -22,7 +26,7 @@ def generate_api_key_service():
 
         new_api_key = ApiKeyModel(user_id=current_user_id)
         new_api_key.save()
-        logger.info(f"API key generated for user_id {current_user_id}: {new_api_key.key}")
+        logger.info(f"API key generated for user_id {current_user_id}: {mask_api_key(new_api_key.key)}")
         return {'api_key': new_api_key.key}
     except Exception as e:
         logger.error(f"Error generating API key: {str(e)}")
@@ -37,12 +41,12 @@ def validate_api_key_service(api_key, user_id):
     :return: True if the API key belongs to the user, False otherwise.
     """
     try:
-        api_key_record = ApiKeyModel.query.filter_by(key=api_key, user_id=user_id).first()
+        api_key_record = ApiKeyModel.lookup(api_key, user_id=user_id)
         if not api_key_record:
             raise NotFoundError("API key not found for the given user")
 
         # Check if the key has expired
-        if api_key_record.expires_at and api_key_record.expires_at < datetime.now(timezone.utc):
+        if api_key_record.expires_at and api_key_record.is_expired():
             raise ValidationError("API key has expired")
 
         return True
@@ -50,46 +54,58 @@ def validate_api_key_service(api_key, user_id):
         logger.error(f"Error validating API key: {str(e)}")
         raise
 
-def get_user_api_keys_service():
+def get_user_api_keys_service(user_id=None):
     """
     Get all API keys associated with the current user.
+    Keys are identified by their public prefix, the full keys are not stored.
 
+    :param user_id: ID of the user (defaults to the user of the JWT token).
     :return: Dictionary containing the list of API keys.
     """
     try:
-        current_user = get_jwt_identity()
-        current_user_id = current_user.get('user_id')
+        current_user_id = user_id or get_jwt_identity().get('user_id')
         if not current_user_id:
             raise ValidationError("User identity not found in JWT token")
 
         api_keys = ApiKeyModel.query.filter_by(user_id=current_user_id).all()
-        keys = [{'key': api_key.key, 'expires_at': api_key.expires_at} for api_key in api_keys]
+        keys = [
+            {
+                'id': api_key.id,
+                'prefix': api_key.prefix,
+                'created_at': api_key.created_at,
+                'expires_at': api_key.expires_at
+            }
+            for api_key in api_keys
+        ]
         logger.info(f"Retrieved {len(keys)} API keys for user_id {current_user_id}")
         return {'api_keys': keys}
     except Exception as e:
         logger.error(f"Error retrieving API keys: {str(e)}")
         raise
 
-def delete_api_key_service(api_key):
+def delete_api_key_service(key_id, user_id=None):
     """
-    Delete an API key for the current user.
+    Delete an API key of the current user by its ID, as shown in the listing,
+    so that a lost or leaked key can be revoked without knowing its value.
 
-    :param api_key: The API key to delete.
+    :param key_id: ID of the API key to delete.
+    :param user_id: ID of the user (defaults to the user of the JWT token).
     :return: Dictionary indicating success or failure.
     """
     try:
-        current_user = get_jwt_identity()
-        current_user_id = current_user.get('user_id')
+        current_user_id = user_id or get_jwt_identity().get('user_id')
         if not current_user_id:
             raise ValidationError("User identity not found in JWT token")
 
-        api_key_record = ApiKeyModel.query.filter_by(key=api_key, user_id=current_user_id).first()
+        # Keys of other users are reported as missing, not as forbidden
+        api_key_record = ApiKeyModel.query.filter_by(id=key_id, user_id=current_user_id).first()
         if not api_key_record:
             raise NotFoundError("API key not found for the given user")
 
+        prefix = api_key_record.prefix
         api_key_record.delete()
-        logger.info(f"API key {api_key} deleted for user_id {current_user_id}")
-        return {'status': 'success', 'message': f"API key {api_key} deleted successfully"}
+        logger.info(f"API key {prefix}... deleted for user_id {current_user_id}")
+        return {'status': 'success', 'message': f"API key {prefix}... deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting API key: {str(e)}")
         raise
@@ -102,11 +118,10 @@ def verify_api_key_service(api_key):
     :return: Dictionary indicating if the key is valid.
     """
     try:
-        api_key_record = ApiKeyModel.find_by_key(api_key)
-        if not api_key_record or (api_key_record.expires_at and api_key_record.expires_at < datetime.now(timezone.utc)):
+        if authenticate_api_key(api_key) is None:
             raise NotFoundError("API key is either invalid or expired.")
 
-        logger.info(f"API key {api_key} is valid.")
+        logger.info(f"API key {mask_api_key(api_key)} is valid.")
         return {"status": "success", "message": "API key is valid."}
     except NotFoundError as e:
         logger.warning(f"API key verification failed: {str(e)}")
@@ -114,3 +129,49 @@ def verify_api_key_service(api_key):
     except Exception as e:
         logger.error(f"Error verifying API key: {str(e)}")
         raise
+
+
+def is_well_formed_api_key(api_key):
+    """
+    Cheap syntax check run before any lookup: API keys are canonical UUID strings.
+
+    :param api_key: The API key to check.
+    :return: True if the key has the expected format, False otherwise.
+    """
+    if not isinstance(api_key, str) or len(api_key) != 36:
+        return False
+    try:
+        return str(uuid.UUID(api_key)) == api_key.lower()
+    except ValueError:
+        return False
+
+
+def authenticate_api_key(api_key):
+    """
+    Resolve an API key to its owner, going through the API key cache (keyed by digest).
+    Malformed keys are rejected without any lookup, and unknown keys are cached as such.
+    A failed lookup caches nothing and raises, so a database outage is not turned into 401s.
+
+    :param api_key: The API key presented by the client.
+    :return: Dictionary with the key 'id' and 'user_id', or None if the key is invalid or expired.
+    :raises SQLAlchemyError: If the key cannot be looked up.
+    """
+    if not is_well_formed_api_key(api_key):
+        return None
+
+    key_hash = hash_api_key(api_key)
+    entry = api_key_cache.get(key_hash)
+    if entry is None:
+        api_key_record = ApiKeyModel.find_by_key(api_key)
+        if api_key_record is None:
+            api_key_cache.set_missing(key_hash)
+            return None
+        expires_at = api_key_record.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)  # Stored as naive UTC
+        entry = {'id': api_key_record.id, 'user_id': api_key_record.user_id, 'expires_at': expires_at.timestamp()}
+        api_key_cache.set_found(key_hash, entry, entry['expires_at'])
+
+    if is_unknown(entry) or entry['expires_at'] <= time.time():
+        return None
+    return entry
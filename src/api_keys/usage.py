@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+from src.extensions import db
+from src.api_keys.models import ApiKeyUsage
+from src.utils.db import upsert_increment
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Seconds between two flushes of the usage counters (0 disables metering)
+API_KEY_USAGE_FLUSH_INTERVAL = int(os.getenv('API_KEY_USAGE_FLUSH_INTERVAL', 30))
+# Rows written per upsert statement
+API_KEY_USAGE_FLUSH_BATCH_SIZE = int(os.getenv('API_KEY_USAGE_FLUSH_BATCH_SIZE', 500))
+# Pending counters kept in memory when the database is unavailable; beyond that usage is dropped
+API_KEY_USAGE_MAX_PENDING = int(os.getenv('API_KEY_USAGE_MAX_PENDING', 100000))
+
+_KEY_COLUMNS = ('api_key_id', 'endpoint', 'hour')
+_COUNTER_COLUMNS = ('request_count', 'bytes_in', 'bytes_out', 'latency_ms_sum')
+
+
+def current_hour():
+    """
+    :return: The start of the current hour, as a naive UTC datetime like the stored rows.
+    """
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+class UsageMeter:
+    """
+    In-memory usage counters per API key, endpoint and hour, written behind to the
+    api_key_usage table in batched upserts. Recording a request only updates a dictionary,
+    so metering adds no database write to the request path.
+    """
+
+    def __init__(self, batch_size=API_KEY_USAGE_FLUSH_BATCH_SIZE, max_pending=API_KEY_USAGE_MAX_PENDING):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def record(self, api_key_id, user_id, endpoint, bytes_in=0, bytes_out=0, latency_ms=0.0, hour=None):
+        """
+        Count one request made with an API key.
+
+        :param api_key_id: ID of the API key.
+        :param user_id: ID of the owner of the key.
+        :param endpoint: Method and URL rule of the request.
+        :param bytes_in: Size of the request body.
+        :param bytes_out: Size of the response body.
+        :param latency_ms: Time spent handling the request, in milliseconds.
+        :param hour: Hour the request is accounted to (defaults to the current hour).
+        """
+        key = (api_key_id, endpoint, hour or current_hour())
+        with self._lock:
+            counters = self._counters.get(key)
+            if counters is None:
+                if len(self._counters) >= self.max_pending:
+                    self.dropped += 1
+                    return
+                counters = self._counters[key] = [user_id, 0, 0, 0, 0.0]
+            counters[1] += 1
+            counters[2] += bytes_in
+            counters[3] += bytes_out
+            counters[4] += latency_ms
+
+    def pending(self):
+        with self._lock:
+            return len(self._counters)
+
+    def _merge_back(self, counters):
+        # Keep the counters of a failed flush for the next one
+        with self._lock:
+            for key, values in counters.items():
+                current = self._counters.get(key)
+                if current is None:
+                    if len(self._counters) >= self.max_pending:
+                        self.dropped += values[1]
+                        continue
+                    self._counters[key] = values
+                else:
+                    for i in range(1, 5):
+                        current[i] += values[i]
+
+    def flush(self):
+        """
+        Write the pending counters to the database, adding them to the existing rows.
+        Must run inside an app context. On failure the counters are kept for the next flush.
+
+        :return: Number of rows written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                counters, self._counters = self._counters, {}
+            if not counters:
+                return 0
+
+            rows = [
+                {
+                    'api_key_id': api_key_id,
+                    'endpoint': endpoint,
+                    'hour': hour,
+                    'user_id': values[0],
+                    'request_count': values[1],
+                    'bytes_in': values[2],
+                    'bytes_out': values[3],
+                    'latency_ms_sum': values[4]
+                }
+                for (api_key_id, endpoint, hour), values in counters.items()
+            ]
+            try:
+                for start in range(0, len(rows), self.batch_size):
+                    upsert_increment(ApiKeyUsage, rows[start:start + self.batch_size], _KEY_COLUMNS,
+                                     _COUNTER_COLUMNS)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error flushing API key usage ({len(rows)} rows kept for retry): {str(e)}")
+                db.session.rollback()
+                self._merge_back(counters)
+                return 0
+
+            if self.dropped:
+                logger.warning(f"{self.dropped} API key requests were not metered (too many pending counters)")
+                self.dropped = 0
+            logger.debug(f"Flushed {len(rows)} API key usage rows")
+            return len(rows)
+
+
+usage_meter = UsageMeter()
+
+
+def record_request_usage(bytes_out, latency_ms):
+    """
+    Meter the current request if it was made with an API key (g.api_key).
+
+    :param bytes_out: Size of the response body.
+    :param latency_ms: Time spent handling the request, in milliseconds.
+    """
+    api_key = g.get('api_key')
+    if api_key is None or request.url_rule is None:
+        return
+    try:
+        usage_meter.record(
+            api_key['id'],
+            api_key['user_id'],
+            f"{request.method} {request.url_rule.rule}",
+            bytes_in=request.content_length or 0,
+            bytes_out=bytes_out,
+            latency_ms=latency_ms
+        )
+    except Exception as e:
+        logger.error(f"Error recording API key usage: {str(e)}")
+
+
+def defer_request_usage():
+    """
+    Leave the metering of the current request to the code streaming its response, which
+    knows the bytes sent and the duration only once the stream ends (record_request_usage).
+    """
+    g.usage_deferred = True
+
+
+def request_latency_ms():
+    """
+    :return: Time elapsed since the start of the current request, in milliseconds.
+    """
+    return (time.perf_counter() - g.get('request_started_at', time.perf_counter())) * 1000
+
+
+def init_usage_metering(app):
+    """
+    Register the request hooks feeding the usage meter. Only requests authenticated
+    with an API key (g.api_key, set by api_key_required) are metered.
+
+    :param app: The Flask app.
+    """
+
+    @app.before_request
+    def start_usage_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_api_key_usage(response):
+        if g.get('api_key') is None or g.get('usage_deferred'):
+            return response
+        record_request_usage(response.calculate_content_length() or 0, request_latency_ms())
+        return response
@@ -1,7 +1,10 @@
 import logging
 from flask import jsonify
+from flask_jwt_extended.exceptions import JWTExtendedException, NoAuthorizationError, CSRFError, RevokedTokenError, \
+    FreshTokenRequired, UserLookupError, UserClaimsVerificationError
+from jwt.exceptions import PyJWTError, ExpiredSignatureError
 from src.exceptions import ValidationError, UnauthorizedError, NotFoundError, AppErrorBaseClass, ConflictError, \
-    JWTDecodeError, TokenExpiredError, InvalidTokenError
+    JWTDecodeError, TokenExpiredError, InvalidTokenError, TooManyRequestsError, ServiceUnavailableError
 from src.utils.alerts import send_email_alert
 
 logger = logging.getLogger(__name__)
@@ -42,6 +45,19 @@ def handle_invalid_token_error(error):
     return jsonify({'status': 'failed', 'message': error.message}), error.status_code
 
 
+def error_headers(error):
+    """
+    Build the extra response headers for an application error (e.g. Retry-After).
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    return {'Retry-After': str(retry_after)} if retry_after is not None else {}
+
+
+def handle_capacity_error(error):
+    logger.warning(f"Capacity Error: {str(error)}")
+    return jsonify({'status': 'failed', 'message': error.message}), error.status_code, error_headers(error)
+
+
 def handle_app_error(error):
     logger.error(f"Application Error: {str(error)}")
     return jsonify({'status': 'failed', 'message': error.message}), error.status_code
@@ -65,5 +81,60 @@ def register_error_handlers(app):
     app.register_error_handler(JWTDecodeError, handle_jwt_decode_error)
     app.register_error_handler(TokenExpiredError, handle_token_expired_error)
     app.register_error_handler(InvalidTokenError, handle_invalid_token_error)
+    app.register_error_handler(TooManyRequestsError, handle_capacity_error)
+    app.register_error_handler(ServiceUnavailableError, handle_capacity_error)
     app.register_error_handler(AppErrorBaseClass, handle_app_error)
     app.register_error_handler(Exception, handle_generic_exception)
+
+
+def register_api_error_handlers(api):
+    """
+    Register error handlers on the Flask-RESTX API, whose resources bypass the app handlers.
+    """
+
+    @api.errorhandler(AppErrorBaseClass)
+    def handle_api_app_error(error):
+        logger.error(f"Application Error: {str(error)}")
+        return {'status': 'failed', 'message': error.message}, error.status_code, error_headers(error)
+
+    # Flask-RESTX picks the first handler matching the error, so the specific JWT errors come before
+    # the catch-all; the answers match the app-level token callbacks of src.tokens.services
+
+    @api.errorhandler(NoAuthorizationError)
+    @api.errorhandler(CSRFError)
+    def handle_api_missing_token(error):
+        logger.warning(f"JWT token missing from request: {str(error)}")
+        return {'status': 'failed', 'message': "JWT token is missing. Access denied."}, 401
+
+    @api.errorhandler(ExpiredSignatureError)
+    def handle_api_expired_token(error):
+        token_type = getattr(error, 'jwt_data', {}).get('type', 'access')
+        logger.warning(f"Expired {token_type} token used")
+        return {'status': 'failed', 'message': f"Your {token_type} token has expired. Please log in again."}, 401
+
+    @api.errorhandler(RevokedTokenError)
+    def handle_api_revoked_token(error):
+        logger.warning("Revoked token used")
+        return {'status': 'failed', 'message': "The token has been revoked."}, 401
+
+    @api.errorhandler(FreshTokenRequired)
+    def handle_api_fresh_token_required(error):
+        logger.warning("Non-fresh token used where a fresh one is required")
+        return {'status': 'failed', 'message': "A fresh token is required."}, 401
+
+    @api.errorhandler(UserLookupError)
+    def handle_api_user_lookup_error(error):
+        logger.warning("Token of an unknown user used")
+        return {'status': 'failed', 'message': "The user of the token was not found."}, 401
+
+    @api.errorhandler(UserClaimsVerificationError)
+    def handle_api_claims_verification_error(error):
+        logger.warning("Token claims verification failed")
+        return {'status': 'failed', 'message': "The token claims verification failed."}, 400
+
+    @api.errorhandler(JWTExtendedException)
+    @api.errorhandler(PyJWTError)
+    def handle_api_invalid_token(error):
+        # Decode errors, bad signatures, wrong token types and headers
+        logger.warning(f"Invalid token attempted: {str(error)}")
+        return {'status': 'failed', 'message': "The token is invalid or has been tampered with."}, 401
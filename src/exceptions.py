@@ -55,3 +55,37 @@ class InvalidTokenError(AppErrorBaseClass):
 
     def __init__(self, message="Invalid token"):
         super().__init__(message, status_code=401)
+
+
+# Capacity-related errors
+class TooManyRequestsError(AppErrorBaseClass):
+    """Exception raised when a client exceeds its allowed request rate."""
+
+    def __init__(self, message="Too many requests", retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=429)
+
+
+class ServiceUnavailableError(AppErrorBaseClass):
+    """Exception raised when the server is temporarily out of capacity."""
+
+    def __init__(self, message="Service temporarily unavailable", retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=503)
+
+
+# Upstream-related errors
+class BadGatewayError(AppErrorBaseClass):
+    """Exception raised when an upstream service fails or returns an invalid response."""
+
+    def __init__(self, message="Upstream service error", retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=502)
+
+
+class GatewayTimeoutError(AppErrorBaseClass):
+    """Exception raised when an upstream service does not answer in time."""
+
+    def __init__(self, message="Upstream service timed out", retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message, status_code=504)
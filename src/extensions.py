@@ -2,11 +2,11 @@ from flask_mail import Mail
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager
+from src.tokens.manager import CachingJWTManager
 
 # Initialization of global extensions
 db = SQLAlchemy()
 migrate = Migrate()
 bcrypt = Bcrypt()
-jwt = JWTManager()
+jwt = CachingJWTManager()
 mail = Mail()
\ No newline at end of file
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+
+from src.exceptions import NotFoundError
+from src.inference.batching import MicroBatcher, INFERENCE_MAX_BATCH, INFERENCE_BATCH_MAX_WAIT_MS
+from src.inference.pool import ConnectionPool
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# JSON mapping each model name to its backend, e.g.
+# {"summarizer": {"url": "http://models:8000", "timeout": 120, "max_connections": 4, "deterministic": false,
+#                 "batch_path": "/infer/batch", "max_batch": 8, "max_wait_ms": 10}}
+INFERENCE_BACKENDS = os.getenv('INFERENCE_BACKENDS', '')
+# Default time in seconds to wait for a model backend to answer
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', 60))
+# Default time in seconds to wait for a new connection to a model backend
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv('INFERENCE_CONNECT_TIMEOUT', 3))
+# Default maximum number of concurrent requests per model backend
+INFERENCE_MAX_CONNECTIONS = int(os.getenv('INFERENCE_MAX_CONNECTIONS', 10))
+# Default time in seconds a request waits for a free connection before a 503
+INFERENCE_QUEUE_TIMEOUT = float(os.getenv('INFERENCE_QUEUE_TIMEOUT', 5))
+# Idle keep-alive connections older than this many seconds are not reused
+INFERENCE_POOL_IDLE_TIMEOUT = float(os.getenv('INFERENCE_POOL_IDLE_TIMEOUT', 15))
+# Path of the inference endpoint on the backends
+INFERENCE_PATH = os.getenv('INFERENCE_PATH', '/infer')
+
+
+class InferenceBackend:
+    """
+    A model served by an upstream model server, reached through its own connection pool.
+    """
+
+    def __init__(self, name, url, path=INFERENCE_PATH, timeout=INFERENCE_TIMEOUT,
+                 connect_timeout=INFERENCE_CONNECT_TIMEOUT, max_connections=INFERENCE_MAX_CONNECTIONS,
+                 queue_timeout=INFERENCE_QUEUE_TIMEOUT, idle_timeout=INFERENCE_POOL_IDLE_TIMEOUT,
+                 deterministic=False, cache_ttl=None, batch_path=None, max_batch=INFERENCE_MAX_BATCH,
+                 max_wait_ms=INFERENCE_BATCH_MAX_WAIT_MS):
+        """
+        :param name: Name of the model, as used in /api/inference/<model>.
+        :param url: Base URL of the model server.
+        :param path: Path of the inference endpoint on the model server.
+        :param timeout: Time in seconds to wait for the model server to answer.
+        :param connect_timeout: Time in seconds to wait for a new connection.
+        :param max_connections: Maximum number of concurrent requests to the model server.
+        :param queue_timeout: Time in seconds a request waits for a free connection.
+        :param idle_timeout: Idle connections older than this many seconds are not reused.
+        :param deterministic: Whether the model always gives the same answer to the same request
+                              (e.g. embeddings), so that every answer can be cached.
+        :param cache_ttl: Lifetime of the cached answers in seconds (defaults to INFERENCE_CACHE_TTL).
+        :param batch_path: Path of the batch endpoint on the model server; setting it enables micro-batching.
+        :param max_batch: Maximum number of requests per batch.
+        :param max_wait_ms: Time in milliseconds a request waits for others to fill its batch.
+        """
+        self.name = name
+        self.path = path
+        self.deterministic = deterministic
+        self.cache_ttl = cache_ttl
+        self.pool = ConnectionPool(url, max_connections=max_connections, timeout=timeout,
+                                   connect_timeout=connect_timeout, queue_timeout=queue_timeout,
+                                   idle_timeout=idle_timeout)
+        self.batcher = MicroBatcher(self, batch_path, max_batch=max_batch, max_wait_ms=max_wait_ms) \
+            if batch_path else None
+
+    def close(self):
+        """
+        Stop the batcher and close the idle connections.
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        self.pool.close()
+
+    def to_dict(self):
+        return {
+            'model': self.name,
+            'timeout': self.pool.timeout,
+            'max_connections': self.pool.max_connections,
+            'deterministic': self.deterministic,
+            'max_batch': self.batcher.max_batch if self.batcher else 1,
+        }
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def configure_backends(config):
+    """
+    Replace the configured model backends, closing the connections of the previous ones.
+
+    :param config: Dictionary of model name to InferenceBackend keyword arguments (url, timeout...).
+    :return: Dictionary of model name to InferenceBackend.
+    """
+    backends = {name: InferenceBackend(name, **options) for name, options in config.items()}
+    with _backends_lock:
+        previous = dict(_backends)
+        _backends.clear()
+        _backends.update(backends)
+    for backend in previous.values():
+        backend.close()
+    if backends:
+        logger.info(f"Inference backends configured: {', '.join(sorted(backends))}")
+    return backends
+
+
+def get_backend(model):
+    """
+    :param model: Name of the model.
+    :return: The InferenceBackend serving it.
+    :raises NotFoundError: If no backend serves the model.
+    """
+    backend = _backends.get(model)
+    if backend is None:
+        raise NotFoundError(f"Unknown model: {model}")
+    return backend
+
+
+def list_backends():
+    return [_backends[name] for name in sorted(_backends)]
+
+
+def init_inference_backends(app):
+    """
+    Configure the model backends from the INFERENCE_BACKENDS environment variable.
+
+    :param app: The Flask app.
+    """
+    try:
+        configure_backends(json.loads(INFERENCE_BACKENDS or '{}'))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid INFERENCE_BACKENDS configuration: {str(e)}")
+        raise
+    app.extensions['inference_backends'] = _backends
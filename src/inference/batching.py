@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.exceptions import BadGatewayError, GatewayTimeoutError, ServiceUnavailableError
+from src.inference.pool import UpstreamResponse
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Default maximum number of requests sent in one batch
+INFERENCE_MAX_BATCH = int(os.getenv('INFERENCE_MAX_BATCH', 16))
+# Default time in milliseconds the first request of a batch waits for others to join it
+INFERENCE_BATCH_MAX_WAIT_MS = float(os.getenv('INFERENCE_BATCH_MAX_WAIT_MS', 5))
+# Requests waiting to be batched per model; beyond that new requests get a 503
+INFERENCE_BATCH_MAX_PENDING = int(os.getenv('INFERENCE_BATCH_MAX_PENDING', 1000))
+
+
+class _PendingRequest:
+    def __init__(self, payload, request_id=None):
+        self.payload = payload
+        self.request_id = request_id
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.abandoned = False  # The caller timed out, nobody reads the result any more
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Gathers the concurrent inference requests for one model into batch calls.
+
+    A batch is sent once it holds `max_batch` requests or its first request has waited
+    `max_wait_ms`, whichever comes first, so a lone request is delayed by at most max_wait_ms.
+    The model server receives {"inputs": [...]} and must answer {"outputs": [...]} in the same
+    order; each output is sent back to the request it belongs to, and the X-Request-ID of the
+    requests are forwarded as a comma-separated list. Several batches may be in
+    flight at once, up to the connection limit of the backend. Requests whose caller gave up
+    waiting are dropped from the batches not sent yet.
+    """
+
+    def __init__(self, backend, batch_path, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_BATCH_MAX_WAIT_MS,
+                 max_pending=INFERENCE_BATCH_MAX_PENDING):
+        """
+        :param backend: The InferenceBackend the batches are sent to.
+        :param batch_path: Path of the batch endpoint on the model server.
+        :param max_batch: Maximum number of requests per batch.
+        :param max_wait_ms: Time the first request of a batch waits for others, in milliseconds.
+        :param max_pending: Maximum number of requests waiting to be batched.
+        """
+        self.backend = backend
+        self.batch_path = batch_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self.abandoned = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=backend.pool.max_connections,
+                                            thread_name_prefix=f"batch-{backend.name}")
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name=f"batcher-{self.backend.name}",
+                                                daemon=True)
+                self._thread.start()
+
+    def submit(self, payload, request_id=None):
+        """
+        Add a request to the next batch and wait for its output.
+
+        :param payload: The decoded JSON body of the request.
+        :param request_id: X-Request-ID of the request, forwarded with its batch.
+        :return: The UpstreamResponse of this request.
+        :raises ServiceUnavailableError: If too many requests are already waiting.
+        :raises GatewayTimeoutError: If the batch is not answered in time.
+        """
+        if self._queue.qsize() >= self.max_pending:
+            raise ServiceUnavailableError("Model backend is busy, please retry shortly.",
+                                          retry_after=self.backend.pool.retry_after)
+        self._start()
+        pending = _PendingRequest(payload, request_id)
+        self._queue.put(pending)
+        pool = self.backend.pool
+        if not pending.done.wait(self.max_wait + pool.queue_timeout + pool.connect_timeout + pool.timeout):
+            pending.abandoned = True
+            raise GatewayTimeoutError(f"{self.backend.name} did not answer within {pool.timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _dispatch(self):
+        while not self._stopped:
+            try:
+                first = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if self._drop_abandoned([first]) is None:
+                continue
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if self._drop_abandoned([pending]) is not None:
+                    batch.append(pending)
+            try:
+                self._executor.submit(self._send, batch)
+            except RuntimeError:
+                # The batcher was closed meanwhile
+                self._fail(batch, ServiceUnavailableError("Model backend is being reconfigured."))
+
+    def _send(self, batch):
+        # Batches wait for a free worker when every connection is busy; their callers may have given up meanwhile
+        batch = self._drop_abandoned(batch)
+        if batch is None:
+            return
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            body = json.dumps({'inputs': [pending.payload for pending in batch]}).encode('utf-8')
+            headers = {'Content-Type': 'application/json'}
+            request_ids = [pending.request_id for pending in batch if pending.request_id]
+            if request_ids:
+                headers['X-Request-ID'] = ','.join(request_ids)
+            response = self.backend.pool.request('POST', self.batch_path, body=body, headers=headers)
+            results = self._scatter(response, len(batch))
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        for pending, result in zip(batch, results):
+            pending.result = result
+            pending.done.set()
+
+    def _drop_abandoned(self, batch):
+        """
+        :return: The requests of the batch still awaited, or None if there are none left.
+        """
+        awaited = [pending for pending in batch if not pending.abandoned]
+        if len(awaited) < len(batch):
+            with self._lock:
+                self.abandoned += len(batch) - len(awaited)
+        return awaited or None
+
+    def _scatter(self, response, size):
+        """
+        Split the answer to a batch into one response per request.
+        """
+        if response.status != 200:
+            # Errors of the batch are errors of each of its requests
+            return [response] * size
+        try:
+            outputs = json.loads(response.body)['outputs']
+        except (ValueError, KeyError, TypeError):
+            raise BadGatewayError(f"Invalid batch answer from {self.backend.name}")
+        if not isinstance(outputs, list) or len(outputs) != size:
+            raise BadGatewayError(f"{self.backend.name} answered a batch of {size} with a different number of outputs")
+        headers = {'Content-Type': 'application/json'}
+        return [UpstreamResponse(200, headers, json.dumps(output).encode('utf-8')) for output in outputs]
+
+    @staticmethod
+    def _fail(batch, error):
+        for pending in batch:
+            pending.error = error
+            pending.done.set()
+
+    def close(self):
+        """
+        Stop gathering batches; the requests still waiting get a 503.
+        """
+        self._stopped = True
+        self._executor.shutdown(wait=False)
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._fail(pending, ServiceUnavailableError("Model backend is being reconfigured."))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self.batches,
+                'requests': self.requests,
+                'average_batch': round(self.requests / self.batches, 2) if self.batches else 0,
+                'largest_batch': self.largest_batch,
+                'abandoned': self.abandoned,
+                'pending': self._queue.qsize(),
+            }
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from src.utils.cache import TTLCache, SingleFlight
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Set to "false" to disable the inference result cache and request coalescing
+INFERENCE_CACHE_ENABLED = os.getenv('INFERENCE_CACHE_ENABLED', 'true').lower() == 'true'
+# Results kept in memory before the least recently used ones are evicted
+INFERENCE_CACHE_MAX_ENTRIES = int(os.getenv('INFERENCE_CACHE_MAX_ENTRIES', 1024))
+# Default lifetime of a cached result in seconds
+INFERENCE_CACHE_TTL = int(os.getenv('INFERENCE_CACHE_TTL', 3600))
+# Larger results are not cached
+INFERENCE_CACHE_MAX_BODY_BYTES = int(os.getenv('INFERENCE_CACHE_MAX_BODY_BYTES', 1024 * 1024))
+# Directory of the on-disk tier, shared by the workers of a host (empty disables it)
+INFERENCE_CACHE_DIR = os.getenv('INFERENCE_CACHE_DIR', '')
+# Seconds between two purges of the expired results of the on-disk tier
+INFERENCE_CACHE_PURGE_INTERVAL = int(os.getenv('INFERENCE_CACHE_PURGE_INTERVAL', 600))
+
+
+def request_key(model, payload):
+    """
+    Canonical hash of an inference request: the same model, parameters and input give the
+    same key whatever the order of the JSON keys or the whitespace of the request body.
+
+    :param model: Name of the model.
+    :param payload: The decoded JSON body of the request.
+    :return: Hex SHA-256 digest.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f"{model}\0{canonical}".encode('utf-8')).hexdigest()
+
+
+class DiskResultCache:
+    """
+    Content-addressed on-disk store of inference results. Bodies are stored once under the
+    digest of their content (blobs/), and each request key points to a body with its status,
+    content type and expiry (index/). Files are written to a temporary name then renamed, so
+    that concurrent workers never read a partial entry.
+    """
+
+    # Unreferenced bodies younger than this (being written with their index entry) are kept
+    BLOB_GRACE_SECONDS = 60
+
+    def __init__(self, directory):
+        """
+        :param directory: Root directory of the store.
+        """
+        self.directory = directory
+        self._index_dir = os.path.join(directory, 'index')
+        self._blob_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self._index_dir, exist_ok=True)
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+    def _index_path(self, key):
+        return os.path.join(self._index_dir, key[:2], key)
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, key):
+        """
+        :return: Tuple ((status, content_type, body), expires_at), or None if missing or expired.
+        """
+        try:
+            with open(self._index_path(key), 'rb') as f:
+                entry = json.loads(f.read())
+            if entry['expires_at'] <= time.time():
+                return None
+            with open(self._blob_path(entry['blob']), 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return (entry['status'], entry['content_type'], body), entry['expires_at']
+
+    def set(self, key, result, expires_at):
+        status, content_type, body = result
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            self._write(blob_path, body)
+        entry = {'blob': digest, 'status': status, 'content_type': content_type, 'expires_at': expires_at}
+        self._write(self._index_path(key), json.dumps(entry).encode('utf-8'))
+
+    def purge_expired(self):
+        """
+        Delete the expired index entries, then the bodies no entry points to anymore.
+
+        :return: Tuple (entries removed, bodies removed).
+        """
+        now = time.time()
+        referenced = set()
+        entries_removed = 0
+        for root, _, files in os.walk(self._index_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path, 'rb') as f:
+                        entry = json.loads(f.read())
+                    if entry['expires_at'] > now:
+                        referenced.add(entry['blob'])
+                        continue
+                    os.unlink(path)
+                    entries_removed += 1
+                except (OSError, ValueError, KeyError):
+                    continue
+
+        blobs_removed = 0
+        for root, _, files in os.walk(self._blob_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if name not in referenced and os.path.getmtime(path) < now - self.BLOB_GRACE_SECONDS:
+                        os.unlink(path)
+                        blobs_removed += 1
+                except OSError:
+                    continue
+        return entries_removed, blobs_removed
+
+
+class InferenceResultCache:
+    """
+    Results of deterministic inference calls: an LRU/TTL tier in memory in front of an
+    optional content-addressed tier on disk, which survives restarts and is shared by the
+    workers of a host. Disk hits are copied back to memory.
+    """
+
+    def __init__(self, maxsize=INFERENCE_CACHE_MAX_ENTRIES, ttl=INFERENCE_CACHE_TTL,
+                 max_body_bytes=INFERENCE_CACHE_MAX_BODY_BYTES, directory=INFERENCE_CACHE_DIR):
+        """
+        :param maxsize: Results kept in memory.
+        :param ttl: Default lifetime of a result in seconds.
+        :param max_body_bytes: Larger results are not cached.
+        :param directory: Directory of the on-disk tier (None or empty to disable it).
+        """
+        self.ttl = ttl
+        self.max_body_bytes = max_body_bytes
+        self.memory = TTLCache(maxsize=maxsize)
+        self.disk = DiskResultCache(directory) if directory else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :return: Tuple (status, content_type, body), or None.
+        """
+        result = self.memory.get(key)
+        if result is None and self.disk is not None:
+            cached = self.disk.get(key)
+            if cached is not None:
+                result, expires_at = cached
+                self.memory.set(key, result, expires_at=expires_at)
+                with self._lock:
+                    self.disk_hits += 1
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def set(self, key, result, ttl=None):
+        """
+        Store a result, unless its body exceeds max_body_bytes.
+
+        :param result: Tuple (status, content_type, body).
+        :param ttl: Lifetime in seconds, overriding the default.
+        """
+        if len(result[2]) > self.max_body_bytes:
+            return
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self.memory.set(key, result, expires_at=expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, result, expires_at)
+            except OSError as e:
+                logger.error(f"Error writing an inference result to the disk cache: {str(e)}")
+
+    def purge_expired(self):
+        """
+        Drop the expired results of both tiers. Runs as a periodic task.
+        """
+        removed = self.memory.purge_expired()
+        if self.disk is not None:
+            entries, blobs = self.disk.purge_expired()
+            removed += entries
+            if entries or blobs:
+                logger.info(f"Purged {entries} expired inference results and {blobs} bodies from the disk cache")
+        return removed
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        return {'entries': len(self.memory), 'disk': self.disk is not None, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses}
+
+
+inference_cache = InferenceResultCache()
+# Identical deterministic calls in progress, shared by the requests arriving meanwhile
+inference_flights = SingleFlight()
@@ -0,0 +1,32 @@
+import logging
+
+from flask import jsonify, request
+from src.inference.services import list_models_service, run_inference_service
+from src.inference.streaming import inference_response
+from src.middlewares.decorators import api_key_or_jwt_required, handle_exceptions
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+
+@api_key_or_jwt_required
+@handle_exceptions
+def list_models():
+    """
+    List the models available for inference.
+    :return: JSON response containing the models.
+    """
+    response = list_models_service()
+    return jsonify({'status': 'success', **response}), 200
+
+
+@api_key_or_jwt_required
+@handle_exceptions
+def run_inference(model):
+    """
+    Forward the request body to the backend of a model and relay its response.
+    :param model: Name of the model.
+    :return: The response of the model backend.
+    """
+    upstream = run_inference_service(model, request.get_data(cache=False), request.headers)
+    return inference_response(model, upstream)
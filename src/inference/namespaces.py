@@ -0,0 +1,51 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from src.inference.services import list_models_service, run_inference_service
+from src.inference.streaming import inference_response
+from src.middlewares.decorators import api_key_or_jwt_required
+import logging
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Create Namespace for inference
+inference_ns = Namespace('inference', description='Calls to the AI models', tags=['inference'])
+
+# Define models for input/output with Flask-RESTX
+model_list_model = inference_ns.model('ModelList', {
+    'status': fields.String(description='Status of the response'),
+    'models': fields.List(fields.Raw, description='Available models (model, timeout, max_connections)')
+})
+
+
+# List Models Resource
+@inference_ns.route('/models')
+class ListModels(Resource):
+    @api_key_or_jwt_required
+    @inference_ns.response(200, 'Successfully retrieved the models', model_list_model)
+    def get(self):
+        """
+        List the models available for inference
+        """
+        response = list_models_service()
+        return {'status': 'success', **response}, 200
+
+
+# Run Inference Resource
+@inference_ns.route('/<string:model>')
+class RunInference(Resource):
+    @api_key_or_jwt_required
+    @inference_ns.doc(params={'model': 'Name of the model'},
+                      description='The request body is forwarded as is to the model backend; streamed '
+                                  'answers (SSE, chunked) are relayed as they are generated')
+    @inference_ns.response(200, 'Response of the model backend')
+    @inference_ns.response(404, 'Unknown model')
+    @inference_ns.response(502, 'Model backend unreachable')
+    @inference_ns.response(503, 'Model backend busy')
+    @inference_ns.response(504, 'Model backend timed out')
+    def post(self, model):
+        """
+        Run a model on the request body and relay the response of its backend
+        """
+        upstream = run_inference_service(model, request.get_data(cache=False), request.headers)
+        return inference_response(model, upstream)
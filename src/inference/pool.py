@@ -0,0 +1,291 @@
+import http.client
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from src.exceptions import BadGatewayError, GatewayTimeoutError, ServiceUnavailableError
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Errors meaning that a reused keep-alive connection had been closed by the server
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class UpstreamResponse:
+    """
+    Response of an upstream server, read in full.
+    """
+
+    def __init__(self, status, headers, body, cache_status=None):
+        """
+        :param cache_status: HIT, MISS or COALESCED for results going through the result cache.
+        """
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.cache_status = cache_status
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type', 'application/octet-stream')
+
+
+class UpstreamStream:
+    """
+    Response of an upstream server whose body is read incrementally. Holds its pool slot
+    and connection until closed; closing before the end of the body drops the connection,
+    which cancels the request on the server.
+    """
+
+    def __init__(self, pool, connection, response, timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.status = response.status
+        self.headers = response.headers
+        self.complete = False
+        self._connection = connection
+        self._response = response
+        self._closed = False
+
+    @property
+    def content_type(self):
+        return self.headers.get('Content-Type', 'application/octet-stream')
+
+    @property
+    def is_streaming(self):
+        """
+        Whether the body is sent progressively (SSE or chunked without a length) rather than at once.
+        """
+        return self.content_type.startswith('text/event-stream') or self._response.chunked or \
+            self._response.length is None
+
+    def iter_chunks(self, chunk_size=16 * 1024):
+        """
+        Yield the body as it arrives, without waiting for chunk_size bytes.
+
+        :raises GatewayTimeoutError: If the server stays silent longer than the timeout.
+        :raises BadGatewayError: If the connection fails mid-body.
+        """
+        while True:
+            try:
+                data = self._response.read1(chunk_size)
+            except socket.timeout:
+                raise GatewayTimeoutError(f"{self.pool.host} stopped sending within {self.timeout}s")
+            except (OSError, http.client.HTTPException) as e:
+                raise BadGatewayError(f"Reading the response of {self.pool.host} failed: {str(e)}")
+            if not data:
+                # Marks the response as done, so that the connection can send the next request
+                self._response.close()
+                self.complete = True
+                return
+            yield data
+
+    def read(self):
+        """
+        Read the whole body and close the stream.
+
+        :return: The UpstreamResponse.
+        """
+        try:
+            return UpstreamResponse(self.status, self.headers, b''.join(self.iter_chunks()))
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Give the connection back to the pool if the body was read to the end, otherwise close it.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.pool.finish(self._connection, self._response, reusable=self.complete)
+        finally:
+            self.pool.release()
+
+
+class ConnectionPool:
+    """
+    Pool of persistent (keep-alive) HTTP connections to one upstream server.
+
+    At most `max_connections` requests are in flight at once; further requests wait up to
+    `queue_timeout` seconds for a slot, then are rejected with a ServiceUnavailableError.
+    Idle connections are reused most recent first and dropped after `idle_timeout` seconds,
+    before the server is likely to close them. A request failing because the server closed
+    a reused connection is retried once on a new connection.
+    """
+
+    def __init__(self, url, max_connections=10, timeout=30, connect_timeout=3, queue_timeout=5,
+                 idle_timeout=15, retry_after=1):
+        """
+        :param url: Base URL of the server, e.g. http://models:8000/v1.
+        :param max_connections: Maximum number of concurrent requests (and open connections).
+        :param timeout: Default time in seconds to wait for the server to answer.
+        :param connect_timeout: Time in seconds to wait for a new connection.
+        :param queue_timeout: Time in seconds to wait for a free slot.
+        :param idle_timeout: Idle connections older than this many seconds are not reused.
+        :param retry_after: Retry-After of the 503 sent when no slot frees up in time.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Invalid upstream URL: {url}")
+        self.url = url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self.created = 0
+        self.reused = 0
+        self.rejected = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._in_flight = 0
+
+    def _new_connection(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            connection.connect()
+        except socket.timeout:
+            raise GatewayTimeoutError(f"Timed out connecting to {self.host}")
+        except OSError as e:
+            raise BadGatewayError(f"Cannot connect to {self.host}: {str(e)}")
+        self.created += 1
+        return connection
+
+    def _checkout(self):
+        """
+        :return: Tuple (connection, reused), reusing the most recently returned idle connection.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                connection, returned_at = self._idle.pop()
+                if now - returned_at < self.idle_timeout:
+                    self.reused += 1
+                    return connection, True
+                connection.close()
+                # Older connections sit at the left end, so they are all expired too
+                while self._idle:
+                    self._idle.popleft()[0].close()
+        return self._new_connection(), False
+
+    def _checkin(self, connection):
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def acquire(self):
+        """
+        Take a request slot, waiting up to queue_timeout.
+
+        :raises ServiceUnavailableError: If every slot stays busy.
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            logger.warning(f"Upstream pool for {self.host} saturated ({self.max_connections} requests in flight)")
+            raise ServiceUnavailableError("Model backend is busy, please retry shortly.", retry_after=self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def send(self, method, path, body=None, headers=None, timeout=None):
+        """
+        Send a request and wait for the status line and headers of the response.
+        The caller must hold a slot (acquire) and give the connection back with finish().
+
+        :return: Tuple (connection, http.client.HTTPResponse).
+        :raises GatewayTimeoutError: If the server does not answer within the timeout.
+        :raises BadGatewayError: If the server cannot be reached.
+        """
+        for attempt in range(2):
+            connection, reused = self._checkout()
+            try:
+                connection.sock.settimeout(timeout or self.timeout)
+                connection.request(method, self.base_path + path, body=body, headers=headers or {})
+                return connection, connection.getresponse()
+            except socket.timeout:
+                connection.close()
+                raise GatewayTimeoutError(f"{self.host} did not answer within {timeout or self.timeout}s")
+            except _STALE_CONNECTION_ERRORS as e:
+                connection.close()
+                if reused and attempt == 0:
+                    logger.debug(f"Reused connection to {self.host} was closed by the server, retrying")
+                    continue
+                raise BadGatewayError(f"Connection to {self.host} failed: {str(e)}")
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                raise BadGatewayError(f"Request to {self.host} failed: {str(e)}")
+
+    def finish(self, connection, response, reusable=True):
+        """
+        Give a connection back once its response has been read, or close it.
+
+        :param reusable: False if the response was not read to the end.
+        """
+        if reusable and not response.will_close and response.isclosed():
+            self._checkin(connection)
+        else:
+            connection.close()
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        """
+        Send a request over a pooled connection and read the whole response.
+
+        :param method: HTTP method.
+        :param path: Path relative to the base URL of the pool.
+        :param body: Request body (bytes).
+        :param headers: Request headers.
+        :param timeout: Time in seconds to wait for the server (defaults to the pool timeout).
+        :return: The UpstreamResponse.
+        """
+        return self.stream(method, path, body, headers, timeout).read()
+
+    def stream(self, method, path, body=None, headers=None, timeout=None):
+        """
+        Send a request over a pooled connection and return once the response headers arrive.
+        The timeout then applies to every read of the body. The stream must be closed.
+
+        :return: The UpstreamStream.
+        """
+        self.acquire()
+        try:
+            connection, response = self.send(method, path, body, headers, timeout)
+        except Exception:
+            self.release()
+            raise
+        return UpstreamStream(self, connection, response, timeout or self.timeout)
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        with self._lock:
+            while self._idle:
+                self._idle.pop()[0].close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'url': self.url,
+                'max_connections': self.max_connections,
+                'in_flight': self._in_flight,
+                'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,156 @@
+import json
+import logging
+import time
+
+from src.exceptions import GatewayTimeoutError
+from src.inference.backends import get_backend, list_backends
+from src.inference.cache import INFERENCE_CACHE_ENABLED, inference_cache, inference_flights, request_key
+from src.inference.pool import UpstreamResponse, UpstreamStream
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Request headers forwarded to the model backends. Accept-Encoding is not: only the Content-Type
+# of an answer is relayed and answers are cached for every client, so they are fetched uncompressed
+FORWARDED_HEADERS = ('Content-Type', 'Accept', 'X-Request-ID')
+
+
+def forwarded_headers(headers):
+    """
+    :param headers: Headers of the incoming request.
+    :return: The subset of headers sent on to the model backend.
+    """
+    return {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+
+
+def json_payload(body, headers):
+    """
+    :return: The decoded JSON body of a request, or None if it is not JSON.
+    """
+    if not headers.get('Content-Type', '').startswith('application/json'):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def is_deterministic(backend, payload):
+    """
+    Whether a request always gets the same answer, so that identical requests can share
+    one upstream call and its result can be cached: the model is deterministic or sampling
+    is disabled (temperature 0), and the answer is not streamed.
+
+    :param backend: The InferenceBackend.
+    :param payload: The decoded JSON body of the request.
+    """
+    if not isinstance(payload, dict) or payload.get('stream'):
+        return False
+    return backend.deterministic or payload.get('temperature') == 0
+
+
+def is_batchable(backend, payload):
+    """
+    Whether a request can join a batch: the backend has a batch endpoint and the
+    request is a JSON object whose answer is not streamed.
+    """
+    return backend.batcher is not None and isinstance(payload, dict) and not payload.get('stream')
+
+
+def forward_inference(backend, payload, body, headers, stream=False):
+    """
+    Send a request to the backend, in a batch when the backend supports it. This is the only
+    place routing requests to the batcher, for the cached and the direct paths alike.
+
+    :param backend: The InferenceBackend.
+    :param payload: The decoded JSON body of the request (None if it is not JSON).
+    :param body: Raw request body.
+    :param headers: Headers of the incoming request.
+    :param stream: Whether an answer sent progressively is returned as a stream rather than read in full.
+    :return: The UpstreamResponse, or the UpstreamStream of a streamed answer (to be closed).
+    """
+    if is_batchable(backend, payload):
+        return backend.batcher.submit(payload, headers.get('X-Request-ID'))
+    upstream = backend.pool.stream('POST', backend.path, body=body, headers=forwarded_headers(headers))
+    if stream and upstream.is_streaming:
+        return upstream
+    return upstream.read()
+
+
+def run_cached_inference(backend, key, payload, body, headers):
+    """
+    Answer a deterministic request from the result cache, or through a single upstream call
+    shared by the identical requests arriving while it runs.
+
+    :param backend: The InferenceBackend.
+    :param key: Canonical key of the request (request_key).
+    :param payload: The decoded JSON body of the request.
+    :param body: Raw request body.
+    :param headers: Headers of the incoming request.
+    :return: The UpstreamResponse, with its cache_status set.
+    """
+    if 'no-cache' not in headers.get('Cache-Control', ''):
+        cached = inference_cache.get(key)
+        if cached is not None:
+            status, content_type, data = cached
+            return UpstreamResponse(status, {'Content-Type': content_type}, data, cache_status='HIT')
+
+    def call():
+        response = forward_inference(backend, payload, body, headers)
+        if response.status == 200:
+            inference_cache.set(key, (response.status, response.content_type, response.body), ttl=backend.cache_ttl)
+        return response
+
+    pool = backend.pool
+    try:
+        response, shared = inference_flights.do(key, call,
+                                                timeout=pool.queue_timeout + pool.connect_timeout + pool.timeout)
+    except TimeoutError:
+        raise GatewayTimeoutError(f"{backend.name} did not answer within {pool.timeout}s")
+    return UpstreamResponse(response.status, response.headers, response.body,
+                            cache_status='COALESCED' if shared else 'MISS')
+
+
+def list_models_service():
+    """
+    List the models that can be called through /api/inference.
+
+    :return: Dictionary containing the list of models.
+    """
+    return {'models': [backend.to_dict() for backend in list_backends()]}
+
+
+def run_inference_service(model, body, headers=None):
+    """
+    Forward an inference request to the backend of a model and return its response unchanged.
+    Streamed answers (SSE, chunked) are returned as soon as their headers arrive, so that
+    their body can be relayed as it is generated. Deterministic requests go through the
+    result cache and are coalesced with identical requests in progress. Requests for a model
+    with a batch endpoint are sent in micro-batches.
+
+    :param model: Name of the model.
+    :param body: Raw request body.
+    :param headers: Headers of the incoming request.
+    :return: The UpstreamResponse, or the UpstreamStream of a streamed answer (to be closed).
+    :raises NotFoundError: If no backend serves the model.
+    :raises ServiceUnavailableError: If the backend has no free connection.
+    :raises BadGatewayError: If the backend cannot be reached.
+    :raises GatewayTimeoutError: If the backend does not answer in time.
+    """
+    backend = get_backend(model)
+    headers = headers or {}
+    started = time.perf_counter()
+    payload = json_payload(body, headers) if INFERENCE_CACHE_ENABLED or backend.batcher else None
+    if INFERENCE_CACHE_ENABLED and payload is not None and is_deterministic(backend, payload):
+        response = run_cached_inference(backend, request_key(model, payload), payload, body, headers)
+        logger.info(f"Inference on {model} answered {response.status} ({response.cache_status}) in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms ({len(response.body)} bytes)")
+        return response
+
+    response = forward_inference(backend, payload, body, headers, stream=True)
+    if isinstance(response, UpstreamStream):
+        logger.info(f"Inference on {model} started streaming in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return response
+    logger.info(f"Inference on {model} answered {response.status} in "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms ({len(response.body)} bytes)")
+    return response
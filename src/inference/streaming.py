@@ -0,0 +1,110 @@
+import logging
+import time
+
+from flask import Response, stream_with_context
+
+from src.api_keys.usage import defer_request_usage, record_request_usage, request_latency_ms
+from src.exceptions import BadGatewayError, GatewayTimeoutError
+from src.inference.pool import UpstreamResponse
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+
+class StreamStats:
+    """
+    Byte and time counters of one relayed stream.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_chunk_at = None
+        self.finished_at = None
+        self.bytes = 0
+        self.chunks = 0
+        self.completed = False
+        self.cancelled = False
+        self.error = None
+
+    def add(self, chunk):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.bytes += len(chunk)
+        self.chunks += 1
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def to_dict(self):
+        end = self.finished_at or time.perf_counter()
+        return {
+            'bytes': self.bytes,
+            'chunks': self.chunks,
+            'first_chunk_ms': round((self.first_chunk_at - self.started_at) * 1000, 3)
+            if self.first_chunk_at else None,
+            'duration_ms': round((end - self.started_at) * 1000, 3),
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'error': self.error,
+        }
+
+
+def relay_stream(upstream, on_close=None):
+    """
+    Yield the body of an upstream stream chunk by chunk, as it arrives.
+
+    When the client goes away, the WSGI server closes this generator: the upstream connection
+    is then closed too, which cancels the request on the model backend. The headers are already
+    sent at this point, so an upstream failure mid-stream ends the stream early.
+
+    :param upstream: The UpstreamStream.
+    :param on_close: Function called with the StreamStats once the stream is over.
+    """
+    stats = StreamStats()
+    try:
+        for chunk in upstream.iter_chunks():
+            stats.add(chunk)
+            yield chunk
+        stats.completed = True
+    except GeneratorExit:
+        stats.cancelled = True
+        raise
+    except (BadGatewayError, GatewayTimeoutError) as e:
+        stats.error = e.message
+        logger.warning(f"Upstream stream from {upstream.pool.host} ended early: {e.message}")
+    finally:
+        upstream.close()
+        stats.finish()
+        if on_close is not None:
+            try:
+                on_close(stats)
+            except Exception as e:
+                logger.error(f"Error recording stream statistics: {str(e)}")
+
+
+def inference_response(model, upstream):
+    """
+    Build the response relaying the answer of a model backend: at once for a complete body,
+    incrementally (chunked) for a streamed one, with the usage metered when the stream ends.
+
+    :param model: Name of the model.
+    :param upstream: UpstreamResponse or UpstreamStream.
+    :return: The Flask response.
+    """
+    if isinstance(upstream, UpstreamResponse):
+        response = Response(upstream.body, status=upstream.status, content_type=upstream.content_type)
+        if upstream.cache_status:
+            response.headers['X-Inference-Cache'] = upstream.cache_status
+        return response
+
+    def record_stream(stats):
+        record_request_usage(stats.bytes, request_latency_ms())
+        logger.info(f"Stream from {model} {'completed' if stats.completed else 'interrupted'}: {stats.to_dict()}")
+
+    defer_request_usage()
+    response = Response(stream_with_context(relay_stream(upstream, on_close=record_stream)),
+                        status=upstream.status, content_type=upstream.content_type)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Ask reverse proxies (nginx) not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,100 @@
+import csv
+import io
+import os
+import zlib
+
+from flask import current_app
+
+from src.extensions import db
+from src.logs.models import Log
+
+# Rows fetched per round trip from the server-side cursor
+LOG_EXPORT_BATCH_SIZE = int(os.getenv('LOG_EXPORT_BATCH_SIZE', 1000))
+# Bytes buffered before a chunk is sent to the client
+LOG_EXPORT_CHUNK_BYTES = int(os.getenv('LOG_EXPORT_CHUNK_BYTES', 64 * 1024))
+
+EXPORT_COLUMNS = ('id', 'user_id', 'action', 'timestamp', 'details', 'ip_address')
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_log_rows(query, batch_size=LOG_EXPORT_BATCH_SIZE):
+    """
+    Iterate over the rows of a log query in id order, streamed from a server-side cursor
+    (yield_per) as plain tuples, so that memory does not grow with the number of rows.
+
+    :param query: A query on Log, e.g. from Log.filtered().
+    :param batch_size: Rows fetched per round trip.
+    """
+    columns = [getattr(Log, column) for column in EXPORT_COLUMNS]
+    rows = query.with_entities(*columns).order_by(Log.id) \
+        .execution_options(stream_results=True).yield_per(batch_size)
+    for row in rows:
+        yield row
+
+
+def _buffered(pieces, chunk_bytes):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def ndjson_lines(rows):
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+    """
+    Compress a stream of byte chunks into a single gzip stream, chunk by chunk.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_logs(query, fmt='ndjson', compress=False, chunk_bytes=LOG_EXPORT_CHUNK_BYTES):
+    """
+    Stream the logs of a query as NDJSON or CSV, optionally gzip-compressed.
+
+    :param query: A query on Log.
+    :param fmt: "ndjson" or "csv".
+    :param compress: Gzip the output.
+    :param chunk_bytes: Approximate size of the chunks yielded.
+    :return: Generator of byte chunks.
+    """
+    lines = ndjson_lines(iter_log_rows(query)) if fmt == 'ndjson' else csv_lines(iter_log_rows(query))
+    chunks = _buffered(lines, chunk_bytes)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        # Release the server-side cursor even if the client went away mid-export
+        db.session.rollback()
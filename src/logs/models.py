@@ -13,10 +13,17 @@ class Log(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     action = db.Column(db.String(255), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     details = db.Column(db.Text, nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)  # For storing IPv4/IPv6 addresses
 
+    # Composite indexes matching the keyset pagination order (timestamp, id), with and without filters
+    __table_args__ = (
+        db.Index('ix_log_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_log_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_log_action_timestamp_id', 'action', 'timestamp', 'id'),
+    )
+
     def __init__(self, user_id, action, details=None, ip_address=None):
         """
         Initialize a log entry with the user ID, action, and optional details.
@@ -65,11 +72,42 @@ class Log(db.Model):
         :return: Paginated list of log entries for the user.
         """
         try:
-            return cls.query.filter_by(user_id=user_id).paginate(page, per_page, error_out=False)
+            return cls.query.filter_by(user_id=user_id).paginate(page=page, per_page=per_page, error_out=False)
         except Exception as e:
             logger.error(f"Error finding paginated logs for user {user_id}: {str(e)}")
             return []
 
+    @classmethod
+    def filtered(cls, user_id=None, action=None, since=None, until=None):
+        """
+        Build a query of log entries matching the given filters.
+        :param user_id: Only entries of this user (optional).
+        :param action: Only entries with this action (optional).
+        :param since: Only entries at or after this date (optional).
+        :param until: Only entries before this date (optional).
+        :return: The query.
+        """
+        query = cls.query
+        if user_id is not None:
+            query = query.filter(cls.user_id == user_id)
+        if action:
+            query = query.filter(cls.action == action)
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+        if until is not None:
+            query = query.filter(cls.timestamp < until)
+        return query
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'action': self.action,
+            'timestamp': self.timestamp,
+            'details': self.details,
+            'ip_address': self.ip_address
+        }
+
     @classmethod
     def find_by_action(cls, action):
         """
@@ -101,16 +139,22 @@ class Log(db.Model):
     def delete_old_logs(cls, older_than_days):
         """
         Delete log entries older than a specified number of days.
+        Runs the retention engine to completion: bounded primary-key chunks, one short transaction each.
         :param older_than_days: Number of days before which logs should be deleted.
+        :return: Number of log entries deleted.
         """
+        from src.logs.retention import LogRetention
         try:
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=older_than_days)
-            cls.query.filter(cls.timestamp < cutoff_date).delete()
-            db.session.commit()
-            logger.info(f"Old logs older than {older_than_days} days deleted.")
+            run = LogRetention(retention_days=older_than_days, max_duration=None).run()
+            if run is None:
+                logger.info("Log retention is running in another worker, old logs not deleted.")
+                return 0
+            logger.info(f"Old logs older than {older_than_days} days deleted ({run['rows_deleted']} rows).")
+            return run['rows_deleted']
         except Exception as e:
             logger.error(f"Error deleting old logs: {str(e)}")
             db.session.rollback()
+            return 0
 
     def delete(self):
         """
@@ -126,3 +170,122 @@ class Log(db.Model):
 
     def __repr__(self):
         return f"Log(user_id={self.user_id}, action='{self.action}', timestamp={self.timestamp}, details='{self.details}', ip_address='{self.ip_address}')"
+
+
+class JobCheckpoint(db.Model):
+    """
+    Progress and last run statistics of a background job walking the log table
+    (retention, rollups), so that each run resumes where the previous one stopped.
+    """
+    name = db.Column(db.String(64), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Id watermark of the job
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_run_rows = db.Column(db.Integer, nullable=False, default=0)
+    last_run_seconds = db.Column(db.Float, nullable=False, default=0)
+    total_rows = db.Column(db.BigInteger, nullable=False, default=0)
+    locked_by = db.Column(db.String(64), nullable=True)  # Run holding the lease of the job
+    locked_until = db.Column(db.DateTime, nullable=True)  # End of that lease unless renewed (UTC)
+
+    @classmethod
+    def get_or_create(cls, name):
+        """
+        :param name: Name of the job.
+        :return: The checkpoint of the job, created (and committed) on first use.
+        """
+        checkpoint = db.session.get(cls, name)
+        if checkpoint is None:
+            checkpoint = cls(name=name, last_id=0, last_run_rows=0, last_run_seconds=0, total_rows=0)
+            db.session.add(checkpoint)
+            db.session.commit()
+        return checkpoint
+
+    @classmethod
+    def lock(cls, name):
+        """
+        Read the checkpoint of a job with a row lock (SELECT ... FOR UPDATE) held until the
+        transaction ends, so that the workers running the same job wait for each other.
+        SQLite ignores FOR UPDATE; its writers are serialized by the database lock instead.
+
+        :param name: Name of the job; its checkpoint must exist (get_or_create).
+        :return: The checkpoint, refreshed from the database.
+        """
+        return db.session.query(cls).filter_by(name=name).with_for_update().populate_existing().one()
+
+    @classmethod
+    def acquire(cls, name, owner, seconds):
+        """
+        Take or renew the lease of a job, so that a single run across the workers of a
+        deployment holds it. A lease that is not renewed in time can be taken over.
+        The lease is committed at once.
+
+        :param name: Name of the job; its checkpoint must exist (get_or_create).
+        :param owner: Unique id of the run.
+        :param seconds: Duration of the lease.
+        :return: Whether the run holds the lease.
+        """
+        now = datetime.now(timezone.utc)
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.name == name, db.or_(cls.locked_by.is_(None), cls.locked_by == owner, cls.locked_until < now))
+            .values(locked_by=owner, locked_until=now + timedelta(seconds=seconds))
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def release(cls, name, owner):
+        """
+        Give up the lease of a job if the run still holds it, and commit.
+        """
+        db.session.execute(
+            db.update(cls).where(cls.name == name, cls.locked_by == owner).values(locked_by=None, locked_until=None)
+        )
+        db.session.commit()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_id': self.last_id,
+            'last_run_at': self.last_run_at,
+            'last_run_rows': self.last_run_rows,
+            'last_run_seconds': self.last_run_seconds,
+            'total_rows': self.total_rows
+        }
+
+
+class LogHourlyRollup(db.Model):
+    """
+    Number of log entries per action, user and hour, maintained from the log table by the rollup job.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(255), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)  # Start of the hour (UTC)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('action', 'user_id', 'hour', name='uq_log_hourly_rollup_action_user_hour'),
+    )
+
+
+class LogDailyRollup(db.Model):
+    """
+    Number of log entries per action and day, maintained from the log table by the rollup job.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(255), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)  # UTC day
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('action', 'day', name='uq_log_daily_rollup_action_day'),
+    )
+
+
+class LogRollupGap(db.Model):
+    """
+    Log id skipped by the rollup watermark, re-checked by the next runs in case the
+    transaction inserting it commits after a higher id was already aggregated.
+    """
+    log_id = db.Column(db.Integer, primary_key=True)
+    seen_at = db.Column(db.DateTime, nullable=False, index=True)  # When the watermark passed it (UTC)
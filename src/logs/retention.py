@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone, timedelta
+
+from src.extensions import db
+from src.logs.models import Log, JobCheckpoint
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Days activity logs are kept (0 disables the retention job)
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', 90))
+# Width of the primary-key range deleted per transaction
+LOG_RETENTION_CHUNK_SIZE = int(os.getenv('LOG_RETENTION_CHUNK_SIZE', 1000))
+# Maximum rows deleted per second, to leave room for production traffic (0 means unthrottled)
+LOG_RETENTION_ROWS_PER_SECOND = int(os.getenv('LOG_RETENTION_ROWS_PER_SECOND', 5000))
+# Maximum seconds a single run may take; the next run resumes from the checkpoint
+LOG_RETENTION_MAX_DURATION = int(os.getenv('LOG_RETENTION_MAX_DURATION', 60))
+# Seconds between two runs of the retention job
+LOG_RETENTION_INTERVAL = int(os.getenv('LOG_RETENTION_INTERVAL', 300))
+# Seconds a run holds the job lease without renewing it (renewed after each chunk); past that,
+# the run is taken for dead and another worker may take over
+LOG_RETENTION_LEASE_SECONDS = int(os.getenv('LOG_RETENTION_LEASE_SECONDS', 120))
+
+# Statistics of the latest runs in this process
+recent_runs = deque(maxlen=20)
+
+
+class LogRetention:
+    """
+    Deletes activity logs older than the retention period, walking the table in ascending
+    primary-key ranges. Each range is deleted in its own short transaction, the deletion
+    rate is capped, and the start of the first range not yet emptied is checkpointed, so a
+    run can stop at any time and the next one resumes there (purged ranges are skipped).
+
+    Ids grow with time, so the walk ends at the id of the newest expired log.
+
+    Every worker schedules the job, but a run first takes the lease of the job checkpoint:
+    a single run deletes at a time across the deployment, so the rate cap holds for the
+    whole deployment and the checkpoint has a single writer.
+    """
+
+    name = 'log-retention'
+
+    def __init__(self, retention_days=LOG_RETENTION_DAYS, chunk_size=LOG_RETENTION_CHUNK_SIZE,
+                 rows_per_second=LOG_RETENTION_ROWS_PER_SECOND, max_duration=LOG_RETENTION_MAX_DURATION,
+                 lease_seconds=LOG_RETENTION_LEASE_SECONDS):
+        """
+        :param retention_days: Logs older than this many days are deleted.
+        :param chunk_size: Width of the id range deleted per transaction.
+        :param rows_per_second: Deletion rate cap (0 means unthrottled).
+        :param max_duration: Seconds after which the run stops (None means until done).
+        :param lease_seconds: Seconds the job lease is held without being renewed.
+        """
+        self.retention_days = retention_days
+        self.chunk_size = chunk_size
+        self.rows_per_second = rows_per_second
+        self.max_duration = max_duration
+        self.lease_seconds = lease_seconds
+
+    def run(self):
+        """
+        Purge expired logs until done, or until max_duration is reached.
+
+        :return: Dictionary of run statistics, or None if another worker is running the job.
+        """
+        owner = uuid.uuid4().hex
+        JobCheckpoint.get_or_create(self.name)
+        if not JobCheckpoint.acquire(self.name, owner, self.lease_seconds):
+            logger.info("Log retention is running in another worker, skipping this run")
+            return None
+        try:
+            return self._run(owner)
+        finally:
+            db.session.rollback()
+            JobCheckpoint.release(self.name, owner)
+
+    def _run(self, owner):
+        started = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        checkpoint = db.session.get(JobCheckpoint, self.name)
+        start_id = checkpoint.last_id
+        rows_deleted = 0
+        chunks = 0
+        finished = False
+        checkpoint_blocked = False
+
+        # Newest expired log, found by a seek on the (timestamp, id) index: the walk ends there
+        last_expired = db.session.query(Log.id).filter(Log.timestamp < cutoff) \
+            .order_by(Log.timestamp.desc(), Log.id.desc()).limit(1).scalar()
+        low = db.session.query(db.func.min(Log.id)).filter(Log.id >= start_id).scalar()
+        while True:
+            if low is None or last_expired is None or low > last_expired:
+                finished = True
+                break
+            if self.max_duration is not None and time.monotonic() - started >= self.max_duration:
+                break
+
+            chunk_started = time.monotonic()
+            high = low + self.chunk_size
+            in_range = db.and_(Log.id >= low, Log.id < high)
+            deleted = Log.query.filter(in_range, Log.timestamp < cutoff).delete(synchronize_session=False)
+            kept = db.session.query(Log.id).filter(in_range, Log.timestamp >= cutoff).first() is not None
+            # The checkpoint only moves over ranges that are now empty
+            if kept:
+                checkpoint_blocked = True
+            elif not checkpoint_blocked:
+                checkpoint.last_id = high
+            db.session.commit()
+            rows_deleted += deleted
+            chunks += 1
+            low = db.session.query(db.func.min(Log.id)).filter(Log.id >= high).scalar()
+
+            if self.rows_per_second and deleted:
+                time.sleep(max(0.0, deleted / self.rows_per_second - (time.monotonic() - chunk_started)))
+            if not JobCheckpoint.acquire(self.name, owner, self.lease_seconds):
+                logger.warning("Log retention lease taken over by another worker, stopping this run")
+                break
+
+        duration = round(time.monotonic() - started, 3)
+        checkpoint.last_run_at = datetime.now(timezone.utc)
+        checkpoint.last_run_rows = rows_deleted
+        checkpoint.last_run_seconds = duration
+        checkpoint.total_rows = (checkpoint.total_rows or 0) + rows_deleted
+        db.session.commit()
+
+        stats = {
+            'started_at': checkpoint.last_run_at,
+            'cutoff': cutoff,
+            'rows_deleted': rows_deleted,
+            'chunks': chunks,
+            'duration_seconds': duration,
+            'from_id': start_id,
+            'checkpoint_id': checkpoint.last_id,
+            'finished': finished
+        }
+        recent_runs.append(stats)
+        logger.info(f"Log retention deleted {rows_deleted} rows in {chunks} chunks ({duration}s, finished: {finished})")
+        return stats
+
+
+def purge_expired_logs():
+    """
+    Run the log retention job once. Runs as a periodic task.
+    """
+    try:
+        return LogRetention().run()
+    except Exception as e:
+        logger.error(f"Error purging expired logs: {str(e)}")
+        db.session.rollback()
+        return None
+
+
+def retention_stats():
+    """
+    :return: Dictionary with the retention settings, the stored checkpoint and the recent runs of this process.
+    """
+    checkpoint = db.session.get(JobCheckpoint, LogRetention.name)
+    return {
+        'retention_days': LOG_RETENTION_DAYS,
+        'chunk_size': LOG_RETENTION_CHUNK_SIZE,
+        'rows_per_second': LOG_RETENTION_ROWS_PER_SECOND,
+        'checkpoint': checkpoint.to_dict() if checkpoint else None,
+        'recent_runs': list(recent_runs)
+    }
@@ -0,0 +1,202 @@
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+
+from src.extensions import db
+from src.logs.models import Log, JobCheckpoint, LogHourlyRollup, LogDailyRollup, LogRollupGap
+from src.utils.db import upsert_increment
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Seconds between two runs of the rollup job (0 disables it)
+LOG_ROLLUP_INTERVAL = int(os.getenv('LOG_ROLLUP_INTERVAL', 60))
+# Log entries aggregated per transaction
+LOG_ROLLUP_BATCH_SIZE = int(os.getenv('LOG_ROLLUP_BATCH_SIZE', 5000))
+# Entries younger than this many seconds are left for the next run. The timestamp is taken
+# when the entry is queued, so this only thins out the gaps below, it does not bound commit time
+LOG_ROLLUP_LAG_SECONDS = int(os.getenv('LOG_ROLLUP_LAG_SECONDS', 10))
+# Ids missing below the watermark are re-checked for this many seconds, so that a transaction
+# committing a lower id late is still counted (past that, the insert is taken as rolled back)
+LOG_ROLLUP_GAP_SECONDS = int(os.getenv('LOG_ROLLUP_GAP_SECONDS', 600))
+# Longer runs of missing ids are deleted ranges or sequence jumps, not transactions in flight
+LOG_ROLLUP_MAX_GAP = int(os.getenv('LOG_ROLLUP_MAX_GAP', 1000))
+
+ROLLUP_JOB_NAME = 'log-rollups'
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _add_to_rollups(rows):
+    """
+    Add log entries to the hourly and daily rollups. The caller commits.
+
+    :param rows: Log entries with their id, user_id, action and timestamp.
+    """
+    hourly = Counter()
+    daily = Counter()
+    for row in rows:
+        timestamp = _naive_utc(row.timestamp)
+        hourly[(row.action, row.user_id, timestamp.replace(minute=0, second=0, microsecond=0))] += 1
+        daily[(row.action, timestamp.date())] += 1
+
+    upsert_increment(LogHourlyRollup, [
+        {'action': action, 'user_id': user_id, 'hour': hour, 'count': count}
+        for (action, user_id, hour), count in hourly.items()
+    ], ('action', 'user_id', 'hour'), ('count',))
+    upsert_increment(LogDailyRollup, [
+        {'action': action, 'day': day, 'count': count}
+        for (action, day), count in daily.items()
+    ], ('action', 'day'), ('count',))
+
+
+def _record_gaps(last_id, rows, max_gap, now):
+    """
+    Remember the ids missing between the watermark and the rows about to be aggregated. The caller commits.
+
+    :param last_id: Watermark before these rows.
+    :param rows: Log entries in id order.
+    :param max_gap: Longer runs of missing ids are not recorded.
+    :param now: Time the gaps are seen at (naive UTC).
+    """
+    gaps = []
+    for row in rows:
+        if 1 < row.id - last_id <= max_gap + 1:
+            gaps.extend(range(last_id + 1, row.id))
+        last_id = row.id
+    if gaps:
+        db.session.execute(db.insert(LogRollupGap), [{'log_id': log_id, 'seen_at': now} for log_id in gaps])
+
+
+def _collect_gaps(gap_seconds, now):
+    """
+    Aggregate the entries committed since the last runs into ids skipped by the watermark,
+    and forget the gaps older than gap_seconds.
+
+    :param gap_seconds: How long a gap is re-checked.
+    :param now: Current time (naive UTC).
+    :return: Number of log entries aggregated.
+    """
+    try:
+        JobCheckpoint.lock(ROLLUP_JOB_NAME)
+        rows = db.session.query(Log.id, Log.user_id, Log.action, Log.timestamp) \
+            .join(LogRollupGap, LogRollupGap.log_id == Log.id).filter(Log.timestamp.isnot(None)).all()
+        if rows:
+            # Deleting the gaps first claims them: fewer deletions means another worker collected some
+            deleted = db.session.execute(
+                db.delete(LogRollupGap).where(LogRollupGap.log_id.in_([row.id for row in rows]))
+            ).rowcount
+            if deleted != len(rows):
+                db.session.rollback()
+                logger.info("Rollup gaps collected by another worker meanwhile")
+                return 0
+            _add_to_rollups(rows)
+        db.session.execute(db.delete(LogRollupGap).where(LogRollupGap.seen_at < now - timedelta(seconds=gap_seconds)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+
+def _advance_watermark(seen_id, last_id):
+    """
+    Move the rollup watermark from seen_id to last_id, unless another worker moved it meanwhile. The caller commits.
+
+    :return: Whether the watermark was moved.
+    """
+    result = db.session.execute(
+        db.update(JobCheckpoint)
+        .where(JobCheckpoint.name == ROLLUP_JOB_NAME, JobCheckpoint.last_id == seen_id)
+        .values(last_id=last_id)
+    )
+    return result.rowcount == 1
+
+
+def update_rollups(batch_size=LOG_ROLLUP_BATCH_SIZE, lag_seconds=LOG_ROLLUP_LAG_SECONDS, max_batches=None,
+                   gap_seconds=LOG_ROLLUP_GAP_SECONDS, max_gap=LOG_ROLLUP_MAX_GAP):
+    """
+    Add the log entries written since the last run to the hourly and daily rollups.
+    Entries are read past an id watermark; each batch updates the rollups, the watermark
+    and the ids it skipped in the same transaction. Ids are not committed in order, so the
+    skipped ids are re-checked for gap_seconds and aggregated if they show up: an entry is
+    counted once, unless its transaction commits more than gap_seconds after a higher id.
+
+    Every worker runs the job: each batch locks the checkpoint row and only moves the watermark
+    from the value it read, so a batch overlapping the one of another worker is rolled back.
+
+    :param batch_size: Entries aggregated per transaction.
+    :param lag_seconds: Only entries older than this are aggregated.
+    :param max_batches: Stop after this many batches (None means until caught up).
+    :param gap_seconds: How long an id skipped by the watermark is re-checked.
+    :param max_gap: Longer runs of missing ids are not re-checked.
+    :return: Number of log entries aggregated.
+    """
+    started = time.monotonic()
+    JobCheckpoint.get_or_create(ROLLUP_JOB_NAME)
+    now = datetime.now(timezone.utc)
+    horizon = now - timedelta(seconds=lag_seconds)
+    aggregated = _collect_gaps(gap_seconds, _naive_utc(now))
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        try:
+            seen_id = JobCheckpoint.lock(ROLLUP_JOB_NAME).last_id
+            rows = db.session.query(Log.id, Log.user_id, Log.action, Log.timestamp) \
+                .filter(Log.id > seen_id).order_by(Log.id).limit(batch_size).all()
+            ready = []
+            for row in rows:
+                if row.timestamp is None or _naive_utc(row.timestamp) >= _naive_utc(horizon):
+                    break
+                ready.append(row)
+            if not ready:
+                db.session.rollback()
+                break
+
+            if not _advance_watermark(seen_id, ready[-1].id):
+                db.session.rollback()
+                logger.info(f"Log rollups past id {seen_id} taken by another worker meanwhile")
+                break
+            _add_to_rollups(ready)
+            _record_gaps(seen_id, ready, max_gap, _naive_utc(now))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        aggregated += len(ready)
+        batches += 1
+        if len(ready) < len(rows) or len(rows) < batch_size:
+            break
+
+    # Counters are added in SQL, the other workers update them too
+    db.session.execute(
+        db.update(JobCheckpoint).where(JobCheckpoint.name == ROLLUP_JOB_NAME).values(
+            last_run_at=datetime.now(timezone.utc),
+            last_run_rows=aggregated,
+            last_run_seconds=round(time.monotonic() - started, 3),
+            total_rows=JobCheckpoint.total_rows + aggregated
+        )
+    )
+    db.session.commit()
+    if aggregated:
+        logger.info(f"Rolled up {aggregated} log entries in {batches} batches")
+    return aggregated
+
+
+def refresh_rollups():
+    """
+    Run the rollup job once. Runs as a periodic task.
+    """
+    try:
+        return update_rollups()
+    except Exception as e:
+        logger.error(f"Error updating log rollups: {str(e)}")
+        db.session.rollback()
+        return 0
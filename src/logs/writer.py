@@ -0,0 +1,213 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from src.extensions import db
+from src.logs.models import Log
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Set to "false" to write activity logs synchronously, one transaction per entry
+LOG_WRITER_ENABLED = os.getenv('LOG_WRITER_ENABLED', 'true').lower() == 'true'
+# Entries waiting to be written; beyond that the overflow policy applies
+LOG_WRITER_QUEUE_SIZE = int(os.getenv('LOG_WRITER_QUEUE_SIZE', 10000))
+# Entries written per INSERT
+LOG_WRITER_BATCH_SIZE = int(os.getenv('LOG_WRITER_BATCH_SIZE', 500))
+# Maximum seconds an entry waits before being written
+LOG_WRITER_FLUSH_INTERVAL = float(os.getenv('LOG_WRITER_FLUSH_INTERVAL', 1.0))
+# What to do when the queue is full: "block" (wait up to LOG_WRITER_BLOCK_TIMEOUT, then drop),
+# "drop" (drop the new entry) or "sync" (write the entry in the request)
+LOG_WRITER_OVERFLOW = os.getenv('LOG_WRITER_OVERFLOW', 'block')
+LOG_WRITER_BLOCK_TIMEOUT = float(os.getenv('LOG_WRITER_BLOCK_TIMEOUT', 0.5))
+# Attempts to write a batch before it is dropped
+LOG_WRITER_MAX_ATTEMPTS = int(os.getenv('LOG_WRITER_MAX_ATTEMPTS', 3))
+
+_STOP = object()
+
+
+class LogWriter:
+    """
+    Background writer for activity logs. Entries are queued by the request and written
+    by a single thread in bulk INSERTs (executemany), one transaction per batch, when the
+    batch is full or the flush interval has passed. The queue is drained on shutdown.
+    """
+
+    def __init__(self, queue_size=LOG_WRITER_QUEUE_SIZE, batch_size=LOG_WRITER_BATCH_SIZE,
+                 flush_interval=LOG_WRITER_FLUSH_INTERVAL, overflow=LOG_WRITER_OVERFLOW,
+                 block_timeout=LOG_WRITER_BLOCK_TIMEOUT, max_attempts=LOG_WRITER_MAX_ATTEMPTS):
+        if overflow not in ('block', 'drop', 'sync'):
+            raise ValueError(f"Unknown log writer overflow policy: {overflow}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_attempts = max_attempts
+        self.app = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app):
+        """
+        Start the writer thread.
+
+        :param app: The Flask app whose database the entries are written to.
+        """
+        if self.running:
+            return
+        self.app = app
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"Log writer started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    def write(self, user_id, action, details=None, ip_address=None):
+        """
+        Queue an activity log entry. The timestamp is taken now, not when the entry is written.
+
+        :return: True if the entry was queued or written, False if it was dropped.
+        """
+        entry = {
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'timestamp': datetime.now(timezone.utc)
+        }
+        if not self.running:
+            return self._write_now(entry)
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            if self.overflow == 'sync':
+                return self._write_now(entry)
+            self.dropped += 1
+            logger.error(f"Activity log queue full, entry dropped: user {user_id}, {action}")
+            return False
+
+    def _write_now(self, entry):
+        log = Log(entry['user_id'], entry['action'], details=entry['details'], ip_address=entry['ip_address'])
+        log.timestamp = entry['timestamp']
+        log.save()
+        return True
+
+    def _collect(self):
+        """
+        Wait for the next batch: up to batch_size entries or flush_interval seconds.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self.flush_batch(batch)
+            if self._stopping.is_set() and self._queue.empty():
+                break
+
+    def flush_batch(self, batch):
+        """
+        Write a batch of entries in one transaction, retrying up to max_attempts times.
+
+        :return: True if the batch was written.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.app.app_context():
+                    try:
+                        db.session.execute(insert(Log), batch)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+                self.written += len(batch)
+                return True
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} activity logs (attempt {attempt}): {str(e)}")
+                if attempt < self.max_attempts:
+                    time.sleep(min(0.1 * 2 ** attempt, 2))
+        self.failed += len(batch)
+        return False
+
+    def stop(self, timeout=10):
+        """
+        Stop the writer once every queued entry has been written.
+        """
+        if not self.running:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self.running:
+            logger.error(f"Log writer did not drain in {timeout}s, {self._queue.qsize()} entries lost")
+        else:
+            logger.info(f"Log writer stopped ({self.written} written, {self.dropped} dropped, {self.failed} failed)")
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+
+log_writer = LogWriter()
+atexit.register(log_writer.stop)
+
+
+def init_log_writer(app):
+    """
+    Start the background log writer, unless it is disabled or the app is under test
+    (activity logs are then written synchronously).
+
+    :param app: The Flask app.
+    """
+    if LOG_WRITER_ENABLED and not app.config.get('TESTING'):
+        log_writer.start(app)
+
+
+def log_activity(user_id, action, details=None, ip_address=None):
+    """
+    Record a user activity without writing to the database in the request.
+
+    :param user_id: ID of the user who performed the action.
+    :param action: Description of the action performed.
+    :param details: Additional details about the action (optional).
+    :param ip_address: IP address from where the action was performed (optional).
+    :return: True if the entry was recorded, False if it was dropped.
+    """
+    return log_writer.write(user_id, action, details=details, ip_address=ip_address)
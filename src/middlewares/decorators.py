@@ -1,16 +1,28 @@
+import hashlib
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
+from flask import jsonify, make_response, request, g
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 import logging
-from src.exceptions import UnauthorizedError, NotFoundError, ValidationError
-from src.users.models import User
+from src.error_handler import error_headers
+from src.exceptions import UnauthorizedError, NotFoundError, ValidationError, TooManyRequestsError, \
+    ServiceUnavailableError, BadGatewayError, GatewayTimeoutError
+from src.api_keys.services import authenticate_api_key
+from src.users.cache import user_state_cache
+from src.utils.response_cache import response_cache
+from src.utils.versioning import table_versions
 
 # Logger configuration
 logger = logging.getLogger(__name__)
 
+# Header carrying the API key of machine clients
+API_KEY_HEADER = 'X-API-Key'
+
 def role_required(required_role):
     """
-    Custom decorator to check if the user has the required role.
+    Custom decorator to check if the user has the required role and an active account.
+    The role is read from the JWT claims and confirmed against the cached user state,
+    so a request does not cost a database query unless the cache entry has expired.
+    A role or active state changed by another worker is seen within USER_STATE_CACHE_TTL seconds.
     :param required_role: The role required to access the resource.
     :return: Decorator function.
     """
@@ -21,32 +33,90 @@ def role_required(required_role):
             try:
                 # Retrieve user identity from the JWT
                 user_identity = get_jwt_identity()
-                user = User.query.filter_by(id=user_identity['user_id']).first()
+                if not isinstance(user_identity, dict) or user_identity.get('role') != required_role:
+                    logger.warning(f"Token without the {required_role} role attempted to access a {required_role} resource.")
+                    raise UnauthorizedError("You do not have the required role.")
 
-                if user is None:
+                user_state = user_state_cache.get(user_identity.get('user_id'))
+                if user_state is None:
                     logger.warning("User not found while trying to access a role-protected resource.")
                     raise NotFoundError("User not found")
 
-                if user.role != required_role:
+                if not user_state['is_active']:
+                    logger.warning(f"Inactive user attempted to access a {required_role} resource.")
+                    raise UnauthorizedError("Your account is not active.")
+
+                if user_state['role'] != required_role:
                     logger.warning(
-                        f"User with role {user.role} attempted to access a {required_role} resource."
+                        f"User with role {user_state['role']} attempted to access a {required_role} resource."
                     )
                     raise UnauthorizedError("You do not have the required role.")
 
-                logger.info(f"User with role {user.role} accessed a {required_role} resource.")
-                return f(*args, **kwargs)
+                logger.info(f"User with role {user_state['role']} accessed a {required_role} resource.")
             except UnauthorizedError as ue:
-                return jsonify({"msg": str(ue)}), 403
+                return make_response(jsonify({"msg": str(ue)}), 403)
             except NotFoundError as ne:
-                return jsonify({"msg": str(ne)}), 404
+                return make_response(jsonify({"msg": str(ne)}), 404)
             except Exception as e:
                 logger.error(f"Error in role_required decorator: {str(e)}")
-                return jsonify({'status': 'failed', 'message': 'An error occurred', 'error': str(e)}), 500
+                return make_response(jsonify({'status': 'failed', 'message': 'An error occurred', 'error': str(e)}), 500)
+
+            # Errors of the view itself go to the app error handlers
+            return f(*args, **kwargs)
 
         return wrapper
 
     return decorator
 
+def api_key_required(f):
+    """
+    Custom decorator authenticating machine clients by the API key in the X-API-Key header.
+    The key details are made available as g.api_key.
+    :param f: The function to wrap.
+    :return: Decorated function that rejects requests without a valid API key.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        try:
+            api_key = authenticate_api_key(request.headers.get(API_KEY_HEADER))
+        except Exception as e:
+            logger.error(f"Error in api_key_required decorator: {str(e)}")
+            return make_response(jsonify({'status': 'failed', 'message': 'An error occurred', 'error': str(e)}), 500)
+
+        if api_key is None:
+            logger.warning("Request rejected: missing, invalid or expired API key.")
+            return make_response(jsonify({"msg": "A valid API key is required."}), 401)
+
+        g.api_key = api_key
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def api_key_or_jwt_required(f):
+    """
+    Custom decorator accepting either an API key in the X-API-Key header (machine clients,
+    made available as g.api_key) or the access token of an active user.
+    :param f: The function to wrap.
+    :return: Decorated function that rejects unauthenticated requests.
+    """
+    with_api_key = api_key_required(f)
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if request.headers.get(API_KEY_HEADER):
+            return with_api_key(*args, **kwargs)
+
+        verify_jwt_in_request()
+        user_identity = get_jwt_identity()
+        user_id = user_identity.get('user_id') if isinstance(user_identity, dict) else None
+        user_state = user_state_cache.get(user_id) if user_id else None
+        if user_state is None or not user_state['is_active']:
+            logger.warning("Inactive or unknown user attempted to access an authenticated resource.")
+            return make_response(jsonify({"msg": "Your account is not active."}), 403)
+        return f(*args, **kwargs)
+    return wrapper
+
+
 def handle_exceptions(f):
     """
     Custom decorator to handle exceptions in the wrapped function.
@@ -63,8 +133,85 @@ def handle_exceptions(f):
             return jsonify({"msg": str(ne)}), 404
         except ValidationError as ve:
             return jsonify({"msg": str(ve)}), 400
+        except (TooManyRequestsError, ServiceUnavailableError, BadGatewayError, GatewayTimeoutError) as ce:
+            return jsonify({"msg": str(ce)}), ce.status_code, error_headers(ce)
         except Exception as e:
             logger.error(f"Unhandled error: {str(e)}")
             return jsonify({'status': 'failed', 'message': 'An unexpected error occurred', 'error': str(e)}), 500
     return wrapper
 
+
+
+def _caller_id():
+    identity = get_jwt_identity()
+    return identity.get('user_id') if isinstance(identity, dict) else identity
+
+
+def conditional_get(*tables, per_user=False):
+    """
+    Custom decorator adding a strong ETag to a read endpoint, computed from the change counters
+    of the tables it reads rather than from the response body. A request whose If-None-Match
+    matches gets a 304 before the view runs its query and serializes the result.
+    :param tables: Names of the tables the response is built from.
+    :param per_user: Whether the response depends on the caller (e.g. their own API keys).
+    :return: Decorator function.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = table_versions(*tables)
+            caller = _caller_id() if per_user else ''
+            marker = '|'.join([request.path, request.query_string.decode('latin-1'), str(caller)] +
+                              [f"{table}:{versions[table]}" for table in sorted(versions)])
+            etag = hashlib.sha256(marker.encode('utf-8')).hexdigest()[:32]
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+
+    return decorator
+
+
+def cached_response(*tags, ttl=None, per_user=False):
+    """
+    Custom decorator serving a read endpoint from the response cache. Successful responses
+    are cached per route, query arguments and (with per_user) caller, and filed under the
+    tags, i.e. the tables they are built from, so that writes to those tables invalidate them.
+    :param tags: Names of the tables the response is built from.
+    :param ttl: Lifetime of the cached responses in seconds (defaults to RESPONSE_CACHE_TTL).
+    :param per_user: Whether the response depends on the caller (e.g. their own API keys).
+    :return: Decorator function.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled or request.method != 'GET':
+                return f(*args, **kwargs)
+
+            key = response_cache.key(tags, _caller_id() if per_user else None)
+            entry = response_cache.get(key)
+            if entry is not None:
+                status, mimetype, body = entry
+                response = make_response(body, status)
+                response.mimetype = mimetype
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response_cache.set(key, (response.status_code, response.mimetype, response.get_data()), ttl)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+
+    return decorator
@@ -0,0 +1,330 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask_jwt_extended.exceptions import WrongTokenError
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from src.api_keys.services import authenticate_api_key
+from src.exceptions import TooManyRequestsError
+from src.middlewares.decorators import API_KEY_HEADER
+from src.tokens.services import token_user_id
+from src.utils.cache import TTLCache
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Set to "false" to disable rate limiting
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# "memory" (per process) or "sqlite" (shared by the worker processes of a host)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# File of the sqlite backend
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'rate_limits.db'))
+# Buckets kept by the memory backend
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', 100000))
+# JSON overriding the default limits, e.g. {"/api/keys": {"user": "30/minute"}}
+RATE_LIMITS = os.getenv('RATE_LIMITS', '')
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted (0 when clients connect
+# directly); behind a proxy, leaving it at 0 puts every anonymous client in the bucket of the proxy
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+
+# Limits per URL prefix (one per namespace) and per tier, as "<requests>/<period>".
+# The longest matching prefix applies; a tier without a limit is not limited.
+# Tiers: anonymous (by IP), user and admin (by JWT user_id), api_key (by key).
+DEFAULT_RATE_LIMITS = {
+    '/api': {'anonymous': '60/minute', 'user': '300/minute', 'admin': '600/minute', 'api_key': '600/minute'},
+    '/api/auth': {'anonymous': '10/minute', 'user': '30/minute', 'admin': '30/minute'},
+    '/api/users': {'anonymous': '10/minute', 'user': '60/minute', 'admin': '120/minute'},
+    '/api/keys': {'anonymous': '10/minute', 'user': '30/minute', 'admin': '60/minute', 'api_key': '60/minute'},
+    '/api/tokens': {'anonymous': '10/minute', 'user': '30/minute', 'admin': '60/minute'},
+    '/api/admin': {'anonymous': '10/minute', 'user': '10/minute', 'admin': '300/minute'},
+    '/api/inference': {'anonymous': '10/minute', 'user': '60/minute', 'admin': '120/minute', 'api_key': '600/minute'},
+}
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class RateLimit:
+    """
+    Token bucket: holds up to `capacity` tokens, refilled at capacity / period per second.
+    Each request takes one token, so bursts up to the capacity are allowed.
+    """
+
+    def __init__(self, capacity, period):
+        if capacity <= 0 or period <= 0:
+            raise ValueError("Rate limit capacity and period must be positive")
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    @classmethod
+    def parse(cls, value):
+        """
+        :param value: A limit such as "100/minute" or "5/10 seconds".
+        :return: The RateLimit.
+        """
+        try:
+            count, period = value.split('/')
+            parts = period.split()
+            multiplier = int(parts[0]) if len(parts) == 2 else 1
+            return cls(int(count), multiplier * _PERIODS[parts[-1].rstrip('s')])
+        except (ValueError, KeyError, IndexError):
+            raise ValueError(f"Invalid rate limit: {value}")
+
+    def __repr__(self):
+        return f"RateLimit(capacity={self.capacity}, period={self.period})"
+
+
+def take_token(tokens, updated_at, limit, now):
+    """
+    Refill a bucket and try to take one token from it.
+
+    :return: Tuple (allowed, tokens left, retry after in seconds).
+    """
+    tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, (1 - tokens) / limit.rate
+
+
+class MemoryBackend:
+    """
+    Buckets in process memory. Each worker process limits on its own.
+    """
+
+    def __init__(self, maxsize=RATE_LIMIT_MAX_BUCKETS):
+        self._buckets = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit):
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            allowed, tokens, retry_after = take_token(tokens, updated_at, limit, now)
+            # A bucket left alone for a full period is full again, so it can be forgotten
+            self._buckets.set(key, (tokens, now), ttl=limit.period)
+        return allowed, tokens, retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SQLiteBackend:
+    """
+    Buckets in a local SQLite file, shared by every worker process of the host.
+    Each request is one short write transaction.
+    """
+
+    # Buckets untouched for this many seconds are deleted
+    PRUNE_AFTER = 86400
+    PRUNE_EVERY = 10000
+
+    def __init__(self, path=RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_bucket '
+            '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def consume(self, key, limit):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated_at FROM rate_limit_bucket WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (limit.capacity, now)
+            allowed, tokens, retry_after = take_token(tokens, updated_at, limit, now)
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated_at) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            connection.execute('DELETE FROM rate_limit_bucket WHERE updated_at < ?', (now - self.PRUNE_AFTER,))
+        return allowed, tokens, retry_after
+
+    def clear(self):
+        self._connection().execute('DELETE FROM rate_limit_bucket')
+
+
+class RateLimiter:
+    """
+    Applies the limit of the namespace and tier of each request to its client's bucket.
+    """
+
+    def __init__(self, backend, limits=None):
+        """
+        :param backend: Bucket store (MemoryBackend or SQLiteBackend).
+        :param limits: Limits per URL prefix and tier (defaults to DEFAULT_RATE_LIMITS).
+        """
+        self.backend = backend
+        self.limits = {
+            prefix.rstrip('/'): {tier: RateLimit.parse(value) for tier, value in tiers.items()}
+            for prefix, tiers in (limits or DEFAULT_RATE_LIMITS).items()
+        }
+        # Longest prefixes first
+        self._prefixes = sorted(self.limits, key=len, reverse=True)
+
+    def match(self, path):
+        """
+        :param path: The request path.
+        :return: The URL prefix whose limits apply to the path, or None.
+        """
+        for prefix in self._prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return prefix
+        return None
+
+    def hit(self, path, tier, client):
+        """
+        Count one request and raise if the client is over its limit.
+
+        :param path: The request path.
+        :param tier: Tier of the client (anonymous, user, admin, api_key).
+        :param client: Identity of the client within its tier (IP, user id or key id).
+        :return: Tuple (limit, tokens left), or None if the request is not limited.
+        """
+        prefix = self.match(path)
+        if prefix is None:
+            return None
+        limit = self.limits[prefix].get(tier)
+        if limit is None:
+            return None
+
+        try:
+            allowed, tokens, retry_after = self.backend.consume(f"{prefix}|{tier}|{client}", limit)
+        except Exception as e:
+            # Never turn a limiter failure into an outage
+            logger.error(f"Rate limiter backend error: {str(e)}")
+            return None
+
+        if not allowed:
+            logger.warning(f"Rate limit exceeded on {prefix} by {tier} {client}")
+            raise TooManyRequestsError("Rate limit exceeded, slow down.", retry_after=math.ceil(retry_after))
+        return limit, tokens
+
+
+def identify_client():
+    """
+    Identify the client of the current request: by API key, then by JWT, then by IP.
+    Invalid credentials fall back to the IP; the views still reject them.
+
+    :return: Tuple (tier, client identity).
+    """
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        try:
+            details = authenticate_api_key(api_key)
+        except SQLAlchemyError:
+            # The view fails the request; limit it by IP meanwhile
+            details = None
+        if details is not None:
+            return 'api_key', details['id']
+    elif 'Authorization' in request.headers:
+        try:
+            try:
+                verify_jwt_in_request(optional=True)
+            except WrongTokenError:
+                verify_jwt_in_request(optional=True, refresh=True)
+            claims = get_jwt()
+            user_id = token_user_id(claims)
+            if user_id:
+                identity = claims.get('sub')
+                role = identity.get('role') if isinstance(identity, dict) else None
+                return role if role in ('user', 'admin') else 'user', user_id
+        except Exception as e:
+            # The view rejects the token; limit the request by IP meanwhile
+            logger.info(f"Rate limiting by IP, the token could not be read: {str(e)}")
+    return 'anonymous', request.remote_addr
+
+
+def create_rate_limiter():
+    """
+    Build the rate limiter from the environment configuration.
+    """
+    if RATE_LIMIT_BACKEND == 'sqlite':
+        backend = SQLiteBackend()
+    elif RATE_LIMIT_BACKEND == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown rate limit backend: {RATE_LIMIT_BACKEND}")
+
+    limits = {prefix: dict(tiers) for prefix, tiers in DEFAULT_RATE_LIMITS.items()}
+    for prefix, tiers in json.loads(RATE_LIMITS or '{}').items():
+        limits.setdefault(prefix, {}).update(tiers)
+    return RateLimiter(backend, limits)
+
+
+def init_proxy_fix(app, trusted_proxies=TRUSTED_PROXY_COUNT):
+    """
+    Take the client address and scheme from the X-Forwarded-For and X-Forwarded-Proto headers
+    set by the trusted reverse proxies, so that anonymous clients are limited by their own IP.
+
+    :param app: The Flask app.
+    :param trusted_proxies: Number of reverse proxies in front of the app (0 leaves requests as they are).
+    """
+    if trusted_proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
+        logger.info(f"Client addresses taken from the headers of {trusted_proxies} trusted proxies")
+
+
+def init_rate_limiting(app):
+    """
+    Register the request hooks applying the rate limits. Requests over their limit
+    get a 429 with a Retry-After header; the others get X-RateLimit-* headers.
+
+    :param app: The Flask app.
+    :return: The RateLimiter, or None if rate limiting is disabled.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    limiter = create_rate_limiter()
+    app.extensions['rate_limiter'] = limiter
+
+    @app.before_request
+    def apply_rate_limit():
+        if request.method == 'OPTIONS':
+            return None
+        if limiter.match(request.path) is None:
+            return None
+        tier, client = identify_client()
+        g.rate_limit = limiter.hit(request.path, tier, client)
+        return None
+
+    @app.after_request
+    def add_rate_limit_headers(response):
+        rate_limit = g.get('rate_limit')
+        if rate_limit is not None:
+            limit, tokens = rate_limit
+            response.headers['X-RateLimit-Limit'] = str(limit.capacity)
+            response.headers['X-RateLimit-Remaining'] = str(int(tokens))
+        return response
+
+    logger.info(f"Rate limiting enabled with the {RATE_LIMIT_BACKEND} backend")
+    return limiter
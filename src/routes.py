@@ -3,6 +3,8 @@ from flask import Blueprint
 from src.users.controllers import *
 from src.admin.controllers import *
 from src.api_keys.controllers import *
+from src.tokens.controllers import jwks
+from src.inference.controllers import list_models, run_inference
 
 # Logger configuration
 logger = logging.getLogger(__name__)
@@ -33,7 +35,14 @@ def register_blueprints(app):
         ('/users', ['GET'], list_users),
         ('/users/<int:user_id>/deactivate', ['PUT'], deactivate_user),
         ('/users/<int:user_id>/activate', ['PUT'], activate_user),
-        ('/logs', ['GET'], view_user_logs)
+        ('/users/<int:user_id>/revoke-tokens', ['POST'], revoke_user_tokens),
+        ('/logs', ['GET'], view_user_logs),
+        ('/logs/export', ['GET'], export_user_logs),
+        ('/logs/retention', ['GET'], log_retention),
+        ('/stats/actions', ['GET'], action_stats),
+        ('/stats/users', ['GET'], user_activity_stats),
+        ('/metrics/hashing', ['GET'], hashing_metrics),
+        ('/usage', ['GET'], api_key_usage)
     ]
     add_routes(admin_bp, admin_routes)
 
@@ -41,11 +50,29 @@ def register_blueprints(app):
     api_key_bp = Blueprint('api_keys', __name__, url_prefix='/api/keys')
     api_key_routes = [
         ('/generate', ['POST'], generate_api_key),
-        ('/all', ['GET'], get_user_api_keys)
+        ('/all', ['GET'], get_user_api_keys),
+        ('/<int:key_id>', ['DELETE'], delete_api_key)
     ]
     add_routes(api_key_bp, api_key_routes)
 
+    # Inference Blueprint
+    inference_bp = Blueprint('inference', __name__, url_prefix='/api/inference')
+    inference_routes = [
+        ('/models', ['GET'], list_models),
+        ('/<string:model>', ['POST'], run_inference)
+    ]
+    add_routes(inference_bp, inference_routes)
+
+    # Well-known Blueprint
+    well_known_bp = Blueprint('well_known', __name__, url_prefix='/.well-known')
+    well_known_routes = [
+        ('/jwks.json', ['GET'], jwks)
+    ]
+    add_routes(well_known_bp, well_known_routes)
+
     # Register blueprints with the Flask app
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_key_bp)
+    app.register_blueprint(inference_bp)
+    app.register_blueprint(well_known_bp)
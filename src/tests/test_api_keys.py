@@ -0,0 +1,139 @@
+import hashlib
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from src import app, db
+from src.api_keys.cache import api_key_cache
+from src.api_keys.migration import hash_plaintext_api_keys
+from src.api_keys.models import ApiKeyModel, hash_api_key
+from src.api_keys.services import authenticate_api_key
+from src.api_keys.usage import usage_meter
+from src.tokens.services import create_jwt_token
+from src.users.cache import user_state_cache
+from src.users.models import User
+
+
+class ApiKeyTests(unittest.TestCase):
+    """
+    Test suite for API key storage, lookup and authentication.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        api_key_cache.clear()
+        self.user = User(firstname='a', lastname='b', email='keys@example.com', password='x')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        api_key_cache.clear()
+        user_state_cache.clear()
+        usage_meter.flush()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def auth_headers(self, user):
+        user.is_active = True
+        db.session.commit()
+        access_token = create_jwt_token(user.id, user.role, token_generation=user.token_generation)['access_token']
+        return {'Authorization': f"Bearer {access_token}"}
+
+    def test_only_the_prefix_and_digest_are_stored(self):
+        api_key = ApiKeyModel(user_id=self.user.id)
+        api_key.save()
+        row = db.session.execute(text('SELECT * FROM api_key_model')).mappings().one()
+        self.assertEqual(row['prefix'], api_key.key[:8])
+        self.assertEqual(row['key_hash'], hashlib.sha256(api_key.key.encode('utf-8')).hexdigest())
+        self.assertNotIn(api_key.key, [str(value) for value in row.values()])
+
+    def test_lookup_compares_digests_in_constant_time(self):
+        api_key = ApiKeyModel(user_id=self.user.id)
+        api_key.save()
+        same_prefix = api_key.key[:8] + str(uuid.uuid4())[8:]
+
+        with mock.patch('src.api_keys.models.hmac.compare_digest', wraps=__import__('hmac').compare_digest) as compare:
+            self.assertEqual(ApiKeyModel.find_by_key(api_key.key).id, api_key.id)
+            self.assertIsNone(ApiKeyModel.find_by_key(same_prefix))
+        self.assertEqual(compare.call_count, 2)
+        self.assertIsNone(ApiKeyModel.find_by_key(str(uuid.uuid4())))
+
+    def test_keys_are_deleted_by_id_by_their_owner_only(self):
+        api_key = ApiKeyModel(user_id=self.user.id)
+        api_key.save()
+        key, key_id = api_key.key, api_key.id
+        self.assertIsNotNone(authenticate_api_key(key))
+        listing = self.client.get('/api/keys/all', headers=self.auth_headers(self.user)).get_json()
+        self.assertEqual([(item['id'], item['prefix']) for item in listing['api_keys']], [(key_id, key[:8])])
+
+        other = User(firstname='c', lastname='d', email='other@example.com', password='x')
+        db.session.add(other)
+        db.session.commit()
+        response = self.client.delete(f"/api/keys/{key_id}", headers=self.auth_headers(other))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.delete(f"/api/keys/{key_id}", headers=self.auth_headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(db.session.get(ApiKeyModel, key_id))
+        self.assertIsNone(authenticate_api_key(key))
+
+    def test_plaintext_keys_are_migrated_in_place(self):
+        db.session.execute(text('DROP TABLE api_key_model'))
+        db.session.execute(text(
+            'CREATE TABLE api_key_model (id INTEGER PRIMARY KEY, key VARCHAR(255) NOT NULL, '
+            'user_id INTEGER NOT NULL REFERENCES user (id), created_at DATETIME, expires_at DATETIME)'
+        ))
+        db.session.execute(text('CREATE UNIQUE INDEX ix_api_key_model_key ON api_key_model (key)'))
+        user_id = self.user.id
+        keys = [str(uuid.uuid4()) for _ in range(3)]
+        expires_at = datetime.utcnow() + timedelta(days=30)
+        for key in keys:
+            db.session.execute(text('INSERT INTO api_key_model (key, user_id, created_at, expires_at) '
+                                    'VALUES (:key, :user_id, :now, :expires_at)'),
+                               {'key': key, 'user_id': user_id, 'now': datetime.utcnow(), 'expires_at': expires_at})
+        db.session.commit()
+        db.session.remove()
+
+        self.assertEqual(hash_plaintext_api_keys(batch_size=2), 3)
+        columns = {column['name']: column for column in db.inspect(db.engine).get_columns('api_key_model')}
+        self.assertNotIn('key', columns)
+        self.assertFalse(columns['key_hash']['nullable'])
+        indexes = {index['name']: index for index in db.inspect(db.engine).get_indexes('api_key_model')}
+        self.assertTrue(indexes['ix_api_key_model_prefix_key_hash']['unique'])
+        for key in keys:
+            self.assertEqual(authenticate_api_key(key)['user_id'], user_id)
+
+        result = app.test_cli_runner().invoke(args=['hash-api-keys'])
+        self.assertEqual(result.output.strip(), '0 API keys migrated.')
+
+    def test_database_errors_are_not_cached_as_unknown_keys(self):
+        api_key = ApiKeyModel(user_id=self.user.id)
+        api_key.save()
+        key = api_key.key
+        db.session.execute(text('ALTER TABLE api_key_model RENAME TO api_key_model_offline'))
+        db.session.commit()
+
+        with self.assertRaises(SQLAlchemyError):
+            authenticate_api_key(key)
+        self.assertIsNone(api_key_cache.get(hash_api_key(key)))
+        response = self.client.get('/api/inference/models', headers={'X-API-Key': key})
+        self.assertEqual(response.status_code, 500)
+
+        # Back online: the key works at once, with no cached 401 in the way
+        db.session.execute(text('ALTER TABLE api_key_model_offline RENAME TO api_key_model'))
+        db.session.commit()
+        self.assertEqual(authenticate_api_key(key)['user_id'], self.user.id)
+        response = self.client.get('/api/inference/models', headers={'X-API-Key': key})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
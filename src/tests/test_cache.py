@@ -0,0 +1,219 @@
+import time
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from src import app, db
+from src.tokens.cache import RevokedTokenCache, purge_revoked_tokens, revoked_token_cache
+from src.tokens.manager import VerifiedTokenCache
+from src.tokens.models import RevokedToken
+from src.tokens.services import revoke_jwt_token
+from src.utils.cache import TTLCache, BloomFilter
+
+
+class TTLCacheTests(unittest.TestCase):
+    """
+    Test suite for the bounded TTL cache.
+    """
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('missing'))
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1, expires_at=time.time() - 1)
+        cache.set('b', 2, ttl=60)
+        self.assertNotIn('a', cache)
+        self.assertIn('b', cache)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+
+
+class BloomFilterTests(unittest.TestCase):
+    """
+    Test suite for the Bloom filter.
+    """
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [str(uuid.uuid4()) for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate_is_bounded(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for _ in range(1000):
+            bloom.add(str(uuid.uuid4()))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 500)
+
+
+class RevokedTokenCacheTests(unittest.TestCase):
+    """
+    Test suite for the revoked token cache in front of the blocklist table.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_revocations_from_the_database_are_loaded(self):
+        jti = str(uuid.uuid4())
+        RevokedToken(jti=jti).add()
+        cache = RevokedTokenCache(sync_interval=60)
+        self.assertTrue(cache.is_revoked(jti))
+        self.assertFalse(cache.is_revoked(str(uuid.uuid4())))
+
+    def test_local_revocation_is_seen_without_sync(self):
+        cache = RevokedTokenCache(sync_interval=60)
+        jti = str(uuid.uuid4())
+        self.assertFalse(cache.is_revoked(jti))
+        cache.add(jti, expires_at=time.time() + 60)
+        self.assertTrue(cache.is_revoked(jti))
+
+    def test_revocation_committed_out_of_id_order_is_loaded(self):
+        later = str(uuid.uuid4())
+        RevokedToken(id=10, jti=later).add()
+        cache = RevokedTokenCache(sync_interval=0)
+        self.assertTrue(cache.is_revoked(later))
+
+        # A lower id committed after the sync that saw id 10
+        earlier = str(uuid.uuid4())
+        RevokedToken(id=5, jti=earlier).add()
+        self.assertTrue(cache.is_revoked(earlier))
+
+    def test_revocation_is_cached_only_once_committed(self):
+        jti = str(uuid.uuid4())
+        revoked_token_cache.clear()
+        db.session.execute(text('ALTER TABLE revoked_token RENAME TO revoked_token_offline'))
+        db.session.commit()
+        try:
+            self.assertFalse(revoke_jwt_token(jti))
+            self.assertFalse(jti in revoked_token_cache._revoked)
+        finally:
+            db.session.execute(text('ALTER TABLE revoked_token_offline RENAME TO revoked_token'))
+            db.session.commit()
+
+        self.assertTrue(revoke_jwt_token(jti))
+        self.assertTrue(jti in revoked_token_cache._revoked)
+        self.assertTrue(RevokedToken.is_token_revoked(jti))
+        revoked_token_cache.clear()
+
+    def test_expired_tokens_leave_the_bloom_filter_after_a_purge(self):
+        now = datetime.now(timezone.utc)
+        expiring = [str(uuid.uuid4()) for _ in range(3)]
+        for jti in expiring:
+            RevokedToken(jti=jti, expires_at=now + timedelta(minutes=1)).add()
+        alive = str(uuid.uuid4())
+        RevokedToken(jti=alive, expires_at=now + timedelta(hours=1)).add()
+        revoked_token_cache.clear()
+        self.assertTrue(revoked_token_cache.is_revoked(alive))
+        self.assertTrue(all(jti in revoked_token_cache._bloom for jti in expiring))
+
+        # The tokens expire, then the periodic purge deletes their rows
+        RevokedToken.query.filter(RevokedToken.jti.in_(expiring)).update(
+            {'expires_at': now - timedelta(minutes=1)}, synchronize_session=False)
+        db.session.commit()
+        try:
+            self.assertEqual(purge_revoked_tokens(), 3)
+            self.assertFalse(any(jti in revoked_token_cache._bloom for jti in expiring))
+            self.assertEqual(revoked_token_cache._bloom.count, 1)
+            self.assertTrue(revoked_token_cache.is_revoked(alive))
+        finally:
+            revoked_token_cache.clear()
+
+    def test_bloom_filter_over_capacity_is_rebuilt_by_the_sync(self):
+        alive = str(uuid.uuid4())
+        RevokedToken(jti=alive, expires_at=datetime.now(timezone.utc) + timedelta(hours=1)).add()
+        cache = RevokedTokenCache(sync_interval=0, bloom_capacity=4)
+        self.assertTrue(cache.is_revoked(alive))
+        # Revocations seen only locally and gone from the table since
+        gone = [str(uuid.uuid4()) for _ in range(4)]
+        for jti in gone:
+            cache.add(jti, expires_at=time.time() - 1)
+        self.assertEqual(cache._bloom.count, 5)
+
+        self.assertFalse(cache.is_revoked(str(uuid.uuid4())))  # Syncs, finding the filter over capacity
+        self.assertEqual(cache._bloom.count, 1)
+        self.assertTrue(alive in cache._bloom)
+        self.assertFalse(any(jti in cache._bloom for jti in gone))
+
+
+class RevokedTokenPurgeTests(unittest.TestCase):
+    """
+    Test suite for the chunked purge of expired revoked tokens.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def revoke(self, count, expires_at=None, revoked_at=None):
+        for _ in range(count):
+            token = RevokedToken(jti=str(uuid.uuid4()), expires_at=expires_at)
+            if revoked_at is not None:
+                token.revoked_at = revoked_at
+            db.session.add(token)
+        db.session.commit()
+
+    def test_expired_rows_are_deleted_in_chunks(self):
+        now = datetime.now(timezone.utc)
+        self.revoke(7, expires_at=now - timedelta(minutes=1))
+        self.revoke(2, revoked_at=now - timedelta(days=30))  # Legacy rows without an expiry
+        self.revoke(3, expires_at=now + timedelta(hours=1))
+        self.revoke(1, revoked_at=now)
+
+        self.assertEqual(RevokedToken.purge_expired(chunk_size=4, pause=0, max_chunks=1), 4)
+        self.assertEqual(RevokedToken.query.count(), 9)
+        self.assertEqual(RevokedToken.purge_expired(chunk_size=4, pause=0), 5)
+        self.assertEqual(RevokedToken.query.count(), 4)
+        self.assertEqual(RevokedToken.purge_expired(chunk_size=4, pause=0), 0)
+
+
+class VerifiedTokenCacheTests(unittest.TestCase):
+    """
+    Test suite for the cache of verified token claims.
+    """
+
+    def test_claims_are_cached_until_discarded(self):
+        cache = VerifiedTokenCache(maxsize=10, ttl=60)
+        claims = {'jti': 'abc', 'exp': time.time() + 60, 'sub': 1}
+        cache.add('encoded-token', claims)
+        self.assertEqual(cache.get('encoded-token'), claims)
+        cache.discard_jti('abc')
+        self.assertIsNone(cache.get('encoded-token'))
+
+    def test_expired_tokens_are_not_served(self):
+        cache = VerifiedTokenCache(maxsize=10, ttl=60)
+        cache.add('encoded-token', {'jti': 'abc', 'exp': time.time() - 1})
+        self.assertIsNone(cache.get('encoded-token'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from src import app, db
+from src.logs.models import Log
+from src.middlewares.decorators import conditional_get
+from src.users.models import User
+from src.utils.versioning import table_versions
+
+
+class ConditionalGetTests(unittest.TestCase):
+    """
+    Test suite for the table change counters and the ETag decorator.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.calls = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def view(self):
+        self.calls += 1
+        return {'status': 'success'}, 200
+
+    def get(self, headers=None):
+        with app.test_request_context('/api/admin/logs?limit=5', headers=headers or {}):
+            return conditional_get('log')(self.view)()
+
+    def test_flushed_and_bulk_writes_bump_the_counters(self):
+        self.assertEqual(table_versions('user', 'log'), {'user': 0, 'log': 0})
+        db.session.add(User(firstname='a', lastname='b', email='a@example.com', password='x'))
+        db.session.commit()
+        db.session.execute(db.insert(Log), [{'user_id': 1, 'action': 'login'}] * 3)
+        db.session.commit()
+        self.assertEqual(table_versions('user', 'log'), {'user': 1, 'log': 1})
+
+        db.session.execute(db.insert(Log), [{'user_id': 1, 'action': 'logout'}])
+        db.session.rollback()
+        self.assertEqual(table_versions('log')['log'], 1)
+
+    def test_counters_are_bumped_after_commit_outside_the_write_transaction(self):
+        db.session.add(User(firstname='a', lastname='b', email='a@example.com', password='x'))
+        db.session.flush()
+        # The writer's transaction does not touch the counter row
+        self.assertEqual(table_versions('user')['user'], 0)
+        db.session.commit()
+        self.assertEqual(table_versions('user')['user'], 1)
+
+    def test_matching_etag_skips_the_view(self):
+        response = self.get()
+        etag = response.headers['ETag']
+        self.assertEqual((response.status_code, self.calls), (200, 1))
+
+        response = self.get({'If-None-Match': etag})
+        self.assertEqual((response.status_code, self.calls), (304, 1))
+        self.assertEqual(response.headers['ETag'], etag)
+
+        db.session.execute(db.insert(Log), [{'user_id': 1, 'action': 'login'}])
+        db.session.commit()
+        response = self.get({'If-None-Match': etag})
+        self.assertEqual((response.status_code, self.calls), (200, 2))
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
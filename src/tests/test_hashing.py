@@ -0,0 +1,116 @@
+import threading
+import unittest
+
+from src import app, db, bcrypt
+from src.exceptions import ServiceUnavailableError
+from src.users.hashing import PasswordHashPool, password_hash_pool, calibrate_bcrypt_rounds, hash_rounds, \
+    needs_rehash
+from src.users.models import User
+from src.users.services import login_user
+
+
+class PasswordHashPoolTests(unittest.TestCase):
+    """
+    Test suite for the bounded password hashing pool.
+    """
+
+    def test_saturated_pool_rejects_new_jobs(self):
+        pool = PasswordHashPool(workers=1, max_queue=1, retry_after=3)
+        started, release = threading.Event(), threading.Event()
+
+        def busy():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        threads = [threading.Thread(target=pool.run, args=(busy,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(ServiceUnavailableError) as raised:
+                pool.run(busy)
+            self.assertEqual(raised.exception.retry_after, 3)
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(pool.run(lambda value: value * 2, 21), 42)
+        stats = pool.stats()
+        self.assertEqual((stats['submitted'], stats['rejected'], stats['completed'], stats['pending']), (3, 1, 3, 0))
+
+    def test_login_gets_a_503_with_retry_after_when_the_pool_is_full(self):
+        client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(firstname='a', lastname='b', email='busy@example.com',
+                        password=bcrypt.generate_password_hash('Passw0rdBusy', 4).decode('utf-8'))
+            db.session.add(user)
+            db.session.commit()
+
+        # Take every slot of the shared pool, as a login storm would
+        slots = password_hash_pool.workers + password_hash_pool.max_queue
+        for _ in range(slots):
+            password_hash_pool._slots.acquire()
+        try:
+            response = client.post('/api/auth/signin', json={'email': 'busy@example.com', 'password': 'Passw0rdBusy'})
+        finally:
+            for _ in range(slots):
+                password_hash_pool._slots.release()
+            with app.app_context():
+                db.session.remove()
+                db.drop_all()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], str(password_hash_pool.retry_after))
+
+
+class BcryptCostTests(unittest.TestCase):
+    """
+    Test suite for the bcrypt cost calibration and the rehash on login.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.config = dict(app.config)
+
+    def tearDown(self):
+        app.config.clear()
+        app.config.update(self.config)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_calibration_stays_within_bounds(self):
+        self.assertEqual(calibrate_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=6), 4)
+        self.assertEqual(calibrate_bcrypt_rounds(target_ms=10 ** 6, min_rounds=4, max_rounds=6), 6)
+
+    def test_hashes_are_only_rehashed_upwards(self):
+        password_hash = bcrypt.generate_password_hash('secret', 5).decode('utf-8')
+        self.assertEqual(hash_rounds(password_hash), 5)
+        self.assertTrue(needs_rehash(password_hash, 6))
+        self.assertFalse(needs_rehash(password_hash, 5))
+        self.assertFalse(needs_rehash(password_hash, 4))
+        self.assertTrue(needs_rehash('not-a-bcrypt-hash', 4))
+
+    def test_login_rehashes_to_a_higher_cost_only(self):
+        user = User(firstname='a', lastname='b', email='cost@example.com',
+                    password=bcrypt.generate_password_hash('Passw0rdCost', 4).decode('utf-8'))
+        db.session.add(user)
+        db.session.commit()
+        credentials = {'email': 'cost@example.com', 'password': 'Passw0rdCost'}
+
+        app.config['BCRYPT_LOG_ROUNDS'] = 5
+        login_user(credentials)
+        self.assertEqual(hash_rounds(db.session.get(User, user.id).password_hash), 5)
+
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
+        login_user(credentials)
+        self.assertEqual(hash_rounds(db.session.get(User, user.id).password_hash), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+import gzip
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import app, db
+from src.api_keys.models import ApiKeyModel, ApiKeyUsage
+from src.api_keys.usage import usage_meter
+from src.exceptions import GatewayTimeoutError, ServiceUnavailableError
+from src.inference.backends import configure_backends, get_backend, InferenceBackend
+from src.inference.pool import ConnectionPool
+from src.users.models import User
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    """
+    Stub model server: echoes the JSON input, optionally after a delay.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+        self.server.calls += 1
+        self.server.request_headers.append(dict(self.headers))
+        if self.path == '/stream':
+            return self.stream_events(payload)
+        time.sleep(payload.get('delay', 0))
+        self.server.client_ports.add(self.client_address[1])
+        if self.path == '/batch':
+            outputs = [{'output': item.get('input')} for item in payload['inputs']]
+            body = json.dumps({'outputs': outputs}).encode('utf-8')
+        else:
+            body = json.dumps({'output': payload.get('input')}).encode('utf-8')
+        compressed = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compressed:
+            body = gzip.compress(body)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            if compressed:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def stream_events(self, payload):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for i in range(payload.get('events', 3)):
+                event = f"data: token{i}\n\n".encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+                self.wfile.flush()
+                time.sleep(payload.get('interval', 0))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.cancelled.set()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InferenceProxyTests(unittest.TestCase):
+    """
+    Test suite for the pooled inference proxy, against a local stub model server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubModelHandler)
+        cls.server.daemon_threads = True
+        cls.server.client_ports = set()
+        cls.server.cancelled = threading.Event()
+        cls.server.calls = 0
+        cls.server.request_headers = []
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.client_ports.clear()
+        self.server.calls = 0
+        self.server.request_headers.clear()
+
+    def create_api_key(self):
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            user = User(firstname='a', lastname='b', email='model@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            api_key = ApiKeyModel(user_id=user.id)
+            api_key.save()
+            return api_key.key
+
+    def tear_down_app(self):
+        configure_backends({})
+        with app.app_context():
+            usage_meter.flush()
+            db.session.remove()
+            db.drop_all()
+
+    def call(self, pool, payload, timeout=None):
+        return pool.request('POST', '/infer', body=json.dumps(payload).encode('utf-8'),
+                            headers={'Content-Type': 'application/json'}, timeout=timeout)
+
+    def test_connections_are_kept_alive_and_reused(self):
+        pool = ConnectionPool(self.url)
+        for i in range(5):
+            self.assertEqual(json.loads(self.call(pool, {'input': i}).body), {'output': i})
+        self.assertEqual((pool.created, pool.reused, len(self.server.client_ports)), (1, 4, 1))
+        pool.close()
+
+    def test_slow_backend_times_out(self):
+        pool = ConnectionPool(self.url, timeout=0.1)
+        with self.assertRaises(GatewayTimeoutError):
+            self.call(pool, {'delay': 0.5})
+        self.assertEqual(json.loads(self.call(pool, {'input': 'ok'}, timeout=2).body), {'output': 'ok'})
+        pool.close()
+
+    def test_concurrency_is_bounded(self):
+        pool = ConnectionPool(self.url, max_connections=1, queue_timeout=0.05)
+        slow = threading.Thread(target=self.call, args=(pool, {'delay': 0.3}))
+        slow.start()
+        time.sleep(0.1)
+        with self.assertRaises(ServiceUnavailableError):
+            self.call(pool, {'input': 1})
+        slow.join()
+        self.assertEqual(pool.rejected, 1)
+        pool.close()
+
+    def test_concurrent_requests_are_sent_in_batches(self):
+        backend = InferenceBackend('batched', self.url, batch_path='/batch', max_batch=4, max_wait_ms=200)
+        outputs = {}
+
+        def submit(i):
+            outputs[i] = json.loads(backend.batcher.submit({'input': i}).body)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outputs, {i: {'output': i} for i in range(8)})
+        self.assertEqual(self.server.calls, 2)
+        self.assertEqual(backend.batcher.stats()['largest_batch'], 4)
+
+        started = time.monotonic()
+        self.assertEqual(json.loads(backend.batcher.submit({'input': 'alone'}).body), {'output': 'alone'})
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        backend.close()
+
+    def test_abandoned_requests_are_not_sent(self):
+        backend = InferenceBackend('batched', self.url, batch_path='/batch', max_connections=1, max_wait_ms=0,
+                                   timeout=0.1, connect_timeout=0.05, queue_timeout=0.05)
+        # Every connection is busy, so the batch waits for a worker past the deadline of its caller
+        release = threading.Event()
+        backend.batcher._executor.submit(release.wait)
+        with self.assertRaises(GatewayTimeoutError):
+            backend.batcher.submit({'input': 'late'})
+        release.set()
+
+        self.assertEqual(json.loads(backend.batcher.submit({'input': 'next'}).body), {'output': 'next'})
+        self.assertEqual(self.server.calls, 1)
+        self.assertEqual((backend.batcher.stats()['abandoned'], backend.batcher.stats()['requests']), (1, 1))
+        backend.close()
+
+    def test_batched_requests_forward_their_request_ids(self):
+        backend = InferenceBackend('batched', self.url, batch_path='/batch', max_batch=2, max_wait_ms=500)
+        threads = [threading.Thread(target=backend.batcher.submit, args=({'input': i}, f"req-{i}")) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.server.calls, 1)
+        self.assertEqual(sorted(self.server.request_headers[0]['X-Request-ID'].split(',')), ['req-0', 'req-1'])
+        backend.close()
+
+    def test_cached_and_direct_requests_share_the_batch_routing(self):
+        configure_backends({'batched': {'url': self.url, 'batch_path': '/batch', 'max_wait_ms': 0}})
+        key = self.create_api_key()
+        try:
+            for payload in ({'input': 'direct'}, {'input': 'cached', 'temperature': 0}):
+                response = self.client.post('/api/inference/batched', json=payload, headers={'X-API-Key': key})
+                self.assertEqual((response.status_code, response.json), (200, {'output': payload['input']}))
+            self.assertEqual(get_backend('batched').batcher.stats()['requests'], 2)
+        finally:
+            self.tear_down_app()
+
+    def test_streamed_answers_are_relayed_and_metered(self):
+        configure_backends({'stream': {'url': self.url, 'path': '/stream'}})
+        key = self.create_api_key()
+        try:
+            response = self.client.post('/api/inference/stream', json={'events': 3}, headers={'X-API-Key': key},
+                                        buffered=False)
+            self.assertEqual((response.status_code, response.mimetype), (200, 'text/event-stream'))
+            self.assertFalse(response.is_sequence)
+            self.assertEqual(b''.join(response.response), b'data: token0\n\ndata: token1\n\ndata: token2\n\n')
+            response.close()
+
+            with app.app_context():
+                usage_meter.flush()
+                usage = ApiKeyUsage.query.one()
+                self.assertEqual((usage.request_count, usage.bytes_out), (1, 42))
+        finally:
+            self.tear_down_app()
+
+    def test_client_disconnect_cancels_the_upstream_request(self):
+        self.server.cancelled.clear()
+        configure_backends({'stream': {'url': self.url, 'path': '/stream'}})
+        key = self.create_api_key()
+        try:
+            response = self.client.post('/api/inference/stream', json={'events': 50, 'interval': 0.02},
+                                        headers={'X-API-Key': key}, buffered=False)
+            self.assertEqual(next(iter(response.response)), b'data: token0\n\n')
+            response.close()
+            self.assertTrue(self.server.cancelled.wait(2))
+        finally:
+            self.tear_down_app()
+
+    def test_endpoint_forwards_requests_with_an_api_key(self):
+        configure_backends({'echo': {'url': self.url}})
+        key = self.create_api_key()
+        try:
+            response = self.client.post('/api/inference/echo', json={'input': 'hello'}, headers={'X-API-Key': key})
+            self.assertEqual((response.status_code, response.json), (200, {'output': 'hello'}))
+            response = self.client.post('/api/inference/missing', json={}, headers={'X-API-Key': key})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(self.client.post('/api/inference/echo', json={}).status_code, 401)
+        finally:
+            self.tear_down_app()
+
+    def test_answers_are_fetched_uncompressed(self):
+        configure_backends({'echo': {'url': self.url}})
+        key = self.create_api_key()
+        try:
+            headers = {'X-API-Key': key, 'Accept-Encoding': 'gzip', 'X-Request-ID': 'req-1'}
+            response = self.client.post('/api/inference/echo', json={'input': 'hello'}, headers=headers)
+            self.assertEqual((response.status_code, response.json), (200, {'output': 'hello'}))
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(self.server.request_headers[-1]['Accept-Encoding'], 'identity')
+            self.assertEqual(self.server.request_headers[-1]['X-Request-ID'], 'req-1')
+        finally:
+            self.tear_down_app()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+
+from src.inference.backends import configure_backends
+from src.inference.cache import DiskResultCache, InferenceResultCache, inference_cache, request_key
+from src.inference.services import run_inference_service
+from src.tests.test_inference import StubModelHandler
+from src.utils.cache import SingleFlight
+
+
+class InferenceCacheTests(unittest.TestCase):
+    """
+    Test suite for the coalescing and caching of deterministic inference calls.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubModelHandler)
+        cls.server.daemon_threads = True
+        cls.server.client_ports = set()
+        cls.server.cancelled = threading.Event()
+        cls.server.calls = 0
+        cls.server.request_headers = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        configure_backends({'echo': {'url': f"http://127.0.0.1:{cls.server.server_address[1]}"}})
+
+    @classmethod
+    def tearDownClass(cls):
+        configure_backends({})
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.calls = 0
+        self.server.request_headers.clear()
+        inference_cache.clear()
+
+    def infer(self, payload):
+        return run_inference_service('echo', json.dumps(payload).encode('utf-8'),
+                                     {'Content-Type': 'application/json'})
+
+    def test_request_key_is_canonical(self):
+        self.assertEqual(request_key('m', json.loads('{"input": "a", "temperature": 0}')),
+                         request_key('m', json.loads('{ "temperature": 0,\n "input": "a" }')))
+        self.assertNotEqual(request_key('m', {'input': 'a'}), request_key('other', {'input': 'a'}))
+
+    def test_concurrent_identical_calls_share_one_upstream_call(self):
+        payload = {'input': 'hello', 'temperature': 0, 'delay': 0.2}
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.infer(payload))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.server.calls, 1)
+        self.assertEqual(sorted(response.cache_status for response in responses), ['COALESCED'] * 4 + ['MISS'])
+        self.assertEqual({response.body for response in responses}, {b'{"output": "hello"}'})
+        self.assertEqual(self.infer(payload).cache_status, 'HIT')
+        self.assertEqual(self.server.calls, 1)
+
+    def test_sampled_calls_are_not_cached(self):
+        self.infer({'input': 'hello', 'temperature': 0.7})
+        response = self.infer({'input': 'hello', 'temperature': 0.7})
+        self.assertIsNone(response.cache_status)
+        self.assertEqual(self.server.calls, 2)
+
+    def test_single_flight_shares_errors(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        def follow():
+            started.wait()
+            try:
+                flights.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        follower = threading.Thread(target=follow)
+        follower.start()
+        with self.assertRaises(ValueError):
+            flights.do('key', fail)
+        follower.join()
+        self.assertEqual((len(errors), flights.calls, flights.coalesced, len(flights)), (1, 1, 1, 0))
+
+    def test_disk_tier_is_content_addressed_and_survives_memory_eviction(self):
+        directory = tempfile.mkdtemp()
+        cache = InferenceResultCache(maxsize=1, directory=directory)
+        cache.set('a', (200, 'application/json', b'{"output": 1}'))
+        cache.set('b', (200, 'application/json', b'{"output": 1}'))
+        cache.set('c', (200, 'application/json', b'{"output": 2}'), ttl=-1)
+
+        blobs = [name for _, _, files in os.walk(os.path.join(directory, 'blobs')) for name in files]
+        self.assertEqual(len(blobs), 2)
+        self.assertEqual(cache.get('a'), (200, 'application/json', b'{"output": 1}'))
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertIsNone(cache.get('c'))
+
+        disk = DiskResultCache(directory)
+        disk.BLOB_GRACE_SECONDS = -1
+        self.assertEqual(disk.purge_expired(), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from src import app, db
+from src.tokens.services import create_jwt_token
+from src.users.cache import user_state_cache
+from src.users.models import User
+
+CREATED_AT = datetime(2024, 5, 1, 12, 30, 15, 250000)
+
+
+class JSONProviderTests(unittest.TestCase):
+    """
+    Test suite for the JSON provider of the app and the API, with and without orjson.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user_state_cache.clear()
+        admin = User(firstname='a', lastname='b', email='json@example.com', password='x', role='admin')
+        admin.is_active = True
+        admin.created_at = CREATED_AT
+        db.session.add(admin)
+        db.session.commit()
+        access_token = create_jwt_token(admin.id, admin.role)['access_token']
+        self.headers = {'Authorization': f"Bearer {access_token}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def blueprint_users(self, limit=20):
+        # The RESTX resource shadows the blueprint route, so the blueprint view is called directly
+        with app.test_request_context(f"/api/admin/users?fields=id,created_at&limit={limit}", headers=self.headers):
+            return app.make_response(app.view_functions['admin.list_users']())
+
+    def restx_users(self, limit=20):
+        return self.client.get(f"/api/admin/users?fields=id,created_at&limit={limit}", headers=self.headers)
+
+    def test_restx_resources_render_datetimes_in_iso_8601(self):
+        response = self.restx_users()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json()['users'][0]['created_at'], '2024-05-01T12:30:15.250000')
+
+    def test_blueprint_endpoints_render_datetimes_in_iso_8601(self):
+        response = self.blueprint_users()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['users'][0]['created_at'], '2024-05-01T12:30:15.250000')
+
+    def test_standard_library_fallback_renders_the_same_output(self):
+        value = {'naive': CREATED_AT, 'aware': CREATED_AT.replace(tzinfo=timezone.utc), 'day': CREATED_AT.date()}
+        with_orjson = app.json.dumps(value)
+        restx_body, blueprint_body = self.restx_users().get_json(), self.blueprint_users().get_json()
+
+        with mock.patch('src.utils.json_provider.orjson', None):
+            self.assertEqual(app.json.loads(app.json.dumps(value)), app.json.loads(with_orjson))
+            self.assertEqual(app.json.loads(app.json.dumpb(value)), app.json.loads(with_orjson))
+            # Another limit, so that the responses are not served from the response cache
+            restx_response, blueprint_response = self.restx_users(limit=10), self.blueprint_users(limit=10)
+            self.assertEqual(restx_response.headers['X-Cache'], 'MISS')
+            self.assertEqual(restx_response.get_json(), restx_body)
+            self.assertEqual(blueprint_response.get_json(), blueprint_body)
+        self.assertEqual(app.json.loads(with_orjson), {'naive': '2024-05-01T12:30:15.250000',
+                                                       'aware': '2024-05-01T12:30:15.250000+00:00',
+                                                       'day': '2024-05-01'})
+
+
+if __name__ == "__main__":
+    unittest.main()
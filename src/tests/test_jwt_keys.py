@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import jwt as pyjwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ed25519
+from flask import Flask
+from flask_jwt_extended import create_access_token, decode_token
+from jwt.exceptions import InvalidSignatureError
+
+from src import app
+from src.tokens.keys import KeyRing, init_key_ring, reload_key_ring, key_ring
+from src.tokens.manager import CachingJWTManager
+
+
+class KeyRingTests(unittest.TestCase):
+    """
+    Test suite for JWT signing with rotating asymmetric keys and the JWKS.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['JWT_SECRET_KEY'] = 'unused-with-a-key-ring'
+        self.manager = CachingJWTManager(self.app)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_key(self, kid, private_key, age):
+        path = os.path.join(self.directory, f"{kid}.pem")
+        with open(path, 'wb') as key_file:
+            key_file.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                                     serialization.NoEncryption()))
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def write_keys(self):
+        self.write_key('old', rsa.generate_private_key(public_exponent=65537, key_size=2048), age=7200)
+        self.write_key('new', ed25519.Ed25519PrivateKey.generate(), age=60)
+
+    def token(self):
+        with self.app.app_context():
+            return create_access_token(identity='user-1')
+
+    def decode(self, token):
+        with self.app.app_context():
+            return decode_token(token)
+
+    def test_new_key_signs_once_published_long_enough(self):
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='', publish_delay=3600)
+        ring.load()
+        self.assertEqual((ring.active.kid, ring.active.algorithm), ('old', 'RS256'))
+
+        os.utime(os.path.join(self.directory, 'new.pem'), (time.time() - 3601, time.time() - 3601))
+        ring.load()
+        self.assertEqual((ring.active.kid, ring.active.algorithm), ('new', 'EdDSA'))
+
+        configured = KeyRing(directory=self.directory, active_kid='old', publish_delay=3600)
+        configured.load()
+        self.assertEqual(configured.active.kid, 'old')
+
+    def test_tokens_carry_the_kid_and_algorithm_of_their_key_across_a_rotation(self):
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='', publish_delay=3600)
+        self.assertTrue(init_key_ring(self.app, self.manager, ring))
+
+        old_token = self.token()
+        self.assertEqual(pyjwt.get_unverified_header(old_token), {'alg': 'RS256', 'kid': 'old', 'typ': 'JWT'})
+
+        ring.configured_kid = 'new'
+        with self.app.app_context():
+            reload_key_ring(ring)
+        new_token = self.token()
+        self.assertEqual(pyjwt.get_unverified_header(new_token), {'alg': 'EdDSA', 'kid': 'new', 'typ': 'JWT'})
+
+        # Both keys are still in the ring, so both tokens verify
+        self.assertEqual(self.decode(old_token)['sub'], 'user-1')
+        self.assertEqual(self.decode(new_token)['sub'], 'user-1')
+
+    def test_a_reload_between_the_two_signing_loaders_keeps_one_key(self):
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='old', publish_delay=3600)
+        ring.load()
+        old = ring.signing_key()
+        ring.active = ring.keys['new']
+        self.assertIs(ring.signing_key(), old)
+        self.assertEqual(ring.signing_key().kid, 'new')
+
+    def test_tokens_of_a_removed_key_are_rejected(self):
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='new', publish_delay=3600)
+        init_key_ring(self.app, self.manager, ring)
+        ring.configured_kid = 'old'
+        with self.app.app_context():
+            reload_key_ring(ring)
+        old_token = self.token()
+        self.assertEqual(self.decode(old_token)['sub'], 'user-1')
+
+        os.remove(os.path.join(self.directory, 'old.pem'))
+        ring.configured_kid = ''
+        with self.app.app_context():
+            reload_key_ring(ring)
+        with self.assertRaises(InvalidSignatureError):
+            self.decode(old_token)
+
+    def test_header_algorithm_must_match_the_key(self):
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='', publish_delay=3600)
+        ring.load()
+        self.assertIsNotNone(ring.public_key('old', 'RS256'))
+        self.assertIsNone(ring.public_key('old', 'EdDSA'))
+        self.assertIsNone(ring.public_key('missing'))
+
+    def test_api_resources_answer_jwt_errors_with_their_own_handlers(self):
+        client = app.test_client()
+        response = client.get('/api/keys/all')
+        self.assertEqual((response.status_code, response.get_json()['message']),
+                         (401, "JWT token is missing. Access denied."))
+
+        self.write_keys()
+        ring = KeyRing(directory=self.directory, active_kid='old', publish_delay=3600)
+        init_key_ring(self.app, self.manager, ring)
+        response = client.get('/api/keys/all', headers={'Authorization': f"Bearer {self.token()}"})
+        self.assertEqual((response.status_code, response.get_json()['message']),
+                         (401, "The token is invalid or has been tampered with."))
+
+    def test_jwks_publishes_every_key(self):
+        client = app.test_client()
+        self.assertEqual(client.get('/.well-known/jwks.json').get_json(), {'keys': []})
+
+        self.write_keys()
+        key_ring.directory = self.directory
+        try:
+            key_ring.load()
+            response = client.get('/.well-known/jwks.json')
+        finally:
+            key_ring.directory, key_ring.keys, key_ring.active = '', {}, None
+
+        self.assertEqual(response.status_code, 200)
+        keys = {key['kid']: key for key in response.get_json()['keys']}
+        self.assertEqual(sorted(keys), ['new', 'old'])
+        self.assertEqual((keys['old']['kty'], keys['old']['alg']), ('RSA', 'RS256'))
+        self.assertEqual((keys['new']['kty'], keys['new']['alg'], keys['new']['crv']), ('OKP', 'EdDSA', 'Ed25519'))
+        self.assertNotIn('d', keys['new'])
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=300')
+
+
+if __name__ == "__main__":
+    unittest.main()
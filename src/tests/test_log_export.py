@@ -0,0 +1,105 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+import unittest
+from datetime import datetime, timedelta
+
+from src import app, db
+from src.logs.export import export_logs
+from src.logs.models import Log
+from src.tokens.services import create_jwt_token
+from src.users.cache import user_state_cache
+from src.users.models import User
+
+
+class LogExportTests(unittest.TestCase):
+    """
+    Test suite for the streamed activity log export.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user_state_cache.clear()
+        admin = User(firstname='a', lastname='b', email='export@example.com', password='x', role='admin')
+        admin.is_active = True
+        db.session.add(admin)
+        db.session.commit()
+        access_token = create_jwt_token(admin.id, admin.role)['access_token']
+        self.headers = {'Authorization': f"Bearer {access_token}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_logs(self, count):
+        start = datetime(2024, 1, 1)
+        db.session.execute(db.insert(Log), [
+            {'user_id': i % 3, 'action': 'login' if i % 2 else 'logout', 'details': f"entry {i}, \"quoted\"",
+             'ip_address': '10.0.0.1', 'timestamp': start + timedelta(minutes=i)}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+    def export(self, query_string):
+        return self.client.get(f"/api/admin/logs/export?{query_string}", headers=self.headers)
+
+    def test_ndjson_export(self):
+        self.add_logs(5)
+        response = self.export('action=login')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertRegex(response.headers['Content-Disposition'], r'filename="logs-[\d-]+\.ndjson"')
+
+        rows = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [2, 4])
+        self.assertEqual(rows[0], {'id': 2, 'user_id': 1, 'action': 'login', 'timestamp': '2024-01-01T00:01:00',
+                                   'details': 'entry 1, "quoted"', 'ip_address': '10.0.0.1'})
+
+    def test_csv_export(self):
+        self.add_logs(3)
+        response = self.export('format=csv')
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.reader(io.StringIO(response.data.decode('utf-8'))))
+        self.assertEqual(rows[0], ['id', 'user_id', 'action', 'timestamp', 'details', 'ip_address'])
+        self.assertEqual(rows[1], ['1', '0', 'logout', '2024-01-01T00:00:00', 'entry 0, "quoted"', '10.0.0.1'])
+        self.assertEqual(len(rows), 4)
+
+    def test_gzip_export_is_a_gzip_file(self):
+        self.add_logs(3)
+        response = self.export('format=csv&gzip=true')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertRegex(response.headers['Content-Disposition'], r'filename="logs-[\d-]+\.csv\.gz"')
+        self.assertEqual(gzip.decompress(response.data).decode('utf-8'), self.export('format=csv').data.decode('utf-8'))
+
+    def test_invalid_format_is_rejected(self):
+        self.assertEqual(self.export('format=xml').status_code, 400)
+
+    def peak_memory(self, query):
+        tracemalloc.start()
+        try:
+            size = 0
+            for chunk in export_logs(query, chunk_bytes=16 * 1024):
+                size += len(chunk)
+            return size, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_does_not_grow_with_the_export(self):
+        self.add_logs(20000)
+        self.peak_memory(Log.query.filter(Log.id <= 100))  # Warm up the statement caches
+        small_size, small_peak = self.peak_memory(Log.query.filter(Log.id <= 2500))
+        large_size, large_peak = self.peak_memory(Log.query)
+        # Eight times the rows, but still one batch of rows and one chunk held at a time
+        self.assertGreater(large_size, 7 * small_size)
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
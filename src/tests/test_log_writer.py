@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+
+from src import app, db
+from src.logs.models import Log
+from src.logs.writer import LogWriter
+
+
+class LogWriterTests(unittest.TestCase):
+    """
+    Test suite for the background activity log writer.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_queued_entries_are_drained_on_stop(self):
+        writer = LogWriter(batch_size=10, flush_interval=60)
+        writer.start(app)
+        for i in range(25):
+            self.assertTrue(writer.write(1, f"action {i}"))
+        writer.stop()
+        self.assertEqual(Log.query.count(), 25)
+        self.assertEqual(writer.stats()['written'], 25)
+
+    def test_full_queue_drops_entries(self):
+        writer = LogWriter(queue_size=1, overflow='drop')
+        # Queue without a consumer
+        with mock.patch.object(LogWriter, 'running', new_callable=mock.PropertyMock, return_value=True):
+            self.assertTrue(writer.write(1, "kept"))
+            self.assertFalse(writer.write(1, "dropped"))
+        self.assertEqual(writer.dropped, 1)
+
+    def test_entries_are_written_synchronously_when_not_started(self):
+        writer = LogWriter()
+        writer.write(1, "User logged in", ip_address='127.0.0.1')
+        log = Log.query.one()
+        self.assertEqual((log.action, log.ip_address), ("User logged in", '127.0.0.1'))
+
+
+if __name__ == "__main__":
+    unittest.main()
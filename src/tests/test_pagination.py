@@ -0,0 +1,50 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src import app, db
+from src.exceptions import ValidationError
+from src.logs.models import Log
+from src.utils.pagination import encode_cursor, decode_cursor, keyset_paginate
+
+
+class KeysetPaginationTests(unittest.TestCase):
+    """
+    Test suite for cursor (keyset) pagination.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_cursor_round_trip(self):
+        values = [datetime(2024, 5, 1, 12, 30), 42]
+        self.assertEqual(decode_cursor(encode_cursor(values), 2), values)
+        with self.assertRaises(ValidationError):
+            decode_cursor('not-a-cursor', 2)
+
+    def test_pages_cover_every_row_once_with_timestamp_ties(self):
+        start = datetime(2024, 1, 1)
+        for i in range(23):
+            log = Log(user_id=1, action='login')
+            log.timestamp = start + timedelta(minutes=i // 4)  # Four entries per timestamp
+            db.session.add(log)
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            logs, cursor = keyset_paginate(Log.query, (Log.timestamp, Log.id), 5, cursor=cursor)
+            seen += [log.id for log in logs]
+            if cursor is None:
+                break
+        expected = [log.id for log in Log.query.order_by(Log.timestamp.desc(), Log.id.desc())]
+        self.assertEqual(seen, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+from src.exceptions import TooManyRequestsError
+from src.middlewares.rate_limit import RateLimit, RateLimiter, MemoryBackend, SQLiteBackend, identify_client, \
+    init_proxy_fix
+
+
+class RateLimitTests(unittest.TestCase):
+    """
+    Test suite for the token bucket rate limiter.
+    """
+
+    limits = {
+        '/api': {'anonymous': '2/minute'},
+        '/api/keys': {'user': '3/minute', 'api_key': '1/second'},
+    }
+
+    def assert_limited_after(self, limiter, path, tier, client, allowed):
+        for _ in range(allowed):
+            limiter.hit(path, tier, client)
+        with self.assertRaises(TooManyRequestsError) as context:
+            limiter.hit(path, tier, client)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test_parse_limits(self):
+        limit = RateLimit.parse('100/minute')
+        self.assertEqual((limit.capacity, limit.period), (100, 60))
+        limit = RateLimit.parse('5/10 seconds')
+        self.assertEqual((limit.capacity, limit.period), (5, 10))
+        with self.assertRaises(ValueError):
+            RateLimit.parse('often')
+
+    def test_longest_prefix_and_tier_apply(self):
+        limiter = RateLimiter(MemoryBackend(), self.limits)
+        self.assertEqual(limiter.match('/api/keys/all'), '/api/keys')
+        self.assertEqual(limiter.match('/api/keysmith'), '/api')
+        self.assertIsNone(limiter.match('/swagger'))
+        # No limit for this tier on this prefix
+        self.assertIsNone(limiter.hit('/api/keys/all', 'anonymous', '127.0.0.1'))
+        self.assert_limited_after(limiter, '/api/keys/all', 'user', 1, allowed=3)
+
+    def test_clients_have_their_own_buckets(self):
+        limiter = RateLimiter(MemoryBackend(), self.limits)
+        self.assert_limited_after(limiter, '/api/users/login', 'anonymous', '10.0.0.1', allowed=2)
+        self.assertIsNotNone(limiter.hit('/api/users/login', 'anonymous', '10.0.0.2'))
+
+    def test_sqlite_backend_is_shared(self):
+        path = os.path.join(tempfile.mkdtemp(), 'rate_limits.db')
+        first = RateLimiter(SQLiteBackend(path), self.limits)
+        second = RateLimiter(SQLiteBackend(path), self.limits)
+        first.hit('/api/users/login', 'anonymous', '10.0.0.1')
+        first.hit('/api/users/login', 'anonymous', '10.0.0.1')
+        with self.assertRaises(TooManyRequestsError):
+            second.hit('/api/users/login', 'anonymous', '10.0.0.1')
+
+    def anonymous_client(self, trusted_proxies, forwarded_for):
+        app = Flask(__name__)
+        app.add_url_rule('/client', 'client', lambda: {'client': list(identify_client())})
+        init_proxy_fix(app, trusted_proxies)
+        return app.test_client().get('/client', headers={'X-Forwarded-For': forwarded_for}).get_json()['client']
+
+    def test_anonymous_clients_are_identified_through_trusted_proxies(self):
+        self.assertEqual(self.anonymous_client(0, '203.0.113.7'), ['anonymous', '127.0.0.1'])
+        self.assertEqual(self.anonymous_client(1, '203.0.113.7'), ['anonymous', '203.0.113.7'])
+        # Only the address added by the trusted proxy counts, not one forged by the client
+        self.assertEqual(self.anonymous_client(1, '198.51.100.1, 203.0.113.7'), ['anonymous', '203.0.113.7'])
+
+
+if __name__ == "__main__":
+    unittest.main()
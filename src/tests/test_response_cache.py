@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from src import app, db
+from src.logs.models import Log
+from src.middlewares.decorators import cached_response
+from src.utils.response_cache import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend
+
+
+class ResponseCacheTests(unittest.TestCase):
+    """
+    Test suite for the response cache and its tag invalidation.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.calls = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def view(self):
+        self.calls += 1
+        return {'status': 'success', 'calls': self.calls}, 200
+
+    def get(self, path='/api/admin/logs?limit=5'):
+        with app.test_request_context(path):
+            return cached_response('log')(self.view)()
+
+    def test_commits_invalidate_the_tags_of_the_written_tables(self):
+        self.assertEqual(self.get().headers['X-Cache'], 'MISS')
+        response = self.get()
+        self.assertEqual((response.headers['X-Cache'], response.json['calls']), ('HIT', 1))
+        self.assertEqual(self.get('/api/admin/logs?limit=6').headers['X-Cache'], 'MISS')
+
+        db.session.execute(db.insert(Log), [{'user_id': 1, 'action': 'login'}])
+        db.session.rollback()
+        self.assertEqual(self.get().headers['X-Cache'], 'HIT')
+
+        db.session.execute(db.insert(Log), [{'user_id': 1, 'action': 'login'}])
+        db.session.commit()
+        response = self.get()
+        self.assertEqual((response.headers['X-Cache'], response.json['calls']), ('MISS', 3))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryCacheBackend(maxsize=2)
+        backend.set('a', (200, 'application/json', b'a'), ttl=60)
+        backend.set('b', (200, 'application/json', b'b'), ttl=60)
+        backend.get('a')
+        backend.set('c', (200, 'application/json', b'c'), ttl=60)
+        self.assertIsNone(backend.get('b'))
+        self.assertIsNotNone(backend.get('a'))
+
+    def test_sqlite_backend_is_shared_between_instances(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        first = ResponseCache(SQLiteCacheBackend(path))
+        second = ResponseCache(SQLiteCacheBackend(path))
+        with app.test_request_context('/api/keys/all'):
+            key = first.key(['api_key_model'], caller=1)
+            first.set(key, (200, 'application/json', b'[]'))
+            self.assertEqual(second.get(second.key(['api_key_model'], caller=1)), (200, 'application/json', b'[]'))
+            self.assertIsNone(second.get(second.key(['api_key_model'], caller=2)))
+
+            second.invalidate('api_key_model')
+            self.assertIsNone(first.get(first.key(['api_key_model'], caller=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src import app, db
+from src.logs.models import Log, JobCheckpoint
+from src.logs.retention import LogRetention
+
+
+class LogRetentionTests(unittest.TestCase):
+    """
+    Test suite for the chunked log retention job.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        now = datetime.utcnow()
+        for days in range(100, 0, -1):  # Ids grow with time
+            log = Log(user_id=1, action='login')
+            log.timestamp = now - timedelta(days=days, hours=-1)
+            db.session.add(log)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_expired_logs_are_deleted_in_chunks(self):
+        run = LogRetention(retention_days=30, chunk_size=7, rows_per_second=0, max_duration=None).run()
+        self.assertTrue(run['finished'])
+        self.assertEqual(run['rows_deleted'], 70)
+        self.assertGreater(run['chunks'], 1)
+        self.assertEqual(Log.query.count(), 30)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        retention = LogRetention(retention_days=30, chunk_size=10, rows_per_second=0, max_duration=0)
+        self.assertEqual(retention.run()['rows_deleted'], 0)
+
+        retention.max_duration = None
+        first_id = db.session.query(db.func.min(Log.id)).scalar()
+        run = retention.run()
+        self.assertEqual(run['rows_deleted'], 70)
+        self.assertGreaterEqual(db.session.get(JobCheckpoint, LogRetention.name).last_id, first_id + 70)
+
+    def test_a_single_worker_runs_the_job_at_a_time(self):
+        JobCheckpoint.get_or_create(LogRetention.name)
+        self.assertTrue(JobCheckpoint.acquire(LogRetention.name, 'other-worker', 60))
+        retention = LogRetention(retention_days=30, chunk_size=10, rows_per_second=0, max_duration=None)
+        self.assertIsNone(retention.run())
+        self.assertEqual(Log.query.count(), 100)
+
+        # The lease of a worker that stopped renewing it can be taken over
+        self.assertTrue(JobCheckpoint.acquire(LogRetention.name, 'other-worker', -1))
+        self.assertEqual(retention.run()['rows_deleted'], 70)
+        checkpoint = db.session.get(JobCheckpoint, LogRetention.name)
+        self.assertEqual((checkpoint.locked_by, checkpoint.locked_until), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
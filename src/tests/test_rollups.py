@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src import app, db
+from src.logs.models import Log, LogHourlyRollup, LogDailyRollup, LogRollupGap
+from src.logs import rollups
+from src.logs.rollups import update_rollups
+
+
+class LogRollupTests(unittest.TestCase):
+    """
+    Test suite for the incremental log rollups.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_logs(self, count, user_id, action, timestamp):
+        db.session.execute(db.insert(Log), [{'user_id': user_id, 'action': action, 'timestamp': timestamp}] * count)
+        db.session.commit()
+
+    def test_new_entries_are_added_to_existing_counts(self):
+        hour = datetime(2024, 3, 1, 10)
+        self.add_logs(3, 1, 'login', hour + timedelta(minutes=5))
+        self.add_logs(2, 2, 'login', hour + timedelta(minutes=50))
+        self.assertEqual(update_rollups(batch_size=2), 5)
+
+        self.add_logs(4, 1, 'login', hour + timedelta(minutes=30))
+        self.assertEqual(update_rollups(), 4)
+        self.assertEqual(update_rollups(), 0)
+
+        counts = {row.user_id: row.count for row in LogHourlyRollup.query.filter_by(hour=hour)}
+        self.assertEqual(counts, {1: 7, 2: 2})
+        self.assertEqual(LogDailyRollup.query.filter_by(action='login').one().count, 9)
+
+    def test_recent_entries_wait_for_the_next_run(self):
+        self.add_logs(2, 1, 'login', datetime.utcnow())
+        self.assertEqual(update_rollups(lag_seconds=60), 0)
+        self.assertEqual(update_rollups(lag_seconds=0), 2)
+
+    def add_log_with_id(self, log_id, timestamp):
+        db.session.execute(db.insert(Log), [{'id': log_id, 'user_id': 1, 'action': 'login', 'timestamp': timestamp}])
+        db.session.commit()
+
+    def test_lower_id_committed_late_is_counted_once(self):
+        timestamp = datetime(2024, 3, 1, 10)
+        for log_id in (1, 2, 4):
+            self.add_log_with_id(log_id, timestamp)
+        self.assertEqual(update_rollups(), 3)
+        self.assertEqual([gap.log_id for gap in LogRollupGap.query], [3])
+
+        # Id 3 was still in flight when the watermark passed it
+        self.add_log_with_id(3, timestamp)
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(update_rollups(), 0)
+        self.assertEqual(LogRollupGap.query.count(), 0)
+        self.assertEqual(LogDailyRollup.query.filter_by(action='login').one().count, 4)
+
+    def test_gaps_are_forgotten_after_a_while(self):
+        timestamp = datetime(2024, 3, 1, 10)
+        self.add_log_with_id(1, timestamp)
+        self.add_log_with_id(3, timestamp)
+        self.add_log_with_id(5000, timestamp)
+        self.assertEqual(update_rollups(max_gap=10), 3)
+        # The run of missing ids up to 5000 is longer than max_gap, so only id 2 is re-checked
+        self.assertEqual([gap.log_id for gap in LogRollupGap.query], [2])
+
+        self.assertEqual(update_rollups(gap_seconds=0), 0)
+        self.assertEqual(LogRollupGap.query.count(), 0)
+        self.add_log_with_id(2, timestamp)
+        self.assertEqual(update_rollups(), 0)
+
+    def test_overlapping_runs_count_each_entry_once(self):
+        hour = datetime(2024, 3, 1, 10)
+        self.add_logs(5, 1, 'login', hour)
+        advance_watermark = rollups._advance_watermark
+        other_runs = []
+
+        def other_worker_first(seen_id, last_id):
+            # Another worker aggregates the same range between our read and our watermark update
+            if not other_runs:
+                other_runs.append(None)
+                other_runs[0] = update_rollups()
+            return advance_watermark(seen_id, last_id)
+
+        with mock.patch('src.logs.rollups._advance_watermark', side_effect=other_worker_first):
+            self.assertEqual(update_rollups(), 0)
+        self.assertEqual(other_runs, [5])
+        self.assertEqual(LogHourlyRollup.query.filter_by(hour=hour).one().count, 5)
+        self.assertEqual(LogDailyRollup.query.filter_by(action='login').one().count, 5)
+        self.assertEqual(update_rollups(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from flask_jwt_extended import decode_token
+from sqlalchemy import text
+
+from src import app, db
+from src.exceptions import ServiceUnavailableError
+from src.tokens.cache import revoked_token_cache
+from src.tokens.services import create_jwt_token, revoke_all_tokens_for_user, check_if_token_revoked
+from src.users.cache import user_state_cache
+from src.users.models import User
+
+
+class TokenGenerationTests(unittest.TestCase):
+    """
+    Test suite for revoking every token of a user with the 'gen' claim.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user_state_cache.clear()
+        revoked_token_cache.clear()
+        self.user = User(firstname='a', lastname='b', email='gen@example.com', password='x', role='admin')
+        self.user.is_active = True
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        user_state_cache.clear()
+        revoked_token_cache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def dashboard(self, access_token):
+        return self.client.get('/api/admin/dashboard', headers={'Authorization': f"Bearer {access_token}"})
+
+    def test_tokens_carry_the_generation_of_the_user(self):
+        tokens = create_jwt_token(self.user.id, self.user.role, token_generation=3)
+        self.assertEqual(decode_token(tokens['access_token'])['gen'], 3)
+        self.assertEqual(decode_token(tokens['refresh_token'])['gen'], 3)
+
+    def test_revoking_all_tokens_rejects_older_generations(self):
+        old_tokens = create_jwt_token(self.user.id, self.user.role, token_generation=0)
+        self.assertEqual(self.dashboard(old_tokens['access_token']).status_code, 200)
+
+        self.assertTrue(revoke_all_tokens_for_user(self.user.id))
+        self.assertEqual(db.session.get(User, self.user.id).token_generation, 1)
+        self.assertEqual(self.dashboard(old_tokens['access_token']).status_code, 401)
+
+        new_tokens = create_jwt_token(self.user.id, self.user.role, token_generation=1)
+        self.assertEqual(self.dashboard(new_tokens['access_token']).status_code, 200)
+
+    def test_revoking_the_tokens_of_an_unknown_user(self):
+        self.assertFalse(revoke_all_tokens_for_user(self.user.id + 1))
+
+    def test_revoked_generations_stay_rejected_on_database_errors(self):
+        old_tokens = create_jwt_token(self.user.id, self.user.role, token_generation=0)
+        self.assertTrue(revoke_all_tokens_for_user(self.user.id))
+        new_tokens = create_jwt_token(self.user.id, self.user.role, token_generation=1)
+        old_payload, new_payload = decode_token(old_tokens['access_token']), decode_token(new_tokens['access_token'])
+        self.assertFalse(check_if_token_revoked({}, new_payload))
+
+        # The cached state expired, then the database fails: the last known state is used
+        user_state_cache._cache.clear()
+        db.session.execute(text('ALTER TABLE user RENAME TO user_offline'))
+        db.session.commit()
+        self.assertTrue(check_if_token_revoked({}, old_payload))
+        self.assertFalse(check_if_token_revoked({}, new_payload))
+
+        # Without a known state, the check fails closed
+        user_state_cache.clear()
+        with self.assertRaises(ServiceUnavailableError):
+            check_if_token_revoked({}, old_payload)
+        response = self.dashboard(old_tokens['access_token'])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+        db.session.execute(text('ALTER TABLE user_offline RENAME TO user'))
+        db.session.commit()
+
+if __name__ == "__main__":
+    unittest.main()
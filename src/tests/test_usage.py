@@ -0,0 +1,55 @@
+import unittest
+
+from src import app, db
+from src.api_keys.models import ApiKeyUsage
+from src.api_keys.usage import UsageMeter, current_hour
+
+
+class UsageMeterTests(unittest.TestCase):
+    """
+    Test suite for the write-behind API key usage meter.
+    """
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_requests_are_aggregated_in_memory(self):
+        meter = UsageMeter()
+        meter.record(1, 10, 'GET /api/keys/all', bytes_out=100, latency_ms=2.0)
+        meter.record(1, 10, 'GET /api/keys/all', bytes_out=50, latency_ms=4.0)
+        meter.record(2, 10, 'GET /api/keys/all')
+        self.assertEqual(meter.pending(), 2)
+        self.assertEqual(ApiKeyUsage.query.count(), 0)
+
+    def test_flushes_add_to_existing_rows(self):
+        meter = UsageMeter()
+        hour = current_hour()
+        meter.record(1, 10, 'POST /api/inference', bytes_in=10, bytes_out=100, latency_ms=2.0, hour=hour)
+        self.assertEqual(meter.flush(), 1)
+        meter.record(1, 10, 'POST /api/inference', bytes_in=20, bytes_out=50, latency_ms=4.0, hour=hour)
+        self.assertEqual(meter.flush(), 1)
+
+        usage = ApiKeyUsage.query.one()
+        self.assertEqual(usage.request_count, 2)
+        self.assertEqual(usage.bytes_in, 30)
+        self.assertEqual(usage.bytes_out, 150)
+        self.assertEqual(usage.latency_ms_sum, 6.0)
+        self.assertEqual(meter.pending(), 0)
+
+    def test_pending_counters_are_bounded(self):
+        meter = UsageMeter(max_pending=1)
+        meter.record(1, 10, 'GET /a')
+        meter.record(2, 10, 'GET /a')
+        self.assertEqual(meter.pending(), 1)
+        self.assertEqual(meter.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import email_validator
+
+from src import app, db
+from src.admin.services import activate_user_service, deactivate_user_service
+from src.logs.writer import log_writer
+from src.users.cache import UserStateCache, user_state_cache
+from src.users.models import User
+
+
+class UserStateTests(unittest.TestCase):
+    """
+    Test suite for the admin-owned active state and the cached user state behind role_required.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        user_state_cache.clear()
+        # No DNS lookups of the test addresses
+        self.check_deliverability = email_validator.CHECK_DELIVERABILITY
+        email_validator.CHECK_DELIVERABILITY = False
+
+    def tearDown(self):
+        email_validator.CHECK_DELIVERABILITY = self.check_deliverability
+        user_state_cache.clear()
+        # Write the queued login entries before their table goes away
+        writer_running = log_writer.running
+        log_writer.stop()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        if writer_running:
+            log_writer.start(app)
+
+    def signup_admin(self, path):
+        payload = {'firstname': 'Ada', 'lastname': 'Admin', 'email': 'ada@example.com',
+                   'password': 'Passw0rdAdmin', 'role': 'admin'}
+        response = self.client.post(path, json=payload)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['tokens']['access_token']
+
+    def dashboard(self, access_token):
+        return self.client.get('/api/admin/dashboard', headers={'Authorization': f"Bearer {access_token}"})
+
+    def test_signup_token_is_accepted(self):
+        access_token = self.signup_admin('/api/users/signup')
+        self.assertEqual(self.dashboard(access_token).status_code, 200)
+
+    def test_deactivated_users_cannot_log_back_in(self):
+        self.signup_admin('/api/users/signup')
+        user_id = User.query.filter_by(email='ada@example.com').one().id
+        credentials = {'email': 'ada@example.com', 'password': 'Passw0rdAdmin'}
+        deactivate_user_service(user_id)
+        for path in ('/api/users/login', '/api/auth/signin'):
+            response = self.client.post(path, json=credentials)
+            self.assertIn(response.status_code, (401, 403), path)
+            self.assertNotIn('tokens', response.get_json(), path)
+        self.assertFalse(db.session.get(User, user_id).is_active)
+
+        activate_user_service(user_id)
+        for path in ('/api/users/login', '/api/auth/signin'):
+            response = self.client.post(path, json=credentials)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(self.dashboard(response.get_json()['tokens']['access_token']).status_code, 200, path)
+
+    def test_logout_revokes_only_the_current_session(self):
+        first = self.signup_admin('/api/users/signup')
+        response = self.client.post('/api/auth/signin', json={'email': 'ada@example.com', 'password': 'Passw0rdAdmin'})
+        second = response.get_json()['tokens']['access_token']
+
+        response = self.client.post('/api/auth/logout', headers={'Authorization': f"Bearer {first}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.dashboard(first).status_code, 401)
+        self.assertEqual(self.dashboard(second).status_code, 200)
+        self.assertTrue(User.query.filter_by(email='ada@example.com').one().is_active)
+
+    def test_changes_made_elsewhere_are_seen_once_the_entry_expires(self):
+        user = User(firstname='a', lastname='b', email='a@example.com', password='x')
+        user.is_active = True
+        db.session.add(user)
+        db.session.commit()
+        cache = UserStateCache(ttl=60)
+        self.assertTrue(cache.get(user.id)['is_active'])
+
+        # A change made by another worker does not reach this process's entry
+        db.session.execute(db.update(User).where(User.id == user.id).values(is_active=False))
+        db.session.commit()
+        self.assertTrue(cache.get(user.id)['is_active'])
+        cache.invalidate(user.id)
+        self.assertFalse(cache.get(user.id)['is_active'])
+
+        uncached = UserStateCache(ttl=0)
+        self.assertFalse(uncached.get(user.id)['is_active'])
+        db.session.execute(db.update(User).where(User.id == user.id).values(is_active=True))
+        db.session.commit()
+        self.assertTrue(uncached.get(user.id)['is_active'])
+
+
+if __name__ == "__main__":
+    unittest.main()
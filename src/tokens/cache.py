@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from src.extensions import db
+from src.tokens.models import RevokedToken
+from src.utils.cache import TTLCache, BloomFilter
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Maximum number of revoked JTIs kept in memory
+REVOKED_TOKEN_CACHE_SIZE = int(os.getenv('REVOKED_TOKEN_CACHE_SIZE', 100000))
+# Seconds between two incremental syncs with the revoked tokens table
+REVOKED_TOKEN_SYNC_INTERVAL = int(os.getenv('REVOKED_TOKEN_SYNC_INTERVAL', 5))
+# Expected number of revoked tokens alive at once (sizes the Bloom filter)
+REVOKED_TOKEN_BLOOM_CAPACITY = int(os.getenv('REVOKED_TOKEN_BLOOM_CAPACITY', 200000))
+# Ids below the highest one seen that every sync scans again, for rows committed out of id order
+REVOKED_TOKEN_SYNC_OVERLAP = int(os.getenv('REVOKED_TOKEN_SYNC_OVERLAP', 1000))
+# Lifetime of a cached entry when the token expiry is unknown (longest token lifetime, in days)
+REVOKED_TOKEN_DEFAULT_TTL = int(os.getenv('REFRESH_TOKEN_EXPIRES', 7)) * 24 * 3600
+
+
+def _epoch(value):
+    """
+    Convert a datetime read from the database (naive values are UTC) to epoch seconds.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevokedTokenCache:
+    """
+    In-process cache in front of the revoked tokens table.
+
+    Revoked JTIs are kept in a bounded set whose entries expire with the token itself,
+    and every JTI still alive is added to a Bloom filter. The filter is kept in step with
+    the database by pulling rows with an id above the last one seen, so revocations made
+    by other workers are picked up within REVOKED_TOKEN_SYNC_INTERVAL seconds. A Bloom
+    miss proves the token is not revoked and costs no database round trip.
+
+    Ids are allocated when a row is inserted, not when it commits, so a revocation can become
+    visible after rows with higher ids. Each sync therefore scans again the last `sync_overlap`
+    ids below the highest one seen, which catches such late rows on a later sync.
+
+    A Bloom filter cannot forget an item, so expired JTIs would pile up in it. The filter is
+    rebuilt from the unexpired rows after each purge of the table, and by the sync as soon as
+    it holds more items than its capacity.
+    """
+
+    def __init__(self, maxsize=REVOKED_TOKEN_CACHE_SIZE, sync_interval=REVOKED_TOKEN_SYNC_INTERVAL,
+                 bloom_capacity=REVOKED_TOKEN_BLOOM_CAPACITY, sync_overlap=REVOKED_TOKEN_SYNC_OVERLAP):
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.bloom_capacity = bloom_capacity
+        self._revoked = TTLCache(maxsize=maxsize, ttl=REVOKED_TOKEN_DEFAULT_TTL)
+        # Bloom false positives confirmed as not revoked by the database
+        self._not_revoked = TTLCache(maxsize=maxsize, ttl=sync_interval)
+        self._bloom = BloomFilter(capacity=bloom_capacity)
+        self._last_id = 0
+        self._synced_at = None
+        self._sync_lock = threading.Lock()
+
+    def add(self, jti, expires_at=None):
+        """
+        Record a revoked token.
+
+        :param jti: The JTI of the revoked token.
+        :param expires_at: Expiry of the token in epoch seconds, if known.
+        """
+        self._bloom.add(jti)
+        self._not_revoked.pop(jti)
+        self._revoked.set(jti, True, expires_at=expires_at)
+
+    def is_revoked(self, jti, expires_at=None):
+        """
+        Check if a token is revoked, hitting the database only on a Bloom filter hit
+        that is not already known.
+
+        :param jti: The JTI of the token to check.
+        :param expires_at: Expiry of the token in epoch seconds, used to bound the cache entry.
+        :return: True if the token is revoked, False otherwise.
+        """
+        if jti in self._revoked:
+            return True
+
+        if not self._sync_if_stale():
+            # The filter was never loaded, so a miss proves nothing
+            return RevokedToken.is_token_revoked(jti)
+        if jti not in self._bloom:
+            return False
+        if jti in self._revoked:
+            return True
+        if jti in self._not_revoked:
+            return False
+
+        revoked = RevokedToken.is_token_revoked(jti)
+        if revoked:
+            self._revoked.set(jti, True, expires_at=expires_at)
+        else:
+            self._not_revoked.set(jti, True)
+        return revoked
+
+    def _sync_if_stale(self):
+        """
+        Pull the revoked tokens added since the last sync. The first call blocks until the
+        initial load is done; later calls skip the sync if another thread is running it.
+
+        :return: True if the Bloom filter has been loaded at least once, False otherwise.
+        """
+        if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+            return True
+        if not self._sync_lock.acquire(blocking=self._synced_at is None):
+            return True
+        try:
+            if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return True
+            rows = RevokedToken.query.with_entities(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at) \
+                .filter(RevokedToken.id > max(0, self._last_id - self.sync_overlap)) \
+                .order_by(RevokedToken.id) \
+                .all()
+            now = time.time()
+            for row_id, jti, expires_at in rows:
+                self._last_id = max(self._last_id, row_id)
+                expires_at = _epoch(expires_at)
+                if expires_at is not None and expires_at <= now:
+                    continue
+                # Rows of the overlap were usually seen already; do not count them twice
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+                self._not_revoked.pop(jti)
+                self._revoked.set(jti, True, expires_at=expires_at)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild()
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error syncing revoked token cache: {str(e)}")
+        finally:
+            self._sync_lock.release()
+        return self._synced_at is not None
+
+    def rebuild(self):
+        """
+        Replace the Bloom filter by one holding only the revoked tokens not expired yet.
+
+        :return: True if the filter was rebuilt, False if the database could not be read.
+        """
+        with self._sync_lock:
+            try:
+                self._rebuild()
+                self._synced_at = time.monotonic()
+                return True
+            except Exception as e:
+                logger.error(f"Error rebuilding revoked token Bloom filter: {str(e)}")
+                return False
+
+    def _rebuild(self):
+        # Called with _sync_lock held; the new filter is filled aside and swapped in at once
+        now = datetime.now(timezone.utc)
+        rows = RevokedToken.query.with_entities(RevokedToken.id, RevokedToken.jti) \
+            .filter(db.or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > now)) \
+            .all()
+        # Room for twice the live tokens, so that a busy period does not trigger a rebuild on every sync
+        bloom = BloomFilter(capacity=max(self.bloom_capacity, 2 * len(rows)), error_rate=self._bloom.error_rate)
+        last_id = self._last_id
+        for row_id, jti in rows:
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        previous, self._bloom, self._last_id = self._bloom.count, bloom, last_id
+        logger.info(f"Revoked token Bloom filter rebuilt: {previous} entries before, {bloom.count} after")
+
+    def clear(self):
+        """
+        Forget everything, forcing a full reload on the next check.
+        """
+        with self._sync_lock:
+            self._revoked.clear()
+            self._not_revoked.clear()
+            self._bloom.clear()
+            self._last_id = 0
+            self._synced_at = None
+
+
+revoked_token_cache = RevokedTokenCache()
+
+
+def purge_revoked_tokens():
+    """
+    Delete the expired revoked tokens, then rebuild the Bloom filter of this process without them.
+    Runs as a periodic task.
+
+    :return: Number of rows deleted.
+    """
+    deleted = RevokedToken.clean_revoked_tokens()
+    revoked_token_cache.rebuild()
+    return deleted
@@ -0,0 +1,16 @@
+from flask import jsonify
+from src.tokens.keys import key_ring
+import logging
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+
+def jwks():
+    """
+    Publish the public keys used to sign JWTs so other services can verify tokens locally.
+    :return: JSON Web Key Set (empty when tokens are HMAC-signed).
+    """
+    response = jsonify(key_ring.jwks() if key_ring.enabled else {'keys': []})
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response, 200
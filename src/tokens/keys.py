@@ -0,0 +1,229 @@
+import logging
+import os
+import threading
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, ed25519
+from flask import current_app
+from jwt.algorithms import RSAAlgorithm, OKPAlgorithm
+from jwt.exceptions import InvalidSignatureError
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Directory of signing keys: <kid>.pem private keys (signing and verification)
+# and <kid>.pub.pem public keys (verification only, for retired keys).
+# Leave empty to keep HMAC signing with JWT_SECRET_KEY.
+JWT_KEYS_DIR = os.getenv('JWT_KEYS_DIR', '')
+# kid of the key used to sign new tokens (defaults to the newest key past the publish delay)
+JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID', '')
+# Seconds a new key is only published in the JWKS before it starts signing,
+# so that verifiers have fetched it before they see tokens signed with it
+JWT_KEY_PUBLISH_DELAY = int(os.getenv('JWT_KEY_PUBLISH_DELAY', 3600))
+# Seconds between two scans of JWT_KEYS_DIR (0 disables reloading)
+JWT_KEYS_RELOAD_INTERVAL = int(os.getenv('JWT_KEYS_RELOAD_INTERVAL', 300))
+
+# Algorithms of the supported key types; each token is checked with the algorithm of its own key
+SIGNING_ALGORITHMS = ['EdDSA', 'RS256']
+
+
+class SigningKey:
+    """
+    One key of the ring, identified by its kid.
+    """
+
+    def __init__(self, kid, public_key, private_key=None, created_at=None):
+        if isinstance(public_key, rsa.RSAPublicKey):
+            self.algorithm = 'RS256'
+        elif isinstance(public_key, ed25519.Ed25519PublicKey):
+            self.algorithm = 'EdDSA'
+        else:
+            raise ValueError(f"Unsupported key type for kid {kid}: {type(public_key).__name__}")
+        self.kid = kid
+        self.public_key = public_key
+        self.private_key = private_key
+        self.created_at = created_at or time.time()
+
+    def to_jwk(self):
+        """
+        :return: The public key as a JWK dictionary.
+        """
+        algorithm = RSAAlgorithm if self.algorithm == 'RS256' else OKPAlgorithm
+        jwk = algorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+
+class KeyRing:
+    """
+    Set of asymmetric keys used to sign and verify JWTs.
+
+    Every key in the ring is published in the JWKS and accepted for verification,
+    while only the active key signs new tokens. Rotating means adding a key file,
+    letting it become active, then removing the old private key once every token
+    it signed has expired (optionally keeping <kid>.pub.pem until then).
+    """
+
+    def __init__(self, directory=JWT_KEYS_DIR, active_kid=JWT_ACTIVE_KID, publish_delay=JWT_KEY_PUBLISH_DELAY):
+        self.directory = directory
+        self.configured_kid = active_kid
+        self.publish_delay = publish_delay
+        self.keys = {}
+        self.active = None
+        self._lock = threading.Lock()
+        # Key read by the first of the two loaders signing a token, for the second one
+        self._signing = threading.local()
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def load(self):
+        """
+        (Re)load every key of the directory and select the active one.
+        Keeps the previous keys if the directory cannot be read.
+
+        :return: The kids that were in the ring and are no longer.
+        """
+        keys = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.pem'):
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, 'rb') as key_file:
+                data = key_file.read()
+            try:
+                if filename.endswith('.pub.pem'):
+                    kid = filename[:-len('.pub.pem')]
+                    public_key, private_key = serialization.load_pem_public_key(data), None
+                else:
+                    kid = filename[:-len('.pem')]
+                    private_key = serialization.load_pem_private_key(data, password=None)
+                    public_key = private_key.public_key()
+                if kid in keys and keys[kid].private_key is not None:
+                    continue
+                keys[kid] = SigningKey(kid, public_key, private_key, created_at=os.path.getmtime(path))
+            except ValueError as e:
+                logger.error(f"Skipping JWT key file {filename}: {str(e)}")
+
+        active = self._select_active(keys)
+        if active is None:
+            raise ValueError(f"No usable private key found in {self.directory}")
+
+        # The new active key is in the new keys, so tokens it signs always verify
+        with self._lock:
+            removed = set(self.keys) - set(keys)
+            self.keys = keys
+            if self.active is None or self.active.kid != active.kid:
+                logger.info(f"JWT signing key is now {active.kid} ({active.algorithm})")
+            self.active = active
+        if removed:
+            logger.info(f"JWT keys removed: {', '.join(sorted(removed))}")
+        return removed
+
+    def _select_active(self, keys):
+        signing_keys = [key for key in keys.values() if key.private_key is not None]
+        if not signing_keys:
+            return None
+        if self.configured_kid:
+            key = keys.get(self.configured_kid)
+            if key is None or key.private_key is None:
+                raise ValueError(f"Active JWT key {self.configured_kid} has no private key in {self.directory}")
+            return key
+
+        published_before = time.time() - self.publish_delay
+        ready = [key for key in signing_keys if key.created_at <= published_before]
+        if ready:
+            return max(ready, key=lambda key: key.created_at)
+        # Fresh deployment: no key has been published long enough, use the oldest one
+        return min(signing_keys, key=lambda key: key.created_at)
+
+    def signing_key(self):
+        """
+        The key signing the token being encoded. Flask-JWT-Extended calls its header loader and
+        its encode key loader once each per token: the first call reads the active key and the
+        second one gets that same key, so that a reload in between cannot pair the kid and
+        algorithm of one key with the secret of another.
+
+        :return: The SigningKey.
+        """
+        key = getattr(self._signing, 'key', None)
+        if key is not None:
+            self._signing.key = None
+            return key
+        key = self.active
+        self._signing.key = key
+        return key
+
+    def public_key(self, kid, algorithm=None):
+        """
+        :param kid: The kid from a token header.
+        :param algorithm: The alg from the token header, if it must match the key.
+        :return: The public key for that kid, or None if unknown.
+        """
+        key = self.keys.get(kid)
+        if key is None or (algorithm is not None and key.algorithm != algorithm):
+            return None
+        return key.public_key
+
+    def jwks(self):
+        """
+        :return: The JSON Web Key Set of every key in the ring.
+        """
+        return {'keys': [key.to_jwk() for key in self.keys.values()]}
+
+
+key_ring = KeyRing()
+
+
+def init_key_ring(app, jwt, ring=key_ring):
+    """
+    Switch JWT signing to the asymmetric keys of JWT_KEYS_DIR, if configured.
+
+    Tokens are signed with the active key read once per token, with its own kid and
+    algorithm in the header (PyJWT signs with the alg of the header over JWT_ALGORITHM),
+    and verified with the key named by their kid, so reloading the ring never needs to
+    touch the app config.
+
+    :param app: The Flask app.
+    :param jwt: The JWTManager to register the key callbacks on.
+    :param ring: The KeyRing to use.
+    :return: True if asymmetric signing is enabled, False if HMAC signing is kept.
+    """
+    if not ring.enabled:
+        return False
+
+    ring.load()
+    app.config['JWT_DECODE_ALGORITHMS'] = SIGNING_ALGORITHMS
+
+    @jwt.additional_headers_loader
+    def signing_key_headers(identity):
+        signing_key = ring.signing_key()
+        return {'kid': signing_key.kid, 'alg': signing_key.algorithm}
+
+    @jwt.encode_key_loader
+    def signing_secret(identity):
+        return ring.signing_key().private_key
+
+    @jwt.decode_key_loader
+    def verification_key(jwt_header, jwt_payload):
+        public_key = ring.public_key(jwt_header.get('kid'), jwt_header.get('alg'))
+        if public_key is None:
+            raise InvalidSignatureError("Token signed with an unknown key")
+        return public_key
+
+    logger.info(f"JWT signing with {ring.active.algorithm}, {len(ring.keys)} key(s) published")
+    return True
+
+
+def reload_key_ring(ring=key_ring):
+    """
+    Rescan JWT_KEYS_DIR, picking up new and removed keys. Runs as a periodic task.
+    Tokens verified with a removed key are dropped from the verified token cache,
+    so that they are checked again, and rejected, on their next use.
+
+    :param ring: The KeyRing to reload.
+    """
+    if ring.load():
+        current_app.extensions['flask-jwt-extended'].verified_tokens.clear()
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import time
+
+from flask_jwt_extended import JWTManager
+
+from src.utils.cache import TTLCache
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Number of verified tokens whose decoded claims are kept in memory
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', 10000))
+# Upper bound, in seconds, on how long a token is trusted without verifying it again
+VERIFIED_TOKEN_CACHE_TTL = int(os.getenv('VERIFIED_TOKEN_CACHE_TTL', 300))
+
+
+class VerifiedTokenCache:
+    """
+    LRU of recently verified tokens, keyed by the SHA-256 digest of the encoded token
+    and holding its decoded claims until the token expires (capped by a TTL).
+    """
+
+    def __init__(self, maxsize=VERIFIED_TOKEN_CACHE_SIZE, ttl=VERIFIED_TOKEN_CACHE_TTL):
+        self.ttl = ttl
+        self._claims = TTLCache(maxsize=maxsize)
+        # jti -> digest, to drop a token when it is revoked
+        self._digests = TTLCache(maxsize=maxsize)
+
+    @staticmethod
+    def _digest(encoded_token):
+        return hashlib.sha256(encoded_token.encode('utf-8')).digest()
+
+    def get(self, encoded_token):
+        """
+        :param encoded_token: The encoded JWT.
+        :return: A copy of the decoded claims if the token was verified recently, None otherwise.
+        """
+        claims = self._claims.get(self._digest(encoded_token))
+        return dict(claims) if claims is not None else None
+
+    def add(self, encoded_token, claims):
+        """
+        Remember the claims of a token that just passed verification.
+        Tokens without an expiry or not yet valid are not cached.
+        """
+        now = time.time()
+        exp = claims.get('exp')
+        if exp is None or claims.get('nbf', 0) > now:
+            return
+        expires_at = min(exp, now + self.ttl)
+        digest = self._digest(encoded_token)
+        self._claims.set(digest, claims, expires_at=expires_at)
+        if 'jti' in claims:
+            self._digests.set(claims['jti'], digest, expires_at=expires_at)
+
+    def discard_jti(self, jti):
+        """
+        Drop the cached claims of a token, e.g. when it is revoked.
+        """
+        digest = self._digests.pop(jti)
+        if digest is not None:
+            self._claims.pop(digest)
+
+    def clear(self):
+        self._claims.clear()
+        self._digests.clear()
+
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager that skips signature verification and claim validation for tokens it has
+    verified recently. The blocklist and token type checks of Flask-JWT-Extended still run
+    on every request, on the cached claims.
+    """
+
+    def __init__(self, app=None, add_context_processor=False):
+        self.verified_tokens = VerifiedTokenCache()
+        super().__init__(app, add_context_processor)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # Cookie tokens (CSRF) and expired-token decoding take the regular path
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        claims = self.verified_tokens.get(encoded_token)
+        if claims is not None:
+            if claims['exp'] > time.time():
+                return claims
+            self.verified_tokens.discard_jti(claims.get('jti'))
+
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        self.verified_tokens.add(encoded_token, claims)
+        return claims
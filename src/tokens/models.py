@@ -1,29 +1,44 @@
+import os
+import time
+
 from src import db
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import logging
 
 # Logger configuration
 logger = logging.getLogger(__name__)
 
+# Rows deleted per transaction when purging expired revoked tokens
+REVOKED_TOKEN_PURGE_CHUNK_SIZE = int(os.getenv('REVOKED_TOKEN_PURGE_CHUNK_SIZE', 1000))
+# Seconds to sleep between two purge chunks, leaving room for other writers
+REVOKED_TOKEN_PURGE_PAUSE = float(os.getenv('REVOKED_TOKEN_PURGE_PAUSE', 0.05))
+# Horizon for legacy rows stored without an expiry (longest token lifetime, in days)
+REVOKED_TOKEN_LEGACY_HORIZON = int(os.getenv('REFRESH_TOKEN_EXPIRES', 7))
+
+
 class RevokedToken(db.Model):
     """
     Model for storing revoked JWT tokens to prevent reuse.
     """
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True, index=True)  # JWT ID with indexing for faster lookup
-    revoked_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    revoked_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # Expiry of the token itself, rows are purged after it
 
     def add(self):
         """
         Add the revoked token to the database.
+        :return: True if the revocation was committed, False otherwise.
         """
         try:
             db.session.add(self)
             db.session.commit()
             logger.info(f"Token {self.jti} revoked at {self.revoked_at}")
+            return True
         except Exception as e:
             logger.error(f"Error adding revoked token: {str(e)}")
             db.session.rollback()
+            return False
 
     @classmethod
     def is_token_revoked(cls, jti):
@@ -40,17 +55,52 @@ class RevokedToken(db.Model):
             logger.error(f"Error checking if token is revoked: {str(e)}")
             return False
 
+    @classmethod
+    def purge_expired(cls, chunk_size=REVOKED_TOKEN_PURGE_CHUNK_SIZE, pause=REVOKED_TOKEN_PURGE_PAUSE,
+                      max_chunks=None):
+        """
+        Delete revoked tokens whose own expiry has passed, since an expired token is rejected anyway.
+        Rows are deleted by primary key in chunks, each in its own short transaction.
+
+        :param chunk_size: Maximum number of rows deleted per transaction.
+        :param pause: Seconds to sleep between two chunks.
+        :param max_chunks: Stop after this many chunks (None means until nothing is left).
+        :return: Number of rows deleted.
+        """
+        now = datetime.now(timezone.utc)
+        legacy_cutoff = now - timedelta(days=REVOKED_TOKEN_LEGACY_HORIZON)
+        expired = db.or_(
+            cls.expires_at < now,
+            db.and_(cls.expires_at.is_(None), cls.revoked_at < legacy_cutoff)
+        )
+
+        deleted = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            ids = [row.id for row in db.session.query(cls.id).filter(expired).limit(chunk_size)]
+            if not ids:
+                break
+            cls.query.filter(cls.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+            chunks += 1
+            if len(ids) < chunk_size:
+                break
+            if pause:
+                time.sleep(pause)
+        return deleted
+
     @classmethod
     def clean_revoked_tokens(cls):
         """
-        Remove tokens that were revoked more than 7 days ago (assuming the token expiration).
+        Remove revoked tokens that have expired.
         This can be called periodically as a maintenance task.
         """
         try:
-            expired_time = datetime.now(timezone.utc) - timedelta(days=7)
-            cls.query.filter(cls.revoked_at < expired_time).delete()
-            db.session.commit()
-            logger.info("Old revoked tokens cleaned up.")
+            deleted = cls.purge_expired()
+            logger.info(f"{deleted} expired revoked tokens cleaned up.")
+            return deleted
         except Exception as e:
             logger.error(f"Error cleaning up revoked tokens: {str(e)}")
-            db.session.rollback()
\ No newline at end of file
+            db.session.rollback()
+            return 0
@@ -2,7 +2,7 @@ from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 from flask import request, jsonify
 from src.tokens.services import create_jwt_token, refresh_access_token, revoke_jwt_token, get_current_user
-from src.exceptions import ValidationError
+from src.exceptions import ValidationError, ServiceUnavailableError
 
 # Logger configuration
 import logging
@@ -83,7 +83,8 @@ class TokenRevoke(Resource):
         if not token_jti:
             raise ValidationError("Token JTI is required.")
 
-        revoke_jwt_token(token_jti)
+        if not revoke_jwt_token(token_jti):
+            raise ServiceUnavailableError("Token could not be revoked, please retry shortly.")
         return jsonify({"message": "Token successfully revoked"}), 200
 
 
@@ -1,14 +1,18 @@
-from flask_jwt_extended import create_access_token, decode_token, get_jwt_identity, jwt_required
+from flask_jwt_extended import create_access_token, decode_token, get_jwt_identity, get_jwt, jwt_required
 from jwt import ExpiredSignatureError
-from datetime import timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta, timezone
 from flask import jsonify
 import os
+import time
 
-from src.exceptions import TokenExpiredError, JWTDecodeError, InvalidTokenError
-from src.extensions import jwt
+from src.exceptions import TokenExpiredError, JWTDecodeError, InvalidTokenError, ServiceUnavailableError
+from src.extensions import db, jwt
 import logging
 
+from src.tokens.cache import revoked_token_cache
 from src.tokens.models import RevokedToken
+from src.users.cache import user_state_cache
 from src.users.models import User
 
 # Logger configuration
@@ -22,23 +26,26 @@ ACCESS_TOKEN_EXPIRES = int(os.getenv('ACCESS_TOKEN_EXPIRES', 24))
 REFRESH_TOKEN_EXPIRES = int(os.getenv('REFRESH_TOKEN_EXPIRES', 7))
 
 
-def create_jwt_token(user_id, role, expires_in=24):
+def create_jwt_token(user_id, role, expires_in=24, token_generation=0):
     """
     Generate an access token and a refresh token for a user.
 
     :param user_id: ID of the user.
     :param role: Role of the user (admin, user, etc.).
     :param expires_in: Lifetime of the access token (in hours).
+    :param token_generation: Current token generation of the user, embedded as the 'gen' claim.
     :return: Dictionary containing access and refresh tokens.
     """
     try:
         # Generate access and refresh tokens with appropriate expiration
         access_token = create_access_token(
             identity={'user_id': user_id, 'role': role},
-            expires_delta=timedelta(hours=ACCESS_TOKEN_EXPIRES)
+            expires_delta=timedelta(hours=ACCESS_TOKEN_EXPIRES),
+            additional_claims={'gen': token_generation}
         )
         refresh_token = create_access_token(
-            identity=user_id, expires_delta=timedelta(REFRESH_TOKEN_EXPIRES)  # Longer expiration for refresh token
+            identity=user_id, expires_delta=timedelta(REFRESH_TOKEN_EXPIRES),  # Longer expiration for refresh token
+            additional_claims={'gen': token_generation}
         )
         return {'access_token': access_token, 'refresh_token': refresh_token}
     except Exception as e:
@@ -74,7 +81,8 @@ def refresh_access_token():
     """
     try:
         current_user_id = get_jwt_identity()
-        new_access_token = create_access_token(identity=current_user_id, expires_delta=timedelta(minutes=15))
+        new_access_token = create_access_token(identity=current_user_id, expires_delta=timedelta(minutes=15),
+                                               additional_claims={'gen': get_jwt().get('gen', 0)})
         return jsonify({'access_token': new_access_token}), 200
     except Exception as e:
         logger.error(f"Error refreshing access token: {str(e)}")
@@ -148,42 +156,94 @@ def get_current_user():
         return jsonify({'status': 'failed', 'message': 'Error fetching user', 'error': str(e)}), 500
 
 
-def revoke_jwt_token(token_jti):
+def revoke_jwt_token(token_jti, expires_at=None):
     """
-    Revoke a JWT token by storing its JTI (JWT ID) in the revoked tokens table.
+    Revoke a JWT token by storing its JTI (JWT ID) in the revoked tokens table
+    and in the in-process revoked token cache.
 
     :param token_jti: JTI of the token to revoke.
+    :param expires_at: Expiry of the token in epoch seconds (the 'exp' claim), if known.
+                       Defaults to the longest token lifetime from now.
+    :return: True if the revocation was committed, False otherwise. Only a committed
+             revocation is cached, so that every worker and restart agrees on it.
     """
     try:
-        revoked_token = RevokedToken(jti=token_jti)
-        revoked_token.add()
+        if expires_at is None:
+            expires_at = time.time() + timedelta(days=REFRESH_TOKEN_EXPIRES).total_seconds()
+        revoked_token = RevokedToken(jti=token_jti, expires_at=datetime.fromtimestamp(expires_at, timezone.utc))
+        if not revoked_token.add():
+            return False
+        revoked_token_cache.add(token_jti, expires_at=expires_at)
+        jwt.verified_tokens.discard_jti(token_jti)
         logger.info(f"Token {token_jti} revoked successfully")
+        return True
     except Exception as e:
         logger.error(f"Error revoking token: {str(e)}")
+        return False
 
 
 def revoke_all_tokens_for_user(user_id):
     """
-    Revoke all tokens for a given user by revoking any active tokens.
+    Revoke all tokens of a user at once by bumping their token generation.
+    Tokens carrying an older 'gen' claim are rejected by the blocklist check,
+    so no per-token rows are written.
+
     :param user_id: ID of the user whose tokens will be revoked.
+    :return: True if the user exists, False otherwise.
     """
     try:
-        user_tokens = RevokedToken.query.filter_by(user_id=user_id).all()
-        for token in user_tokens:
-            token.add()
+        updated = User.query.filter_by(id=user_id).update(
+            {User.token_generation: User.token_generation + 1}, synchronize_session=False
+        )
+        db.session.commit()
+        user_state_cache.invalidate(user_id)
+        if not updated:
+            logger.warning(f"Cannot revoke tokens of unknown user {user_id}")
+            return False
         logger.info(f"All tokens for user {user_id} revoked successfully")
+        return True
     except Exception as e:
         logger.error(f"Error revoking all tokens for user {user_id}: {str(e)}")
+        db.session.rollback()
+        raise
+
+
+def token_user_id(jwt_payload):
+    """
+    Extract the user ID from a JWT payload. Access tokens carry a dictionary identity,
+    refresh tokens the bare user ID.
+
+    :param jwt_payload: JWT payload.
+    :return: The user ID, or None if the token has no user identity.
+    """
+    identity = jwt_payload.get('sub')
+    if isinstance(identity, dict):
+        return identity.get('user_id')
+    return identity
 
 
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     """
-    Check if a JWT token has been revoked by querying the revoked tokens table.
+    Check if a JWT token has been revoked, either because its generation is older than
+    the user's current token generation or because its JTI is in the revoked tokens table.
+    Both checks go through in-process caches. If the database fails, the last known state
+    of the user is used; without one, the check fails closed and the request gets a 503.
 
     :param jwt_header: JWT header.
     :param jwt_payload: JWT payload.
     :return: Boolean indicating if the token is revoked.
-    """
+    :raises ServiceUnavailableError: If the token generation cannot be checked.
+    """
+    user_id = token_user_id(jwt_payload)
+    if user_id is not None:
+        try:
+            user_state = user_state_cache.get(user_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Error checking the token generation of user {user_id}: {str(e)}")
+            raise ServiceUnavailableError("Token cannot be verified right now, please retry shortly.", retry_after=1)
+        if user_state is None or jwt_payload.get('gen', 0) < user_state['token_generation']:
+            return True
+
     jti = jwt_payload['jti']  # Unique identifier for the JWT token
-    return RevokedToken.is_token_revoked(jti)
+    return revoked_token_cache.is_revoked(jti, expires_at=jwt_payload.get('exp'))
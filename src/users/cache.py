@@ -0,0 +1,83 @@
+import logging
+import os
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src import db
+from src.users.models import User
+from src.utils.cache import TTLCache
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Seconds a user's role and active state may be served from memory; this bounds how long other
+# worker processes keep acting on a state changed elsewhere (0 disables the cache)
+USER_STATE_CACHE_TTL = int(os.getenv('USER_STATE_CACHE_TTL', 30))
+USER_STATE_CACHE_SIZE = int(os.getenv('USER_STATE_CACHE_SIZE', 10000))
+
+# Cached marker for user IDs that do not exist
+_UNKNOWN_USER = {}
+
+
+class UserStateCache:
+    """
+    Small TTL cache of the user state checked on every protected request
+    (role, active flag, token generation).
+
+    Services that change this state must call invalidate() so the current worker sees the
+    change immediately. Invalidation is local to the process: other workers pick the change
+    up once their entry expires, at most USER_STATE_CACHE_TTL seconds later.
+
+    The last state loaded for each user is kept past its expiry, and is served when the
+    database cannot be read; a state dropped by invalidate() is never served that way.
+    """
+
+    def __init__(self, maxsize=USER_STATE_CACHE_SIZE, ttl=USER_STATE_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._last_known = TTLCache(maxsize=maxsize)
+
+    def get(self, user_id):
+        """
+        Get the state of a user, loading only the needed columns on a cache miss.
+
+        :param user_id: ID of the user.
+        :return: Dictionary with 'role', 'is_active' and 'token_generation', or None if the user does not exist.
+        :raises SQLAlchemyError: If the database cannot be read and no state of the user is known.
+        """
+        state = self._cache.get(user_id)
+        if state is None:
+            try:
+                row = db.session.query(User.role, User.is_active, User.token_generation) \
+                    .filter(User.id == user_id).first()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                state = self._last_known.get(user_id)
+                if state is None:
+                    raise
+                logger.warning(f"Serving the last known state of user {user_id}, the database failed: {str(e)}")
+                return state or None
+            state = {
+                'role': row.role,
+                'is_active': bool(row.is_active),
+                'token_generation': row.token_generation or 0,
+            } if row else _UNKNOWN_USER
+            self._cache.set(user_id, state)
+            self._last_known.set(user_id, state)
+        return state or None
+
+    def invalidate(self, user_id):
+        """
+        Drop the cached state of a user.
+
+        :param user_id: ID of the user.
+        """
+        self._cache.pop(user_id)
+        self._last_known.pop(user_id)
+        logger.debug(f"User state cache invalidated for user {user_id}")
+
+    def clear(self):
+        self._cache.clear()
+        self._last_known.clear()
+
+
+user_state_cache = UserStateCache()
@@ -1,9 +1,9 @@
 import logging
 from flask import request, jsonify
 from flask_jwt_extended import get_jwt, jwt_required, get_jwt_identity
-from src import db
-from src.logs.models import Log
+from src.logs.writer import log_activity
 
+from src.exceptions import ServiceUnavailableError
 from src.middlewares.decorators import handle_exceptions
 from src.tokens.services import revoke_jwt_token
 from src.users.models import User
@@ -39,12 +39,7 @@ def login():
     user_email = data.get('email')
     user = User.query.filter_by(email=user_email).first()
     if user:
-        log = Log(user_id=user.id, action="User logged in")
-        log.save()
-
-        # Activate the user if they are not active
-        user.is_active = True
-        user.save()
+        log_activity(user.id, "User logged in")
 
     return jsonify({'status': "success", "message": "User Login Successful", "tokens": tokens}), 200
 
@@ -53,26 +48,23 @@ def login():
 @handle_exceptions
 def logout():
     """
-    Log out the current user by revoking their JWT token.
+    Log out the current user by revoking their JWT token. The other sessions of the user stay valid.
     :return: JSON response indicating successful logout.
     """
-    jti = get_jwt()['jti']  # JWT ID
+    jwt_data = get_jwt()
+    jti = jwt_data['jti']  # JWT ID
     current_user_identity = get_jwt_identity()
 
     # Revoke the JWT token
-    revoke_jwt_token(jti)
+    if not revoke_jwt_token(jti, expires_at=jwt_data.get('exp')):
+        raise ServiceUnavailableError("Token could not be revoked, please retry shortly.")
 
-    # Deactivate the user
     user_id = current_user_identity['user_id']
     user = User.query.get(user_id)
 
     if user:
         # Log the logout action
-        log = Log(user_id=user_id, action="User logged out")
-        log.save()
-
-        user.is_active = False
-        db.session.commit()
+        log_activity(user_id, "User logged out")
 
-    logger.info(f"User logged out, token {jti} revoked, user_id {user_id} set to inactive")
+    logger.info(f"User logged out, token {jti} revoked, user_id {user_id}")
     return jsonify({"message": "Successfully logged out"}), 200
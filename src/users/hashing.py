@@ -0,0 +1,204 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt as bcrypt_lib
+
+from src.exceptions import ServiceUnavailableError
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Number of threads hashing passwords (bcrypt releases the GIL while hashing)
+HASH_POOL_WORKERS = int(os.getenv('HASH_POOL_WORKERS', os.cpu_count() or 2))
+# Number of hash jobs allowed to wait for a free worker before new ones are rejected
+HASH_POOL_MAX_QUEUE = int(os.getenv('HASH_POOL_MAX_QUEUE', 16))
+# Seconds clients are asked to wait before retrying when the pool is saturated
+HASH_POOL_RETRY_AFTER = int(os.getenv('HASH_POOL_RETRY_AFTER', 1))
+
+# Time budget for a single password hash, in milliseconds (0 disables calibration)
+BCRYPT_TARGET_MS = int(os.getenv('BCRYPT_TARGET_MS', 250))
+# Calibration never goes below Flask-Bcrypt's default cost
+BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', 12))
+BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', 15))
+# Flask-Bcrypt's default cost, used when BCRYPT_LOG_ROUNDS is not configured
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def calibrate_bcrypt_rounds(target_ms=BCRYPT_TARGET_MS, min_rounds=BCRYPT_MIN_ROUNDS,
+                            max_rounds=BCRYPT_MAX_ROUNDS):
+    """
+    Pick the highest bcrypt cost whose hash time fits the target on this machine.
+
+    The cheapest cost is timed (best of two runs) and each extra round doubles that time,
+    so calibration costs a couple of hashes at min_rounds.
+
+    :param target_ms: Time budget for one hash, in milliseconds.
+    :param min_rounds: Lowest cost ever returned.
+    :param max_rounds: Highest cost ever returned.
+    :return: The selected log rounds.
+    """
+    salt = bcrypt_lib.gensalt(rounds=min_rounds)
+    elapsed = None
+    for _ in range(2):
+        started_at = time.perf_counter()
+        bcrypt_lib.hashpw(b'calibration-password', salt)
+        run_time = time.perf_counter() - started_at
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+
+    rounds, elapsed_ms = min_rounds, elapsed * 1000
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    logger.info(f"Bcrypt cost calibrated to {rounds} rounds (~{elapsed_ms:.0f} ms per hash, target {target_ms} ms)")
+    return rounds
+
+
+def hash_rounds(password_hash):
+    """
+    Read the cost factor of a bcrypt hash ('$2b$<rounds>$...').
+
+    :param password_hash: The stored password hash.
+    :return: The log rounds, or None if the hash is not in bcrypt format.
+    """
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash, rounds):
+    """
+    Check if a stored hash was made with a lower cost than the current target. Hashes are
+    never rehashed downwards, so a calibration that comes out low on a slow or noisy
+    machine cannot weaken the stored hashes.
+
+    :param password_hash: The stored password hash.
+    :param rounds: The current target log rounds.
+    :return: True if the hash should be recomputed.
+    """
+    current = hash_rounds(password_hash)
+    return current is None or current < rounds
+
+
+class HashMetrics:
+    """
+    Counters and timings of the password hashing pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def record_submitted(self):
+        with self._lock:
+            self.submitted += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record(self, queue_wait, hash_time):
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.hash_time_total += hash_time
+            self.hash_time_max = max(self.hash_time_max, hash_time)
+
+    def snapshot(self):
+        """
+        :return: Dictionary of the current counters, with timings in milliseconds.
+        """
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'queue_wait_avg_ms': round(self.queue_wait_total / completed * 1000, 3),
+                'queue_wait_max_ms': round(self.queue_wait_max * 1000, 3),
+                'hash_time_avg_ms': round(self.hash_time_total / completed * 1000, 3),
+                'hash_time_max_ms': round(self.hash_time_max * 1000, 3),
+            }
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool running bcrypt work outside of the request threads.
+
+    At most `workers` hashes run at once and at most `max_queue` more may wait. Past that,
+    new jobs are rejected immediately with a ServiceUnavailableError instead of piling up,
+    so a login storm cannot starve the workers serving cheap endpoints.
+    """
+
+    def __init__(self, workers=HASH_POOL_WORKERS, max_queue=HASH_POOL_MAX_QUEUE,
+                 retry_after=HASH_POOL_RETRY_AFTER):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.metrics = HashMetrics()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def _run(self, submitted_at, fn, args):
+        started_at = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.metrics.record(started_at - submitted_at, time.perf_counter() - started_at)
+
+    def _release(self, future):
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """
+        Run a hashing function on the pool and wait for its result.
+
+        :param fn: The function to run (e.g. bcrypt.generate_password_hash, User.verify_password).
+        :param args: Positional arguments for the function.
+        :return: The function's return value.
+        :raises ServiceUnavailableError: If the pool and its queue are full.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.metrics.record_rejected()
+            logger.warning(f"Password hashing pool saturated ({self.workers} workers, {self.max_queue} queued)")
+            raise ServiceUnavailableError("Server is busy, please retry shortly.", retry_after=self.retry_after)
+
+        with self._pending_lock:
+            self._pending += 1
+        self.metrics.record_submitted()
+        try:
+            future = self._executor.submit(self._run, time.perf_counter(), fn, args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future.result()
+
+    def stats(self):
+        """
+        :return: Pool configuration, current load and metrics.
+        """
+        stats = self.metrics.snapshot()
+        stats.update({
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+        })
+        return stats
+
+
+password_hash_pool = PasswordHashPool()
@@ -16,11 +16,18 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False, default='user')  # Role can be 'user' or 'admin'
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.now(timezone.utc))
-    is_active = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    is_active = db.Column(db.Boolean, default=True)  # Cleared by an admin to lock the account out
+    token_generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped to revoke all tokens
     api_keys = db.relationship('ApiKeyModel', backref='user', lazy='dynamic')
 
+    # Indexes backing the sort orders of the admin listing, alone and filtered by role
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+        db.Index('ix_user_role_created_at_id', 'role', 'created_at', 'id'),
+    )
+
     def __init__(self, firstname, lastname, email, password, role='user'):
         """
         Initialize the user with hashed password and role.
@@ -47,8 +54,8 @@ class User(db.Model):
             'email': self.email,
             'role': self.role,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
 
     def save(self):
@@ -1,11 +1,13 @@
 from email_validator import validate_email, EmailNotValidError
 
 from src import db
-from src.exceptions import ConflictError, ValidationError, NotFoundError
+from src.exceptions import ConflictError, ValidationError, NotFoundError, ServiceUnavailableError, UnauthorizedError
 from src.extensions import bcrypt
 import logging
+from flask import current_app
 
 from src.tokens.services import create_jwt_token
+from src.users.hashing import password_hash_pool, needs_rehash, DEFAULT_BCRYPT_ROUNDS
 from src.users.models import User
 
 # Logger configuration
@@ -62,8 +64,8 @@ def signup_user(data, role='user'):
     if existing_user:
         raise ConflictError("User already exists")
 
-    # Create new user and hash password
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    # Create new user and hash password on the bounded hashing pool
+    hashed_password = password_hash_pool.run(bcrypt.generate_password_hash, password).decode('utf-8')
 
     new_user = User(
         firstname=firstname,
@@ -77,7 +79,7 @@ def signup_user(data, role='user'):
     db.session.commit()
 
     # Generate a JWT token for the new user
-    tokens = create_jwt_token(user_id=new_user.id, role=new_user.role)
+    tokens = create_jwt_token(user_id=new_user.id, role=new_user.role, token_generation=new_user.token_generation)
     logger.info(f"New user signed up: {email}")
     return tokens
 
@@ -101,15 +103,46 @@ def login_user(data):
         logger.warning(f"Login failed: User with email {email} not found")
         raise NotFoundError("User not found")
 
-    # Verify password
-    password_valid = user.verify_password(password)
+    # Verify password on the bounded hashing pool
+    password_valid = password_hash_pool.run(user.verify_password, password)
     if not password_valid:
         # Log the password hash and the provided password
         logger.debug(f"Stored password hash for user {email}: {user.password_hash}")
         logger.debug(f"Password provided by user: {password}")
         raise ValidationError("Invalid Password")
 
+    # Only an admin can lift a deactivation; logging in again does not
+    if not user.is_active:
+        logger.warning(f"Login refused: user {email} is deactivated")
+        raise UnauthorizedError("Your account is not active.")
+
+    # Bring the stored hash to the current cost so the user base converges without a migration
+    rehash_password_if_needed(user, password)
+
     # If the password is correct, generate a JWT token
-    tokens = create_jwt_token(user_id=user.id, role=user.role)
+    tokens = create_jwt_token(user_id=user.id, role=user.role, token_generation=user.token_generation)
     logger.info(f"User logged in: {email}")
     return tokens
+
+
+def rehash_password_if_needed(user, password):
+    """
+    Recompute a user's password hash if it was made with a lower bcrypt cost than
+    the configured one. Skipped, without failing the login, when the hashing pool is busy.
+
+    :param user: The user who just logged in with a valid password.
+    :param password: The plaintext password that was verified.
+    """
+    rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_BCRYPT_ROUNDS)
+    if not needs_rehash(user.password_hash, rounds):
+        return
+
+    try:
+        user.password_hash = password_hash_pool.run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+        db.session.commit()
+        logger.info(f"Password hash of user {user.id} rehashed to {rounds} rounds")
+    except ServiceUnavailableError:
+        logger.info(f"Rehash of user {user.id} postponed, hashing pool is busy")
+    except Exception as e:
+        logger.error(f"Error rehashing password of user {user.id}: {str(e)}")
+        db.session.rollback()
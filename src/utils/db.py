@@ -0,0 +1,65 @@
+import logging
+
+from src.extensions import db
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+
+def _dialect_insert(dialect_name):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        return None
+    return insert
+
+
+def upsert_increment(model, rows, key_columns, increment_columns):
+    """
+    Insert rows, adding their counters to the existing row when the key already exists,
+    in a single statement (ON CONFLICT / ON DUPLICATE KEY UPDATE). The caller commits.
+
+    :param model: The model to write to; key_columns must be covered by a unique constraint.
+    :param rows: List of dictionaries with a value for every key and increment column.
+    :param key_columns: Names of the columns identifying a row.
+    :param increment_columns: Names of the counter columns added on conflict.
+    :return: Number of rows written.
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    insert = _dialect_insert(db.session.get_bind().dialect.name)
+    if insert is None:
+        return _upsert_increment_row_by_row(model, rows, key_columns, increment_columns)
+
+    stmt = insert(table)
+    if hasattr(stmt, 'on_conflict_do_update'):
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns}
+        )
+    else:
+        stmt = stmt.on_duplicate_key_update(
+            {column: table.c[column] + stmt.inserted[column] for column in increment_columns}
+        )
+    db.session.execute(stmt, rows)
+    return len(rows)
+
+
+def _upsert_increment_row_by_row(model, rows, key_columns, increment_columns):
+    """
+    Portable fallback for dialects without an upsert statement.
+    """
+    for row in rows:
+        existing = model.query.filter_by(**{column: row[column] for column in key_columns}).first()
+        if existing is None:
+            db.session.add(model(**row))
+        else:
+            for column in increment_columns:
+                setattr(existing, column, getattr(existing, column) + row[column])
+    return len(rows)
@@ -0,0 +1,98 @@
+import decimal
+import logging
+import uuid
+from datetime import date, datetime, time
+
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+
+def json_default(obj):
+    """
+    Serialize the types the encoder does not handle natively.
+    Dates and times are rendered in ISO 8601, like isoformat().
+    """
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson, which serializes datetimes natively (ISO 8601)
+    and skips the str -> bytes round trip when building responses. Calls passing stdlib
+    json options (indent, cls...) and installs without orjson use the default provider,
+    with the same ISO 8601 date format.
+    """
+
+    default = staticmethod(json_default)
+    sort_keys = False
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self.options).decode('utf-8')
+
+    def dumpb(self, obj):
+        """
+        :return: The JSON encoding of obj as bytes.
+        """
+        if orjson is None:
+            return super().dumps(obj).encode('utf-8')
+        return orjson.dumps(obj, default=json_default, option=self.options)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.options
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=json_default, option=option) + b"\n",
+                                        mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTX representation for application/json, encoding with the app JSON provider.
+    """
+    response = make_response(current_app.json.dumpb(data) + b"\n", code)
+    response.mimetype = 'application/json'
+    response.headers.extend(headers or {})
+    return response
+
+
+def init_json(app, api):
+    """
+    Use the fast JSON provider for the Flask app and the Flask-RESTX API.
+
+    :param app: The Flask app.
+    :param api: The Flask-RESTX API.
+    """
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    api.representations['application/json'] = output_json
+    if orjson is None:
+        logger.warning("orjson is not installed, JSON responses use the standard library encoder")
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+
+from src.extensions import db
+from src.exceptions import ValidationError
+
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+
+    :param values: The sort key values (datetimes are supported).
+    :return: URL-safe cursor string.
+    """
+    payload = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    :param cursor: The cursor string.
+    :param size: Expected number of sort key values.
+    :return: List of sort key values.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data)
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("wrong cursor size")
+        return [datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, TypeError, KeyError):
+        raise ValidationError("Invalid pagination cursor.")
+
+
+def _after(columns, values, descending):
+    """
+    Row-value comparison (c1, c2, ...) > (v1, v2, ...), expanded so that every database
+    can seek on the matching composite index.
+    """
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return db.or_(beyond, db.and_(column == value, _after(columns[1:], values[1:], descending)))
+
+
+def keyset_paginate(query, columns, limit, cursor=None, descending=True):
+    """
+    Fetch one page of a query with keyset (seek) pagination: rows are ordered by the given
+    columns, which must end with a unique column, and the next page starts right after the
+    last row of the previous one. Unlike OFFSET, the cost does not grow with the page depth.
+
+    :param query: The filtered query.
+    :param columns: Sort columns, e.g. (Log.timestamp, Log.id); back them with a composite index.
+    :param limit: Maximum number of rows in the page.
+    :param cursor: The cursor returned with the previous page (None for the first page).
+    :param descending: Newest first when True.
+    :return: Tuple (rows, next cursor or None on the last page).
+    """
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, len(columns)), descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+
+    # One extra row tells whether there is a next page, without counting
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
@@ -0,0 +1,251 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import request
+
+from src.utils.cache import TTLCache
+from src.utils.versioning import on_tables_committed
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Set to "false" to disable the response cache
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+# "memory" (per process) or "sqlite" (shared by the worker processes of a host)
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+# File of the sqlite backend
+RESPONSE_CACHE_SQLITE_PATH = os.getenv('RESPONSE_CACHE_SQLITE_PATH',
+                                       os.path.join(tempfile.gettempdir(), 'response_cache.db'))
+# Responses kept before the least recently used ones are evicted
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+# Default lifetime of a cached response in seconds
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+
+
+class MemoryCacheBackend:
+    """
+    Responses and tag generations in process memory. Invalidations only reach the
+    process that made the write; the other workers serve their copy until it expires.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_MAX_ENTRIES):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry, ttl):
+        self._entries.set(key, entry, ttl=ttl)
+
+    def generations(self, tags):
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Responses and tag generations in a local SQLite file, shared by every worker process
+    of the host, so that a write in one worker invalidates the responses of all of them.
+    """
+
+    # Expired and least recently used entries are pruned every this many writes
+    PRUNE_EVERY = 100
+
+    def __init__(self, path=RESPONSE_CACHE_SQLITE_PATH, maxsize=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._writes = 0
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache_entry (key TEXT PRIMARY KEY, status INTEGER NOT NULL, '
+            'mimetype TEXT, body BLOB NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_entry_accessed_at '
+                           'ON response_cache_entry (accessed_at)')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache_tag (tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            'SELECT status, mimetype, body FROM response_cache_entry WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE response_cache_entry SET accessed_at = ? WHERE key = ?', (now, key))
+        return row[0], row[1], bytes(row[2])
+
+    def set(self, key, entry, ttl):
+        connection = self._connection()
+        now = time.time()
+        status, mimetype, body = entry
+        connection.execute(
+            'INSERT OR REPLACE INTO response_cache_entry (key, status, mimetype, body, expires_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (key, status, mimetype, body, now + ttl, now)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """
+        Drop the expired entries, then the least recently used ones beyond maxsize.
+        """
+        connection = self._connection()
+        connection.execute('DELETE FROM response_cache_entry WHERE expires_at <= ?', (time.time(),))
+        connection.execute(
+            'DELETE FROM response_cache_entry WHERE key IN (SELECT key FROM response_cache_entry '
+            'ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)', (self.maxsize,)
+        )
+
+    def generations(self, tags):
+        tags = list(tags)
+        rows = self._connection().execute(
+            f"SELECT tag, generation FROM response_cache_tag WHERE tag IN ({','.join('?' * len(tags))})", tags
+        ).fetchall()
+        generations = dict.fromkeys(tags, 0)
+        generations.update(rows)
+        return generations
+
+    def bump(self, tags):
+        connection = self._connection()
+        connection.executemany(
+            'INSERT INTO response_cache_tag (tag, generation) VALUES (?, 1) '
+            'ON CONFLICT(tag) DO UPDATE SET generation = generation + 1', [(tag,) for tag in tags]
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM response_cache_entry')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM response_cache_entry').fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Read-through cache of successful GET responses, keyed by route, query arguments and caller.
+
+    Every entry is filed under tags (the tables it was built from). The key embeds the current
+    generation of each tag, and invalidating a tag increments its generation, so stale entries
+    are never read again and simply age out. A response computed while a write commits is stored
+    under the old generation, which is why no invalidation can be lost to that race.
+    """
+
+    def __init__(self, backend, ttl=RESPONSE_CACHE_TTL, enabled=True):
+        """
+        :param backend: Entry store (MemoryCacheBackend or SQLiteCacheBackend).
+        :param ttl: Default lifetime of an entry in seconds.
+        :param enabled: Whether responses are cached at all.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tags, caller=None):
+        """
+        :param tags: Tags of the response.
+        :param caller: Identity of the caller, for responses that depend on it.
+        :return: The cache key of the current request.
+        """
+        generations = self.backend.generations(tags)
+        args = '&'.join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        marker = '|'.join([request.method, request.path, args, str(caller or '')] +
+                          [f"{tag}:{generations[tag]}" for tag in sorted(generations)])
+        return hashlib.sha256(marker.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        :return: Tuple (status, mimetype, body) of the cached response, or None.
+        """
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            # Never turn a cache failure into an outage
+            logger.error(f"Response cache backend error: {str(e)}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry, ttl=None):
+        try:
+            self.backend.set(key, entry, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            logger.error(f"Response cache backend error: {str(e)}")
+
+    def invalidate(self, *tags):
+        """
+        Invalidate every response filed under one of the tags.
+        """
+        if not tags:
+            return
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            logger.error(f"Response cache invalidation of {', '.join(tags)} failed: {str(e)}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {'enabled': self.enabled, 'backend': type(self.backend).__name__, 'entries': len(self.backend),
+                'hits': self.hits, 'misses': self.misses}
+
+
+response_cache = ResponseCache(MemoryCacheBackend(), enabled=RESPONSE_CACHE_ENABLED)
+
+
+def _invalidate_committed_tables(tables):
+    response_cache.invalidate(*tables)
+
+
+def init_response_cache(app):
+    """
+    Configure the response cache backend and invalidate its tags when writes to the
+    corresponding tables commit.
+
+    :param app: The Flask app.
+    :return: The ResponseCache.
+    """
+    if RESPONSE_CACHE_BACKEND == 'sqlite':
+        response_cache.backend = SQLiteCacheBackend()
+    elif RESPONSE_CACHE_BACKEND != 'memory':
+        raise ValueError(f"Unknown response cache backend: {RESPONSE_CACHE_BACKEND}")
+    on_tables_committed(_invalidate_committed_tables)
+    app.extensions['response_cache'] = response_cache
+    logger.info(f"Response cache {'enabled' if response_cache.enabled else 'disabled'} "
+                f"with the {RESPONSE_CACHE_BACKEND} backend")
+    return response_cache
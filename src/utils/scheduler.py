@@ -0,0 +1,99 @@
+import atexit
+import logging
+import threading
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Tasks started in this process, by name
+_tasks = {}
+_tasks_lock = threading.Lock()
+
+
+class PeriodicTask:
+    """
+    Daemon thread calling a function every `interval` seconds inside an app context.
+    """
+
+    def __init__(self, app, name, interval, func, run_at_exit=False):
+        """
+        :param app: The Flask app whose context the function runs in.
+        :param name: Name of the task (also the thread name).
+        :param interval: Seconds between the end of a run and the start of the next.
+        :param func: The function to call, without arguments.
+        :param run_at_exit: Run the function one last time when the task is stopped.
+        """
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_at_exit = run_at_exit
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Periodic task {self.name} started (every {self.interval}s)")
+
+    def run_once(self):
+        """
+        Run the function now, logging instead of raising any error.
+        """
+        try:
+            with self.app.app_context():
+                self.func()
+        except Exception as e:
+            logger.error(f"Error in periodic task {self.name}: {str(e)}")
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+    def stop(self, timeout=None):
+        """
+        Stop the task, running it one last time if run_at_exit is set.
+        """
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self.run_at_exit:
+            self.run_once()
+        logger.info(f"Periodic task {self.name} stopped")
+
+
+def schedule_task(app, name, interval, func, run_at_exit=False):
+    """
+    Start a periodic task once per process. Calling it again with the same name
+    (e.g. from a second create_app()) returns the running task.
+
+    :param app: The Flask app whose context the function runs in.
+    :param name: Unique name of the task.
+    :param interval: Seconds between runs; 0 or less disables the task.
+    :param func: The function to call, without arguments.
+    :param run_at_exit: Run the function one last time when the process exits.
+    :return: The PeriodicTask, or None if disabled.
+    """
+    if interval <= 0 or app.config.get('TESTING'):
+        return None
+    with _tasks_lock:
+        task = _tasks.get(name)
+        if task is None:
+            task = PeriodicTask(app, name, interval, func, run_at_exit=run_at_exit)
+            _tasks[name] = task
+            task.start()
+    return task
+
+
+def stop_all_tasks():
+    """
+    Stop every periodic task started in this process.
+    """
+    with _tasks_lock:
+        tasks = list(_tasks.values())
+        _tasks.clear()
+    for task in tasks:
+        task.stop(timeout=5)
+
+
+atexit.register(stop_all_tasks)
@@ -0,0 +1,125 @@
+import logging
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from src.extensions import db
+from src.utils.db import _dialect_insert
+
+# Logger configuration
+logger = logging.getLogger(__name__)
+
+# Tables whose writes are counted; read endpoints derive their ETags from these counters
+VERSIONED_TABLES = {'user', 'api_key_model', 'log'}
+
+# Callbacks receiving the names of the versioned tables written by each committed transaction
+_commit_callbacks = []
+
+
+class TableVersion(db.Model):
+    """
+    Change counter of a table, incremented after every committed write to it.
+    Reading it is a primary key lookup, so it is a cheap marker of "has anything changed".
+    """
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def bump_table_versions(connection, names):
+    """
+    Increment the change counter of the given tables.
+
+    This runs in its own short transaction once the write has committed, rather than in the
+    transaction of the write: every writer to a table would otherwise hold the lock of its
+    counter row until it commits, serializing logins, key operations and log batches.
+    A reader may therefore see the new rows with the old counter for that short while.
+
+    :param connection: A connection in a transaction of its own.
+    :param names: Names of the tables written to.
+    """
+    table = TableVersion.__table__
+    insert = _dialect_insert(connection.dialect.name)
+    for name in sorted(names):
+        if insert is not None:
+            stmt = insert(table).values(name=name, version=1)
+            if hasattr(stmt, 'on_conflict_do_update'):
+                stmt = stmt.on_conflict_do_update(index_elements=['name'], set_={'version': table.c.version + 1})
+            else:
+                stmt = stmt.on_duplicate_key_update({'version': table.c.version + 1})
+            connection.execute(stmt)
+            continue
+        result = connection.execute(update(table).where(table.c.name == name).values(version=table.c.version + 1))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, version=1))
+
+
+def table_versions(*names):
+    """
+    :param names: Names of the tables.
+    :return: Dictionary of table name to change counter (0 for a table never written to).
+    """
+    rows = db.session.execute(select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(names)))
+    versions = dict.fromkeys(names, 0)
+    versions.update({name: version for name, version in rows})
+    return versions
+
+
+def on_tables_committed(callback):
+    """
+    Register a callback called with the set of versioned tables written to, after every
+    commit that wrote to one of them (e.g. to invalidate cached responses).
+
+    :param callback: Function taking a set of table names.
+    """
+    if callback not in _commit_callbacks:
+        _commit_callbacks.append(callback)
+
+
+def _record_changes(session, names):
+    session.info.setdefault('changed_tables', set()).update(names)
+
+
+def _versioned(names):
+    return {name for name in names if name in VERSIONED_TABLES}
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_changes(session, flush_context):
+    objects = list(session.new) + list(session.deleted) + \
+        [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    names = _versioned(getattr(obj, '__tablename__', None) for obj in objects)
+    if names:
+        _record_changes(session, names)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _count_bulk_changes(orm_execute_state):
+    # Bulk statements (insert(Log) executemany, Query.update/delete) bypass the flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    names = _versioned([getattr(table, 'name', None)])
+    if names:
+        _record_changes(orm_execute_state.session, names)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_committed_changes(session):
+    names = session.info.pop('changed_tables', None)
+    if not names:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            bump_table_versions(connection, names)
+    except Exception as e:
+        logger.error(f"Error bumping the versions of {', '.join(sorted(names))}: {str(e)}")
+    for callback in _commit_callbacks:
+        try:
+            callback(names)
+        except Exception as e:
+            logger.error(f"Error in commit callback for {', '.join(sorted(names))}: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_changes(session):
+    session.info.pop('changed_tables', None)